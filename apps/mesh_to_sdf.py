@@ -1,19 +1,116 @@
 #!/usr/bin/env python3
 # coding: utf-8
+from contextlib import nullcontext
+from functools import partial
 import os
 
 import click
-import numpy as np
 import open3d as o3d
 
-from vdb_to_numpy.utils import extract_mesh, preprocess_mesh
+from vdb_to_numpy.utils import (
+    ArrayCache,
+    MESH_EXTENSIONS,
+    Manifest,
+    extract_mesh,
+    list_input_files,
+    PROFILE_ENV_VAR,
+    preprocess_mesh,
+    profiling,
+    run_batch,
+    stage,
+)
 from vdb_to_numpy.vdb_tools import (
+    SDF_DTYPES,
+    SDF_FORMATS,
     level_set_to_numpy,
     mesh_to_level_set,
+    save_sdf,
     visualize_vdb_grid,
 )
 
 
+def mesh_to_sdf(
+    filename,
+    voxel_size,
+    scale,
+    watertight,
+    mcubes,
+    visualize=False,
+    verbose=True,
+    cache=None,
+    format="npy",
+    dtype="float32",
+    tiles=1,
+):
+    """Convert one mesh file, returns the list of files written."""
+    log = print if verbose else lambda *args: None
+    filename = os.path.abspath(filename)
+    file_extension = os.path.splitext(filename)[-1]
+    model_name = os.path.splitext(filename)[0]
+
+    # When using trimesh use degenerate_triangles
+    with stage("read_triangle_mesh") as record:
+        mesh = o3d.io.read_triangle_mesh(filename)
+        record.items = len(mesh.triangles)
+    mesh.compute_vertex_normals()
+    o3d.visualization.draw_geometries([mesh]) if visualize else None
+
+    log("Preprocessing input mesh...")
+    mesh = preprocess_mesh(mesh, scale=scale, watertight=watertight, cache=cache)
+
+    # Convert it to a level set using OpenVDB tools
+    log("Converting Triangle Mesh to a level set volume...")
+    vdb_grid = mesh_to_level_set(mesh, voxel_size, tiles=tiles)
+
+    visualize_vdb_grid(vdb_grid, filename) if visualize else None
+
+    # Save the SDF, see save_sdf for the available formats, and read it later on with load_sdf
+    sdf_filename = save_sdf(model_name + "_sdf", vdb_grid, format=format, dtype=dtype)
+    log("Saved the SDF to", sdf_filename)
+    outputs = [sdf_filename]
+
+    if mcubes:
+        log("Meshing dense volume by running marching cubes")
+        sdf_volume, _ = level_set_to_numpy(vdb_grid)
+        sdf_mesh = extract_mesh(sdf_volume)
+        o3d.visualization.draw_geometries([sdf_mesh]) if visualize else None
+        mesh_filename = model_name + "_sdf_mesh" + file_extension
+        log("Saving sdf_volume mesh to", mesh_filename)
+        with stage("write_triangle_mesh", items=len(sdf_mesh.triangles)):
+            o3d.io.write_triangle_mesh(mesh_filename, sdf_mesh)
+        outputs.append(mesh_filename)
+    return outputs
+
+
+def batch_mesh_to_sdf(filename, jobs, timeout, manifest, **kwargs):
+    """Convert all the meshes in a directory or listed in a .txt file using a pool of workers."""
+    filenames = list_input_files(filename, MESH_EXTENSIONS)
+    # Skip the meshes written by previous runs with --mcubes
+    filenames = [f for f in filenames if not os.path.splitext(f)[0].endswith("_sdf_mesh")]
+    if manifest is None:
+        base_dir = filename if os.path.isdir(filename) else os.path.dirname(filename)
+        manifest = os.path.join(base_dir, "mesh_to_sdf_manifest.jsonl")
+    manifest = Manifest(manifest)
+    pending = [f for f in filenames if not manifest.is_done(f)]
+    print("Converting {}/{} meshes, see {}".format(len(pending), len(filenames), manifest.filename))
+
+    convert = partial(mesh_to_sdf, visualize=False, verbose=False, **kwargs)
+    failed = 0
+    for i, record in enumerate(run_batch(convert, pending, jobs, timeout, manifest), 1):
+        failed += record["status"] != "ok"
+        print(
+            "[{}/{}] {} {} ({:.2f}s) {}".format(
+                i,
+                len(pending),
+                record["status"],
+                record["input"],
+                record["seconds"],
+                record["error"] or "",
+            )
+        )
+    print("Done, {} failed".format(failed))
+
+
 @click.command()
 @click.argument("filename", type=click.Path(exists=True))
 @click.option(
@@ -46,58 +143,124 @@ from vdb_to_numpy.vdb_tools import (
     default=False,
     help="Run marching cubes on the output SDF and store the mesh for inspection",
 )
-def main(filename, voxel_size, watertight, scale, mcubes, visualize):
+@click.option(
+    "--tiles",
+    type=int,
+    default=1,
+    help="Convert large meshes made of many closed parts, e.g. scenes, in up to this many tiles",
+)
+@click.option(
+    "--format",
+    type=click.Choice(SDF_FORMATS),
+    default="npy",
+    help="Output format: dense npy, compressed npz, chunked directory or sparse leaf nodes",
+)
+@click.option(
+    "--dtype",
+    type=click.Choice(SDF_DTYPES),
+    default="float32",
+    help="Output precision, integer types are quantized over [-sdf_trunc, sdf_trunc]",
+)
+@click.option(
+    "--cache_dir",
+    type=click.Path(),
+    default=None,
+    help="Reuse the watertight meshes stored in this cache directory across runs",
+)
+@click.option(
+    "--jobs",
+    type=int,
+    default=None,
+    help="Batch mode: number of worker processes, defaults to the number of CPUs",
+)
+@click.option(
+    "--timeout",
+    type=float,
+    default=None,
+    help="Batch mode: maximum number of seconds spent on each mesh",
+)
+@click.option(
+    "--manifest",
+    type=click.Path(),
+    default=None,
+    help="Batch mode: record of the finished meshes, reruns skip them",
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    default=False,
+    help="Print the time, CPU time, peak memory and items processed by each stage",
+)
+def main(
+    filename,
+    voxel_size,
+    watertight,
+    scale,
+    mcubes,
+    visualize,
+    tiles,
+    format,
+    dtype,
+    cache_dir,
+    jobs,
+    timeout,
+    manifest,
+    profile,
+):
     """Convert triangular meshes into dense SDF(Singed distance field) volumes in numpy format.
 
     The input to the script is any triangular mesh in any supported
     format by Open3D (.ply, .obj, .off, etc...). The script will convert
     the input mesh to a VDB grid representation and then extract its
     dense representation as numpy array of shape (X, Y, Z) of type
-    np.float64. The surface is represented in this array as the
+    np.float32. The surface is represented in this array as the
     0-isosurface and can be extracted by running marching cubes. Use the
-    --mcubes flag to inspect this results.
+    --mcubes flag to inspect this results. Use --format and --dtype to store
+    it compressed, sparse or quantized instead.
 
     You typically want to use the ``--scale`` and ``--watertight`` flags to
     make sure you can robustly extract the SDF representation from the mesh.
-    """
-    filename = os.path.abspath(filename)
-    file_extension = os.path.splitext(filename)[-1]
-    model_name = os.path.splitext(filename)[0]
 
-    # When using trimesh use degenerate_triangles
-    mesh = o3d.io.read_triangle_mesh(filename)
-    mesh.compute_vertex_normals()
-    o3d.visualization.draw_geometries([mesh]) if visualize else None
-
-    print("Preprocessing input mesh...")
-    mesh = preprocess_mesh(mesh, scale=scale, watertight=watertight)
-
-    # Convert it to a level set using OpenVDB tools
-    print("Converting Triangle Mesh to a level set volume...")
-    vdb_grid = mesh_to_level_set(mesh, voxel_size)
-
-    visualize_vdb_grid(vdb_grid, filename) if visualize else None
-
-    # Convert the VDB grid to a dense numpy array
-    print("Converting to a dense SDF representation")
-    sdf_volume, _ = level_set_to_numpy(vdb_grid)
-    print("Volume output:")
-    print("sdf_volume.shape = ", sdf_volume.shape)
-    print("sdf_volume.min() = ", sdf_volume.min())
-    print("sdf_volume.max() = ", sdf_volume.max())
-
-    # You can now save the sdf_volume as a np array and read it later on
-    numpy_filename = model_name + "_sdf.npy"
-    print("Saving sdf_volume to", numpy_filename)
-    np.save(numpy_filename, sdf_volume)
-
-    if mcubes:
-        print("Meshing dense volume by running marching cubes")
-        sdf_mesh = extract_mesh(sdf_volume)
-        o3d.visualization.draw_geometries([sdf_mesh]) if visualize else None
-        mesh_filename = model_name + "_sdf_mesh" + file_extension
-        print("Saving sdf_volume mesh to", mesh_filename)
-        o3d.io.write_triangle_mesh(mesh_filename, sdf_mesh)
+    If FILENAME is a directory, or a .txt file listing one mesh per line, all
+    the meshes are converted in batch mode by a pool of --jobs workers. The
+    finished meshes are recorded in the --manifest file and skipped on reruns.
+    Use --profile to see where the time goes, or set VDB_TO_NUMPY_PROFILE in batch mode.
+    """
+    cache = ArrayCache(cache_dir) if cache_dir else None
+    if os.path.isdir(filename) or os.path.splitext(filename)[-1] == ".txt":
+        if profile:
+            raise click.UsageError(
+                "--profile is only supported for a single mesh, in batch mode set "
+                "{}=profile_{{pid}}.json to profile each worker".format(PROFILE_ENV_VAR)
+            )
+        return batch_mesh_to_sdf(
+            filename,
+            jobs,
+            timeout,
+            manifest,
+            voxel_size=voxel_size,
+            scale=scale,
+            watertight=watertight,
+            mcubes=mcubes,
+            cache=cache,
+            format=format,
+            dtype=dtype,
+            tiles=tiles,
+        )
+    with profiling() if profile else nullcontext() as profiler:
+        mesh_to_sdf(
+            filename,
+            voxel_size,
+            scale,
+            watertight,
+            mcubes,
+            visualize,
+            cache=cache,
+            format=format,
+            dtype=dtype,
+            tiles=tiles,
+        )
+    print(profiler.summary()) if profile else None
 
 
 if __name__ == "__main__":
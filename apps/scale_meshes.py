@@ -1,17 +1,39 @@
 #!/usr/bin/env python3
+from functools import partial
 import os
+import time
 
 import click
 import open3d as o3d
 
+from vdb_to_numpy.utils import MESH_EXTENSIONS, Manifest, is_up_to_date, list_input_files
+from vdb_to_numpy.utils import run_batch
 from vdb_to_numpy.utils import scale_to_unit_sphere as scale_mesh
 
 
+def scale_mesh_file(filename, in_dir, out_dir, padding):
+    """Scale one mesh, keeping the directory structure of in_dir inside out_dir."""
+    out_filename = os.path.join(out_dir, os.path.relpath(filename, in_dir))
+    os.makedirs(os.path.dirname(out_filename), exist_ok=True)
+    mesh = o3d.io.read_triangle_mesh(filename)
+    mesh = scale_mesh(mesh, padding=padding)
+    if not o3d.io.write_triangle_mesh(out_filename, mesh):
+        raise IOError("Could not write {}".format(out_filename))
+    return [out_filename]
+
+
 @click.command()
 @click.option("--in_dir", type=click.Path(exists=True), required=True)
 @click.option("--out_dir", type=click.Path(exists=False), required=True)
 @click.option("--padding", type=float, default=0.1)
-def main(in_dir, out_dir, padding):
+@click.option("--jobs", type=int, default=None, help="Number of worker processes")
+@click.option(
+    "--check",
+    type=click.Choice(["mtime", "hash"]),
+    default="mtime",
+    help="Skip the meshes already scaled, newer output file or same input content hash",
+)
+def main(in_dir, out_dir, padding, jobs, check):
     """Scale a set of meshes using Open3D.
 
     This tool is inspired by:
@@ -20,14 +42,34 @@ def main(in_dir, out_dir, padding):
     roughly 50.
     """
     # Make sure out_dir exists
+    in_dir, out_dir = os.path.abspath(in_dir), os.path.abspath(out_dir)
     os.makedirs(out_dir, exist_ok=True)
 
-    for dirpath, _, filenames in os.walk(in_dir):
-        for filename in filenames:
-            print("Scaling {}...".format(filename))
-            mesh = o3d.io.read_triangle_mesh(os.path.join(dirpath, filename))
-            mesh = scale_mesh(mesh, padding)
-            o3d.io.write_triangle_mesh(os.path.join(out_dir, filename), mesh)
+    filenames = list_input_files(in_dir, MESH_EXTENSIONS)
+    manifest = None
+    if check == "hash":
+        manifest = Manifest(os.path.join(out_dir, "scale_meshes_manifest.jsonl"))
+    else:
+        filenames = [
+            filename
+            for filename in filenames
+            if not is_up_to_date(filename, os.path.join(out_dir, os.path.relpath(filename, in_dir)))
+        ]
+
+    scale_file = partial(scale_mesh_file, in_dir=in_dir, out_dir=out_dir, padding=padding)
+    records = run_batch(scale_file, filenames, jobs, manifest=manifest, digest=check == "hash")
+    start, scaled = time.perf_counter(), 0
+    for record in records:
+        if record["status"] != "ok":
+            print("Could not scale {}: {}".format(record["input"], record["error"]))
+            continue
+        scaled += 1
+        elapsed = time.perf_counter() - start
+        print("Scaled {} ({:.1f} meshes/s)".format(record["input"], scaled / elapsed), end="\r")
+    elapsed = time.perf_counter() - start
+    print(
+        "\nScaled {} meshes in {:.2f}s ({:.1f} meshes/s)".format(scaled, elapsed, scaled / elapsed)
+    )
 
 
 if __name__ == "__main__":
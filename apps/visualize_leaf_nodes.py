@@ -1,60 +1,57 @@
 #!/usr/bin/env python3
 # coding: utf-8
+from contextlib import nullcontext
 import os
 
 import click
-from diskcache import FanoutCache
 import open3d as o3d
-import pyopenvdb as vdb
 
-from vdb_to_numpy import LeafNodeGrid
-from vdb_to_numpy.utils import SerializableMesh, preprocess_mesh
+from vdb_to_numpy import LeafNodeGrid, cached_leaf_node_grid, leaf_node_grid_key
+from vdb_to_numpy.utils import ArrayCache, preprocess_mesh, profiling
 from vdb_to_numpy.vdb_tools import (
     level_set_to_triangle_mesh,
     mesh_to_level_set,
+    read_grid,
     visualize_vdb_grid,
 )
 from vdb_to_numpy.visualization import LeafNodeGridVisualizer
 
-cache = FanoutCache(
-    directory="cache/",
-    shards=64,
-    timeout=1,
-)
-
 
-def _get_leaf_node_grid(filename, voxel_size, scale, watertight, visualize_vdb):
+def get_mesh(filename, scale, watertight, cache=None):
     file_extension = os.path.splitext(filename)[-1]
     # If we alredy got a VDB grid, then skip the mesh-to-volume step
     if file_extension == ".vdb":
         print("Converting level set volume to Triangle Mesh...")
-        mesh = level_set_to_triangle_mesh(vdb.readAll(filename)[0][0])
+        mesh = level_set_to_triangle_mesh(read_grid(filename))
     else:
         # When using trimesh use degenerate_triangles
         mesh = o3d.io.read_triangle_mesh(filename)
 
-    # Prerocess the mesh
+    # Prerocess the mesh, the watertight meshes are cached
     print("Preprocessing input mesh...")
-    mesh = preprocess_mesh(mesh, scale=scale, watertight=watertight)
+    return preprocess_mesh(mesh, scale=scale, watertight=watertight, cache=cache)
 
-    # Convert it to a level set using OpenVDB tools
-    print("Converting Triangle Mesh to a level set volume...")
-    vdb_grid = mesh_to_level_set(mesh, voxel_size)
 
-    visualize_vdb_grid(vdb_grid, filename) if visualize_vdb else None
+def get_leaf_node_grid(filename, voxel_size, scale, watertight, visualize_vdb, no_cache, cache_dir):
+    cache = None if no_cache else ArrayCache(cache_dir)
+    mesh = get_mesh(filename, scale, watertight, cache)
 
-    # Convert the VDB grid to a numpy-based LeafNodeGrid object
-    return LeafNodeGrid(vdb_grid), SerializableMesh(mesh)
+    def build():
+        # Convert it to a level set using OpenVDB tools
+        print("Converting Triangle Mesh to a level set volume...")
+        vdb_grid = mesh_to_level_set(mesh, voxel_size)
+        visualize_vdb_grid(vdb_grid, filename) if visualize_vdb else None
+        # Convert the VDB grid to a numpy-based LeafNodeGrid object
+        return LeafNodeGrid(vdb_grid)
 
+    if cache is None:
+        return build(), mesh
 
-def get_leaf_node_grid(filename, voxel_size, scale, watertight, visualize_vdb, no_cache):
-    if no_cache:
-        f = _get_leaf_node_grid
-    else:
+    # The LeafNodeGrid is cached, keyed by the content of the input file and the parameters
+    key = leaf_node_grid_key(filename, voxel_size=voxel_size, scale=scale, watertight=watertight)
+    if key in cache:
         print("[WARNING] Reading data from cache")
-        f = cache.memoize(typed=True)(_get_leaf_node_grid)
-    grid, _mesh = f(filename, voxel_size, scale, watertight, visualize_vdb)
-    return grid, _mesh.as_open3d()
+    return cached_leaf_node_grid(cache, key, build), mesh
 
 
 @click.command()
@@ -83,14 +80,52 @@ def get_leaf_node_grid(filename, voxel_size, scale, watertight, visualize_vdb, n
     default=False,
     help="Don't read data from the local cache",
 )
+@click.option(
+    "--cache_dir",
+    type=click.Path(),
+    default="cache/",
+    help="Directory used to cache the LeafNodeGrid and the watertight meshes",
+)
 @click.option("--visualize_vdb", is_flag=True, default=False)
-def main(filename, voxel_size, scale, watertight, visualize_vdb, no_cache):
+@click.option(
+    "--prefetch",
+    type=int,
+    default=8,
+    help="Number of leaf nodes meshed ahead of time in the background",
+)
+@click.option(
+    "--premesh",
+    is_flag=True,
+    default=False,
+    help="Mesh all the leaf nodes in the background at startup",
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    default=False,
+    help="Print the time, CPU time, peak memory and items of each stage of the conversion",
+)
+def main(
+    filename,
+    voxel_size,
+    scale,
+    watertight,
+    visualize_vdb,
+    no_cache,
+    cache_dir,
+    prefetch,
+    premesh,
+    profile,
+):
     filename = os.path.abspath(filename)
     # Convert the VDB grid to a numpy-based LeafNodeGrid object
-    grid, mesh = get_leaf_node_grid(
-        filename, voxel_size, scale, watertight, visualize_vdb, no_cache
-    )
-    vis = LeafNodeGridVisualizer(grid, mesh)
+    with profiling() if profile else nullcontext() as profiler:
+        grid, mesh = get_leaf_node_grid(
+            filename, voxel_size, scale, watertight, visualize_vdb, no_cache, cache_dir
+        )
+    print(profiler.summary()) if profile else None
+    workers = os.cpu_count() if premesh else 1
+    vis = LeafNodeGridVisualizer(grid, mesh, prefetch=prefetch, premesh=premesh, workers=workers)
     vis.set_render_options(
         mesh_show_wireframe=True,
         mesh_show_back_face=True,
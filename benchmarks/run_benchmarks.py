@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""Offline benchmarks of the conversion hot paths, on synthetic grids.
+
+Each benchmark runs in a fresh process, so the peak RSS of one case does not leak into the next.
+The import case measures the import time of the package modules, each in a fresh interpreter:
+
+    ./benchmarks/run_benchmarks.py run --output baseline.json
+    ./benchmarks/run_benchmarks.py run --output current.json
+    ./benchmarks/run_benchmarks.py compare baseline.json current.json
+"""
+from concurrent.futures import ProcessPoolExecutor
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+import click
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def _leaf_node_grid(grid):
+    from vdb_to_numpy import LeafNodeGrid
+
+    return LeafNodeGrid, (grid,)
+
+
+def _numpy(grid):
+    from vdb_to_numpy import LeafNodeGrid
+
+    return LeafNodeGrid(grid).numpy, ()
+
+
+def _to_vdb(grid):
+    from vdb_to_numpy import LeafNodeGrid
+
+    return LeafNodeGrid(grid).to_vdb, ()
+
+
+def _vdb_to_triangle_mesh(grid):
+    from vdb_to_numpy import vdb_to_triangle_mesh
+
+    return vdb_to_triangle_mesh, (grid,)
+
+
+def _level_set_to_numpy(grid):
+    from vdb_to_numpy.vdb_tools import level_set_to_numpy
+
+    return level_set_to_numpy, (grid,)
+
+
+def _blend_grids(grid):
+    from vdb_to_numpy import blend_grids
+
+    return blend_grids, (grid, grid.deepCopy(), 0.5)
+
+
+def _normalize_grid(grid):
+    from vdb_to_numpy import normalize_grid
+
+    return normalize_grid, (grid,)
+
+
+# Each case prepares (function, args) from the input grid, only the function call is timed
+CASES = {
+    "leaf_node_grid": _leaf_node_grid,
+    "numpy": _numpy,
+    "to_vdb": _to_vdb,
+    "vdb_to_triangle_mesh": _vdb_to_triangle_mesh,
+    "level_set_to_numpy": _level_set_to_numpy,
+    "blend_grids": _blend_grids,
+    "normalize_grid": _normalize_grid,
+}
+
+
+# Modules timed by the import case, a data loader worker only needs the first one
+IMPORTS = ("vdb_to_numpy", "vdb_to_numpy.utils", "vdb_to_numpy.vdb_tools")
+
+_IMPORT_CODE = """
+import json, resource, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{"seconds": seconds, "maxrss": maxrss}}))
+"""
+
+
+def _maxrss_to_mb(maxrss):
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return maxrss * scale / 1024**2
+
+
+def _peak_rss_mb():
+    return _maxrss_to_mb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def run_case(case, shape, resolution, repeat):
+    """Run one benchmark, meant to be called in a fresh process."""
+    from synthetic_grids import create_grid
+
+    grid = create_grid(shape, resolution)
+    func, args = CASES[case](grid)
+    setup_rss = _peak_rss_mb()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start)
+    seconds = min(times)
+    return {
+        "case": case,
+        "shape": shape,
+        "resolution": resolution,
+        "seconds": seconds,
+        "median_seconds": sorted(times)[len(times) // 2],
+        "leaves_per_second": grid.leafCount() / seconds,
+        "voxels_per_second": grid.activeVoxelCount() / seconds,
+        "leaf_count": grid.leafCount(),
+        "active_voxel_count": grid.activeVoxelCount(),
+        "peak_rss_mb": _peak_rss_mb(),
+        "rss_increase_mb": _peak_rss_mb() - setup_rss,
+    }
+
+
+def run_import(module, repeat):
+    """Time the import of module, each run in a fresh interpreter."""
+    times, peak_rss_mb = [], 0.0
+    for _ in range(repeat):
+        command = [sys.executable, "-c", _IMPORT_CODE.format(module=module)]
+        output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+        run = json.loads(output.splitlines()[-1])
+        times.append(run["seconds"])
+        peak_rss_mb = max(peak_rss_mb, _maxrss_to_mb(run["maxrss"]))
+    return {
+        "case": "import",
+        "module": module,
+        "seconds": min(times),
+        "median_seconds": sorted(times)[len(times) // 2],
+        "peak_rss_mb": peak_rss_mb,
+    }
+
+
+def _key(result):
+    if result["case"] == "import":
+        return "import/{module}".format(**result)
+    return "{case}/{shape}/{resolution}".format(**result)
+
+
+@click.group()
+def main():
+    """Benchmark the conversion hot paths on synthetic grids."""
+
+
+@main.command()
+@click.option("--output", type=click.Path(), default="benchmarks.json", help="JSON results")
+@click.option(
+    "--case",
+    "cases",
+    multiple=True,
+    type=click.Choice(["import"] + list(CASES)),
+    default=["import"] + list(CASES),
+)
+@click.option("--shape", "shapes", multiple=True, default=["sphere", "torus", "noise"])
+@click.option("--resolution", "resolutions", multiple=True, default=["small", "medium", "large"])
+@click.option("--repeat", type=int, default=5, help="Best of this many runs")
+def run(output, cases, shapes, resolutions, repeat):
+    """Run the benchmarks and save the results as JSON."""
+    results = {}
+    if "import" in cases:
+        for module in IMPORTS:
+            result = run_import(module, repeat)
+            results[_key(result)] = result
+            print(
+                "{:45s} {:9.4f}s {:>47s} {:8.1f} MB".format(
+                    _key(result), result["seconds"], "", result["peak_rss_mb"]
+                )
+            )
+    for case in cases:
+        if case == "import":
+            continue
+        for shape in shapes:
+            for resolution in resolutions:
+                # A fresh process per benchmark, to measure its own peak RSS
+                context = multiprocessing.get_context("spawn")
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                    result = executor.submit(run_case, case, shape, resolution, repeat).result()
+                results[_key(result)] = result
+                print(
+                    "{:45s} {:9.4f}s {:12.0f} leaves/s {:14.0f} voxels/s {:8.1f} MB".format(
+                        _key(result),
+                        result["seconds"],
+                        result["leaves_per_second"],
+                        result["voxels_per_second"],
+                        result["peak_rss_mb"],
+                    )
+                )
+    machine = {
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+    }
+    with open(output, "w") as json_file:
+        json.dump({"machine": machine, "results": results}, json_file, indent=2)
+    print("Results saved to", output)
+
+
+@main.command()
+@click.argument("baseline", type=click.Path(exists=True))
+@click.argument("current", type=click.Path(exists=True))
+@click.option("--threshold", type=float, default=0.1, help="Allowed relative slowdown")
+def compare(baseline, current, threshold):
+    """Compare two result files, exits with an error if any benchmark got slower."""
+    with open(baseline) as baseline_file, open(current) as current_file:
+        baseline_results = json.load(baseline_file)["results"]
+        current_results = json.load(current_file)["results"]
+
+    regressions = 0
+    for key in sorted(set(baseline_results) & set(current_results)):
+        before, after = baseline_results[key], current_results[key]
+        ratio = after["seconds"] / before["seconds"]
+        rss_ratio = after["peak_rss_mb"] / before["peak_rss_mb"]
+        regression = ratio > 1 + threshold
+        regressions += regression
+        print(
+            "{:45s} {:9.4f}s -> {:9.4f}s ({:+6.1%}) RSS {:+6.1%} {}".format(
+                key,
+                before["seconds"],
+                after["seconds"],
+                ratio - 1,
+                rss_ratio - 1,
+                "REGRESSION" if regression else "",
+            )
+        )
+    missing = sorted(set(baseline_results) ^ set(current_results))
+    if missing:
+        print("Not in both files:", ", ".join(missing))
+    if regressions:
+        sys.exit("{} benchmarks are more than {:.0%} slower".format(regressions, threshold))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""Procedurally generated level sets, so the benchmarks never touch the network."""
+import numpy as np
+import open3d as o3d
+import pyopenvdb as vdb
+
+from vdb_to_numpy.vdb_tools import mesh_to_level_set
+
+# Voxel sizes of a unit-radius shape, each resolution has ~4x the leaf nodes of the previous one
+RESOLUTIONS = {"small": 0.02, "medium": 0.01, "large": 0.005}
+
+
+def sphere(voxel_size):
+    return vdb.createLevelSetSphere(radius=1.0, voxelSize=voxel_size)
+
+
+def torus(voxel_size):
+    mesh = o3d.geometry.TriangleMesh.create_torus(
+        torus_radius=0.7, tube_radius=0.3, radial_resolution=120, tubular_resolution=60
+    )
+    return mesh_to_level_set(mesh, voxel_size)
+
+
+def noise(voxel_size, seed=42):
+    """A sphere with its surface displaced by a smooth random noise, a more irregular topology."""
+    mesh = o3d.geometry.TriangleMesh.create_sphere(radius=1.0, resolution=100)
+    vertices = np.asarray(mesh.vertices)
+    rng = np.random.default_rng(seed)
+    frequencies, phases = rng.normal(scale=4.0, size=(8, 3)), rng.uniform(0, 2 * np.pi, 8)
+    displacement = np.sin(vertices @ frequencies.T + phases).mean(axis=1)
+    mesh.vertices = o3d.utility.Vector3dVector(vertices * (1 + 0.15 * displacement[:, None]))
+    return mesh_to_level_set(mesh, voxel_size)
+
+
+SHAPES = {"sphere": sphere, "torus": torus, "noise": noise}
+
+
+def create_grid(shape, resolution):
+    return SHAPES[shape](RESOLUTIONS[resolution])
@@ -1,3 +1,12 @@
 from .grid_wrappers import LeafNodeGrid
+from .grid_wrappers import cached_leaf_node_grid, leaf_node_grid_key, load_leaf_node_grid
+from .grid_wrappers import extract_leaf_arrays, unpack_value_mask
+from .grid_wrappers import extract_active_voxels, extract_aligned_leaf_arrays
 from .grid_wrappers import vdb_to_triangle_mesh
+from .grid_wrappers import sample_surface_points
+from .grid_wrappers import resample_grid
 from .grid_wrappers import blend_grids, normalize_grid
+from .dataset import LeafNodeDataset, ShuffleBufferSampler
+from .dataset import ShardedLeafDataset, ShardedLeafWriter, write_sharded_dataset
+from .dataset import augment_leaves, random_transform_ids
+from .utils import get_num_threads, set_num_threads, thread_limit
@@ -0,0 +1,5 @@
+from .augmentation import NUM_TRANSFORMS, ROTATION_IDS, augment_leaves, random_transform_ids
+from .augmentation import transform_matrix
+from .leaf_node_dataset import LeafNodeDataset, count_leaves
+from .sharded_leaves import ShardedLeafDataset, ShardedLeafWriter, write_sharded_dataset
+from .shuffle_sampler import ShuffleBufferSampler
@@ -0,0 +1,99 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+from ..pybind import vdb_pybind
+
+# The axis-aligned rotations and flips of a cube, transform_id = 8 * permutation + flips
+NUM_TRANSFORMS = 48
+_AXIS_PERMUTATIONS = ((0, 1, 2), (0, 2, 1), (1, 0, 2), (1, 2, 0), (2, 0, 1), (2, 1, 0))
+
+
+def transform_matrix(transform_id: int) -> np.ndarray:
+    """The 4x4 integer matrix of a transform, acting on index-space voxel coordinates.
+
+    Output axis a is the input axis _AXIS_PERMUTATIONS[transform_id // 8][a], mirrored if the bit
+    a of transform_id % 8 is set. Mirrored axes map x to -1 - x, so the leaf nodes stay aligned.
+    Useful to transform anything else attached to the leaf nodes consistently with augment_leaves,
+    e.g. points, or normals with the upper 3x3 block.
+    """
+    if not 0 <= transform_id < NUM_TRANSFORMS:
+        raise ValueError("transform_id must be in [0, {})".format(NUM_TRANSFORMS))
+    permutation, flips = _AXIS_PERMUTATIONS[transform_id // 8], transform_id % 8
+    matrix = np.eye(4, dtype=np.int32)
+    matrix[:3, :3] = 0
+    for axis, input_axis in enumerate(permutation):
+        mirrored = (flips >> axis) & 1
+        matrix[axis, input_axis] = -1 if mirrored else 1
+        matrix[axis, 3] = -mirrored
+    return matrix
+
+
+# The 24 transforms that are proper rotations, without mirroring the shapes
+ROTATION_IDS = np.array(
+    [i for i in range(NUM_TRANSFORMS) if round(np.linalg.det(transform_matrix(i)[:3, :3])) == 1],
+    dtype=np.int32,
+)
+
+
+def random_transform_ids(num_samples: int, rng=None, rotations_only: bool = False) -> np.ndarray:
+    """Draw a transform id per sample, uniformly among the 48 transforms or the 24 rotations."""
+    rng = np.random.default_rng(rng)
+    if rotations_only:
+        return rng.choice(ROTATION_IDS, num_samples)
+    return rng.integers(0, NUM_TRANSFORMS, num_samples, dtype=np.int32)
+
+
+def augment_leaves(
+    leaf_nodes: np.ndarray,
+    coords: np.ndarray,
+    transform_ids: np.ndarray,
+    noise_std: float = 0.0,
+    seed: Optional[int] = None,
+    out: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+    leaf_dim: Optional[int] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Rotate and flip a batch of (N, D, D, D) leaf nodes, and their (N, 3) origins, in parallel.
+
+    Each sample gets the transform given by transform_ids (see transform_matrix), and if
+    noise_std > 0, Gaussian noise added to its values (float32 only). The noise is reproducible
+    for a given seed, whatever the number of threads.
+
+    The origins are transformed consistently with the voxels, whose index-space coordinates are
+    mapped by transform_matrix: a mirrored axis maps the origin o to -o - leaf_dim, still aligned
+    to the leaf nodes. leaf_dim defaults to D, pass 8 for leaf nodes with a halo
+    (D = 8 + 2 * halo) whose coords are the leaf origins.
+
+    The results are written into out, a (leaf_nodes, coords) tuple of C-contiguous arrays, which
+    can be the inputs themselves to work in place. Otherwise new arrays are returned.
+    """
+    leaf_nodes = np.ascontiguousarray(leaf_nodes)
+    coords = np.ascontiguousarray(coords, dtype=np.int32)
+    transform_ids = np.ascontiguousarray(transform_ids, dtype=np.int32)
+    if leaf_nodes.ndim != 4 or coords.shape != (len(leaf_nodes), 3):
+        raise ValueError("Expected (N, D, D, D) leaf_nodes and (N, 3) coords")
+    if transform_ids.shape != (len(leaf_nodes),):
+        raise ValueError("Expected one transform id per leaf node")
+
+    if out is None:
+        out = (np.empty_like(leaf_nodes), np.empty_like(coords))
+    out_leaf_nodes, out_coords = out
+    for array, expected in ((out_leaf_nodes, leaf_nodes), (out_coords, coords)):
+        if array.shape != expected.shape or array.dtype != expected.dtype:
+            raise ValueError("out arrays must match the shape and dtype of the inputs")
+        if not array.flags.c_contiguous or not array.flags.writeable:
+            raise ValueError("out arrays must be C-contiguous and writeable")
+
+    if seed is None:
+        seed = int(np.random.default_rng().integers(2**63))
+    vdb_pybind._augment_leaves(
+        leaf_nodes,
+        coords,
+        transform_ids,
+        out_leaf_nodes,
+        out_coords,
+        leaf_dim or leaf_nodes.shape[1],
+        noise_std,
+        seed,
+    )
+    return out_leaf_nodes, out_coords
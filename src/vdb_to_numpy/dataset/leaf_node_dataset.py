@@ -0,0 +1,103 @@
+from collections import OrderedDict
+from typing import List, Optional
+
+import numpy as np
+
+from ..grid_wrappers.leaf_node_grid import LeafNodeGrid
+from ..grid_wrappers.leaf_node_grid_cache import load_leaf_node_grid
+from ..utils.cache import ArrayCache
+from ..vdb_tools import read_grid_metadata
+
+
+def count_leaves(filename: str, grid_name: Optional[str] = None) -> int:
+    """Number of leaf nodes of a grid in a .vdb file (the first one if no grid_name is given).
+
+    Only the tree topology is read, see read_grid_metadata.
+    """
+    return read_grid_metadata(filename, grid_name)["leaf_count"]
+
+
+class LeafNodeDataset:
+    """All the leaf nodes of a set of .vdb files, behind a single global leaf index.
+
+    The leaf counts of every file are read once at construction, the grids are only loaded, as
+    LeafNodeGrids, when one of their leaf nodes is requested. The loaded grids are kept in a LRU
+    that holds at most max_bytes of leaf arrays (always at least one grid). The kwargs are
+    forwarded to LeafNodeGrid, if a cache is provided the converted grids are reused across runs.
+    """
+
+    def __init__(
+        self,
+        filenames: List[str],
+        grid_name: Optional[str] = None,
+        max_bytes: int = 2 * 1024**3,
+        cache: Optional[ArrayCache] = None,
+        **kwargs
+    ):
+        self.filenames = list(filenames)
+        self.grid_name = grid_name
+        self.max_bytes = max_bytes
+        self.cache = cache
+        self.kwargs = kwargs
+
+        leaf_counts = [count_leaves(filename, grid_name) for filename in self.filenames]
+        self.offsets = np.concatenate([[0], np.cumsum(leaf_counts, dtype=np.int64)])
+        self._grids = OrderedDict()
+        self._grids_bytes = 0
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    @property
+    def leaf_counts(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    def locate(self, idx):
+        """Map global leaf indices to (file_idx, local_idx)."""
+        file_idx = np.searchsorted(self.offsets, idx, side="right") - 1
+        return file_idx, idx - self.offsets[file_idx]
+
+    def grid(self, file_idx: int) -> LeafNodeGrid:
+        """The LeafNodeGrid of one file, loaded on demand and kept in the LRU."""
+        if file_idx in self._grids:
+            self._grids.move_to_end(file_idx)
+            return self._grids[file_idx][0]
+        grid = load_leaf_node_grid(
+            self.filenames[file_idx], self.grid_name, cache=self.cache, **self.kwargs
+        )
+        # Only keep the stacked arrays, not the copy of the pyopenvdb grid
+        grid = LeafNodeGrid.from_arrays(**grid.to_arrays())
+        grid_bytes = sum(array.nbytes for array in grid.to_arrays().values())
+        while self._grids and self._grids_bytes + grid_bytes > self.max_bytes:
+            _, (_, evicted_bytes) = self._grids.popitem(last=False)
+            self._grids_bytes -= evicted_bytes
+        self._grids[file_idx] = (grid, grid_bytes)
+        self._grids_bytes += grid_bytes
+        return grid
+
+    def __getitem__(self, idx):
+        """Returns a tuple of (coord_ijk, leaf_node_buffer)."""
+        if not 0 <= idx < len(self):
+            raise IndexError("idx:{} >= max_idx:{}".format(idx, len(self)))
+        file_idx, local_idx = self.locate(idx)
+        return self.grid(file_idx)[local_idx]
+
+    def get_batch(self, indices):
+        """Gather the leaf nodes at indices into stacked (B, 3) coords and (B, 8, 8, 8) arrays.
+
+        The indices are grouped by file, so each grid is looked up once per batch. An empty list
+        of indices gives empty (0, 3) and (0, 8, 8, 8) arrays. Negative indices count from the end.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        if len(indices) and not (-len(self) <= indices.min() and indices.max() < len(self)):
+            raise IndexError("indices out of range for {} leaf nodes".format(len(self)))
+        indices = indices % max(len(self), 1)
+        file_ids, local_ids = self.locate(indices)
+        coords = np.empty((len(indices), 3), dtype=np.int32)
+        leaf_nodes = np.empty((len(indices), 8, 8, 8), dtype=self.kwargs.get("dtype", np.float32))
+        for file_idx in np.unique(file_ids):
+            batch_rows = np.flatnonzero(file_ids == file_idx)
+            grid = self.grid(file_idx)
+            coords[batch_rows] = grid.coords_ijk_a[local_ids[batch_rows]]
+            leaf_nodes[batch_rows] = grid.leaf_nodes_a[local_ids[batch_rows]]
+        return coords, leaf_nodes
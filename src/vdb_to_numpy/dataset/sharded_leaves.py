@@ -0,0 +1,237 @@
+import json
+import os
+from typing import Iterable, Optional
+
+import numpy as np
+
+from ..grid_wrappers.leaf_node_grid import LeafNodeGrid
+from ..grid_wrappers.leaf_node_grid_cache import load_leaf_node_grid
+
+INDEX_FILENAME = "index.json"
+SHARD_ARRAYS = ("coords", "values", "grid_id")
+
+
+def _shard_path(directory, shard_idx, name):
+    return os.path.join(directory, "{:05d}".format(shard_idx), name + ".npy")
+
+
+class ShardedLeafWriter:
+    """Write the leaf nodes of many LeafNodeGrids into a sharded, memory-mappable dataset.
+
+    The leaf nodes are appended to fixed-size shards, each one a directory with three .npy files:
+    the (S, 3) int32 coords, the (S, 8, 8, 8) values and the (S,) int32 grid_id of each leaf node.
+    Only the last shard can be smaller. The index.json file holds the shard layout and the
+    metadata of every grid (see LeafNodeGrid.to_arrays), it is written on close(), so a dataset
+    without index is an unfinished one.
+
+    Only one shard is kept in memory, the grids are streamed chunk by chunk:
+
+        with ShardedLeafWriter("dataset/") as writer:
+            for filename in filenames:
+                writer.add_grid(load_leaf_node_grid(filename), name=filename)
+
+    Leaf nodes can also be streamed one by one, after registering their grid with begin_grid:
+
+        grid_id = writer.begin_grid(grid.to_arrays()["metadata"], name=filename)
+        writer.add_leaves(iter(grid), grid_id)
+    """
+
+    def __init__(self, directory: str, shard_size: int = 16384):
+        self.directory = directory
+        self.shard_size = shard_size
+        self.grids = []
+        self.num_leaves = 0
+        self.num_shards = 0
+        self.dtype, self.leaf_shape = None, None
+        self._buffers = None
+        self._count = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # On errors the dataset is left without index, so it's never mistaken for a finished one
+        if exc_type is None:
+            self.close()
+
+    def begin_grid(self, metadata, name: Optional[str] = None) -> int:
+        """Register a new grid, without leaf nodes yet, returns its grid_id for add_leaves.
+
+        metadata is the dict, or the uint8 JSON array, returned by LeafNodeGrid.to_arrays.
+        """
+        if isinstance(metadata, np.ndarray):
+            metadata = json.loads(metadata.tobytes())
+        self.grids.append(
+            {"name": name, "offset": self.num_leaves, "num_leaves": 0, "metadata": metadata}
+        )
+        return len(self.grids) - 1
+
+    def add_grid(self, grid: LeafNodeGrid, name: Optional[str] = None) -> int:
+        """Append all the leaf nodes of grid, returns its grid_id."""
+        arrays = grid.to_arrays()
+        grid_id = self.begin_grid(arrays["metadata"], name=name)
+        self._append(arrays["coords_ijk"], arrays["leaf_nodes"], grid_id)
+        return grid_id
+
+    def add_leaves(self, leaves: Iterable, grid_id: int):
+        """Append (coord_ijk, leaf_node) pairs, such as the ones yielded by iter(LeafNodeGrid).
+
+        The leaf nodes of a grid must be contiguous, so grid_id must be the last grid returned by
+        begin_grid.
+        """
+        if grid_id != len(self.grids) - 1:
+            raise ValueError("Leaf nodes can only be added to the last grid, see begin_grid")
+        for coords, values in leaves:
+            self._append(np.asarray(coords)[None], np.asarray(values)[None], grid_id)
+
+    def _append(self, coords, values, grid_id):
+        """Copy the stacked leaf nodes into the current shard, chunk by chunk."""
+        if self.dtype is None:
+            self.dtype, self.leaf_shape = values.dtype, values.shape[1:]
+        elif values.dtype != self.dtype or values.shape[1:] != self.leaf_shape:
+            raise ValueError("All the grids must use the same dtype: {}".format(self.dtype))
+        start = 0
+        while start < len(coords):
+            if self._buffers is None:
+                self._buffers = {
+                    "coords": np.empty((self.shard_size, 3), dtype=np.int32),
+                    "values": np.empty((self.shard_size,) + self.leaf_shape, dtype=self.dtype),
+                    "grid_id": np.empty(self.shard_size, dtype=np.int32),
+                }
+            count = min(len(coords) - start, self.shard_size - self._count)
+            rows = slice(self._count, self._count + count)
+            self._buffers["coords"][rows] = coords[start : start + count]
+            self._buffers["values"][rows] = values[start : start + count]
+            self._buffers["grid_id"][rows] = grid_id
+            start += count
+            self._count += count
+            self.num_leaves += count
+            self.grids[grid_id]["num_leaves"] += count
+            if self._count == self.shard_size:
+                self._flush()
+
+    def _flush(self):
+        if not self._count:
+            return
+        os.makedirs(
+            os.path.dirname(_shard_path(self.directory, self.num_shards, "")), exist_ok=True
+        )
+        for name in SHARD_ARRAYS:
+            np.save(
+                _shard_path(self.directory, self.num_shards, name),
+                self._buffers[name][: self._count],
+            )
+        self.num_shards += 1
+        self._count = 0
+
+    def close(self):
+        """Write the last shard and the index."""
+        self._flush()
+        index = {
+            "shard_size": self.shard_size,
+            "num_shards": self.num_shards,
+            "num_leaves": self.num_leaves,
+            "dtype": None if self.dtype is None else self.dtype.name,
+            "leaf_shape": self.leaf_shape,
+            "grids": self.grids,
+        }
+        # Written aside and renamed, so a crash never leaves a truncated index
+        index_path = os.path.join(self.directory, INDEX_FILENAME)
+        with open(index_path + ".tmp", "w") as index_file:
+            json.dump(index, index_file)
+        os.replace(index_path + ".tmp", index_path)
+
+
+def write_sharded_dataset(filenames: Iterable[str], directory: str, shard_size=16384, **kwargs):
+    """Convert a set of .vdb files into a sharded leaf dataset, kwargs go to load_leaf_node_grid."""
+    with ShardedLeafWriter(directory, shard_size) as writer:
+        for filename in filenames:
+            writer.add_grid(load_leaf_node_grid(filename, **kwargs), name=filename)
+
+
+class ShardedLeafDataset:
+    """Random access reader for the datasets written by ShardedLeafWriter.
+
+    The shards are memory-mapped the first time they are used, the OS page cache does the rest.
+    All the shards but the last have the same size, so finding a leaf node is just a division.
+    """
+
+    def __init__(self, directory: str, mmap_mode: Optional[str] = "r"):
+        self.directory = directory
+        self.mmap_mode = mmap_mode
+        with open(os.path.join(directory, INDEX_FILENAME)) as index_file:
+            self.index = json.load(index_file)
+        self.shard_size = self.index["shard_size"]
+        self.grids = self.index["grids"]
+        self._shards = [None] * self.index["num_shards"]
+
+    def __len__(self):
+        return self.index["num_leaves"]
+
+    def shard(self, shard_idx: int) -> dict:
+        """The dict of (memory-mapped) coords, values and grid_id arrays of one shard."""
+        if self._shards[shard_idx] is None:
+            self._shards[shard_idx] = {
+                name: np.load(
+                    _shard_path(self.directory, shard_idx, name), mmap_mode=self.mmap_mode
+                )
+                for name in SHARD_ARRAYS
+            }
+        return self._shards[shard_idx]
+
+    def __getitem__(self, idx):
+        """Returns a tuple of (coord_ijk, leaf_node, grid_id)."""
+        if not -len(self) <= idx < len(self):
+            raise IndexError("idx:{} >= max_idx:{}".format(idx, len(self)))
+        shard_idx, row = divmod(idx % len(self), self.shard_size)
+        shard = self.shard(shard_idx)
+        return shard["coords"][row], shard["values"][row], shard["grid_id"][row]
+
+    def get_batch(self, indices, out=None):
+        """Gather the leaf nodes at indices into contiguous (B, 3), (B, 8, 8, 8), (B,) arrays.
+
+        The reads are grouped by shard, pass the arrays of a previous batch as out to reuse them.
+        Negative indices count from the end, like in __getitem__.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        if len(indices) and not (-len(self) <= indices.min() and indices.max() < len(self)):
+            raise IndexError("indices out of range for {} leaf nodes".format(len(self)))
+        indices = indices % max(len(self), 1)
+        if out is None:
+            out = (
+                np.empty((len(indices), 3), dtype=np.int32),
+                np.empty((len(indices),) + self.leaf_shape, dtype=self.dtype),
+                np.empty(len(indices), dtype=np.int32),
+            )
+        shard_ids, rows = np.divmod(indices, self.shard_size)
+        for shard_idx in np.unique(shard_ids):
+            batch_rows = np.flatnonzero(shard_ids == shard_idx)
+            shard = self.shard(shard_idx)
+            for array, name in zip(out, SHARD_ARRAYS):
+                array[batch_rows] = shard[name][rows[batch_rows]]
+        return out
+
+    def sample_batch(self, batch_size: int, rng=None, out=None):
+        """Gather a batch of uniformly sampled leaf nodes, see get_batch."""
+        rng = np.random.default_rng(rng)
+        return self.get_batch(rng.integers(0, len(self), batch_size), out=out)
+
+    @property
+    def dtype(self):
+        return np.dtype(self.index["dtype"])
+
+    @property
+    def leaf_shape(self):
+        return tuple(self.index["leaf_shape"])
+
+    def grid_leaf_range(self, grid_id: int) -> range:
+        """The global leaf indices of one grid, the leaf nodes of a grid are contiguous."""
+        grid = self.grids[grid_id]
+        return range(grid["offset"], grid["offset"] + grid["num_leaves"])
+
+    def leaf_node_grid(self, grid_id: int) -> LeafNodeGrid:
+        """Rebuild the LeafNodeGrid of grid_id, with its transform, background, etc."""
+        coords, values, _ = self.get_batch(self.grid_leaf_range(grid_id))
+        metadata = np.frombuffer(json.dumps(self.grids[grid_id]["metadata"]).encode(), np.uint8)
+        return LeafNodeGrid.from_arrays(coords, values, metadata)
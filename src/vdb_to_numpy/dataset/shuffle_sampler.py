@@ -0,0 +1,113 @@
+import numpy as np
+
+from .leaf_node_dataset import LeafNodeDataset
+
+
+class ShuffleBufferSampler:
+    """Stream shuffled batches of leaf nodes from a LeafNodeDataset, loading each grid only once.
+
+    K grids are read at a time, interleaved, in random order, each one in a random leaf order.
+    Their leaf nodes go through a fixed-size shuffle buffer: every batch is a random draw from the
+    buffer, and the holes are refilled from the open grids. When a grid runs out of leaf nodes
+    the next one is opened. The bigger the buffer and K, the closer to uniform sampling, while the
+    grids are still loaded once per epoch (keep K grids within the dataset max_bytes).
+
+    All the arrays are preallocated: a batch is a single gather from the buffer into the output
+    arrays. The yielded (B, 3) coords, (B, 8, 8, 8) leaf nodes and (B,) file ids are overwritten by
+    the next batch, copy them if they must outlive it.
+    """
+
+    def __init__(
+        self,
+        dataset: LeafNodeDataset,
+        batch_size: int,
+        buffer_size: int = 8192,
+        num_open_grids: int = 4,
+        drop_last: bool = False,
+        seed=None,
+    ):
+        self.dataset = dataset
+        self.batch_size = batch_size
+        self.buffer_size = max(buffer_size, batch_size)
+        self.num_open_grids = num_open_grids
+        self.drop_last = drop_last
+        self.rng = np.random.default_rng(seed)
+        self._buffers = None
+
+    def __len__(self):
+        if self.drop_last:
+            return len(self.dataset) // self.batch_size
+        return -(-len(self.dataset) // self.batch_size)
+
+    def _allocate(self, grid):
+        def arrays(size):
+            return (
+                np.empty((size, 3), dtype=np.int32),
+                np.empty((size,) + grid.leaf_node_shape, dtype=grid.leaf_nodes_a.dtype),
+                np.empty(size, dtype=np.int32),
+            )
+
+        self._buffers = arrays(self.buffer_size)
+        self._out = arrays(self.batch_size)
+
+    def _open_next_grid(self):
+        """Open the next grid of the epoch, returns a [file_idx, leaf_order, cursor] stream."""
+        while self._files:
+            file_idx = self._files.pop()
+            if self.dataset.leaf_counts[file_idx]:
+                grid = self.dataset.grid(file_idx)
+                if self._buffers is None:
+                    self._allocate(grid)
+                return [file_idx, self.rng.permutation(len(grid)), 0]
+        return None
+
+    def _read(self, rows):
+        """Fill the buffer rows with leaf nodes of the open grids, returns how many were filled."""
+        filled = 0
+        while filled < len(rows) and self._streams:
+            per_stream = -(-(len(rows) - filled) // len(self._streams))
+            for stream in list(self._streams):
+                file_idx, leaf_order, cursor = stream
+                count = min(per_stream, len(leaf_order) - cursor, len(rows) - filled)
+                grid, leaf_ids = self.dataset.grid(file_idx), leaf_order[cursor : cursor + count]
+                dst = rows[filled : filled + count]
+                self._buffers[0][dst] = grid.coords_ijk_a[leaf_ids]
+                self._buffers[1][dst] = grid.leaf_nodes_a[leaf_ids]
+                self._buffers[2][dst] = file_idx
+                stream[2] += count
+                filled += count
+                if stream[2] == len(leaf_order):
+                    self._streams.remove(stream)
+                    next_stream = self._open_next_grid()
+                    if next_stream is not None:
+                        self._streams.append(next_stream)
+        return filled
+
+    def __iter__(self):
+        self._files = list(self.rng.permutation(len(self.dataset.filenames)))
+        self._streams = []
+        while len(self._streams) < self.num_open_grids:
+            stream = self._open_next_grid()
+            if stream is None:
+                break
+            self._streams.append(stream)
+        if not self._streams:
+            return
+        count = self._read(np.arange(self.buffer_size))
+
+        while count >= self.batch_size or (count and not self.drop_last):
+            batch_size = min(self.batch_size, count)
+            taken = np.sort(self.rng.choice(count, batch_size, replace=False))
+            out = tuple(array[:batch_size] for array in self._out)
+            for buffer, array in zip(self._buffers, out):
+                np.take(buffer, taken, axis=0, out=array)
+
+            # Refill the holes, once the grids run out shrink the buffer instead
+            refilled = self._read(taken)
+            if refilled < len(taken):
+                keep = np.ones(count, dtype=bool)
+                keep[taken[refilled:]] = False
+                for buffer in self._buffers:
+                    buffer[: count - len(taken) + refilled] = buffer[:count][keep]
+                count -= len(taken) - refilled
+            yield out
@@ -1,3 +1,9 @@
+from .active_voxels import extract_active_voxels
+from .aligned_leaves import extract_aligned_leaf_arrays
 from .blend_grids import blend_grids, normalize_grid
-from .leaf_node_grid import LeafNodeGrid
+from .leaf_node_grid import LeafNodeGrid, extract_leaf_arrays, unpack_value_mask
+from .leaf_node_grid_cache import cached_leaf_node_grid, leaf_node_grid_key, load_leaf_node_grid
 from .marching_cubes import vdb_to_triangle_mesh
+from .resample import resample_grid
+from .surface_samples import sample_surface_points
+from .transform import matrix_to_transform, transform_to_matrix
@@ -0,0 +1,23 @@
+import pyopenvdb as vdb
+
+from ..pybind import vdb_pybind
+from ..utils.profiling import profiled
+
+
+@profiled(items=lambda arrays: len(arrays[0]))
+def extract_active_voxels(
+    vdb_grid: vdb.FloatGrid, include_inactive: bool = False, world_coords: bool = False
+):
+    """Extract the active voxels of a pyopenvdb.FloatGrid in sparse COO format.
+
+    Returns a tuple with the (M, 3) int32 voxel coordinates and the (M, 1) float32 values, as
+    expected by sparse-convolution models, computed in one parallel pass over the leaf nodes. The
+    voxels are sorted by leaf origin and then by offset inside each leaf node, the same order used
+    by LeafNodeGrid. If include_inactive is set, all the voxels of the leaf nodes are exported.
+
+    If world_coords is set, the (M, 3) float32 world-space coordinates, computed with the grid
+    transform, are appended to the tuple.
+    """
+    if not isinstance(vdb_grid, vdb.FloatGrid):
+        raise ValueError("GridType: '{}' not supported".format(type(vdb_grid)))
+    return vdb_pybind._extract_active_voxels(vdb_grid, include_inactive, world_coords)
@@ -0,0 +1,30 @@
+from typing import List, Optional
+
+import pyopenvdb as vdb
+
+from ..pybind import vdb_pybind
+from ..utils.profiling import profiled
+
+
+@profiled(items=lambda arrays: len(arrays[0]))
+def extract_aligned_leaf_arrays(
+    vdb_grids: List[vdb.FloatGrid], reference: Optional[vdb.FloatGrid] = None
+):
+    """Extract the leaf nodes of several grids, aligned by coordinate, in one native traversal.
+
+    This is meant for grids sharing the same index space but not necessarily the same topology,
+    such as the TSDF and weights grids written by vdbfusion. The leaf nodes of the reference grid
+    (the first grid if not provided) define the output topology.
+
+    Returns a tuple with the (N, 3) int32 origins and the (N, C, 8, 8, 8) float32 values, one
+    channel per input grid. Leaf nodes missing in a grid are filled with its background (or with
+    the value of the tile covering that region).
+    """
+    vdb_grids = list(vdb_grids)
+    if not vdb_grids:
+        raise ValueError("At least one grid is required")
+    reference = vdb_grids[0] if reference is None else reference
+    for vdb_grid in vdb_grids + [reference]:
+        if not isinstance(vdb_grid, vdb.FloatGrid):
+            raise ValueError("GridType: '{}' not supported".format(type(vdb_grid)))
+    return vdb_pybind._extract_aligned_leaf_arrays(vdb_grids, reference)
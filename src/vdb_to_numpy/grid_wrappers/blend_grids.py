@@ -1,13 +1,16 @@
 import pyopenvdb as vdb
 
 from ..pybind import vdb_pybind
+from ..utils.profiling import profiled
 
 
+@profiled()
 def blend_grids(grid_a: vdb.FloatGrid, grid_b: vdb.FloatGrid, eta: float = 0.9) -> None:
     """blend 2 vdb grids."""
     vdb_pybind._blend_grids(grid_a, grid_b, eta)
 
 
+@profiled(items=lambda grid: grid.leafCount())
 def normalize_grid(grid: vdb.FloatGrid) -> vdb.FloatGrid:
     """Normalize VDB grid."""
     return vdb_pybind._normalize_grid(grid)
@@ -1,9 +1,59 @@
-from typing import Tuple
+import inspect
+import json
+from typing import Optional, Tuple
 
 import numpy as np
 import pyopenvdb as vdb
 
 from ..pybind import vdb_pybind
+from ..utils.profiling import profiled
+from ..utils.shared_memory import SharedArrays
+from .transform import matrix_to_transform, transform_to_matrix
+
+# Output dtypes supported by the native leaf extraction
+LEAF_DTYPES = ("float32", "float16", "int8", "int16")
+
+
+@profiled(items=lambda arrays: len(arrays[0]))
+def extract_leaf_arrays(
+    vdb_grid: vdb.FloatGrid,
+    value_mask: bool = False,
+    packed: bool = True,
+    dtype=np.float32,
+    scale: float = 1.0,
+):
+    """Extract all the leaf nodes of a pyopenvdb.FloatGrid into stacked numpy arrays.
+
+    Returns a tuple with the (N, 3) int32 origins and the (N, 8, 8, 8) values of each leaf node.
+    The values are stored as value / scale in the requested dtype, the conversion happens in the
+    native loop. Integer dtypes are rounded and saturated, value ~= stored * scale.
+
+    If value_mask is set, the active state of each voxel is appended to the tuple, straight from
+    the LeafNode value mask. The mask is either bit-packed as (N, 64) uint8 (see
+    unpack_value_mask) or, if packed is False, an (N, 8, 8, 8) bool array.
+
+    The arrays are allocated by the native code and owned by the caller, frameworks can wrap them
+    without copying, e.g. with torch.from_numpy or through DLPack.
+    """
+    if not isinstance(vdb_grid, vdb.FloatGrid):
+        raise ValueError("GridType: '{}' not supported".format(type(vdb_grid)))
+    dtype = np.dtype(dtype).name
+    if dtype not in LEAF_DTYPES:
+        raise ValueError("dtype: '{}' not supported, use one of {}".format(dtype, LEAF_DTYPES))
+    return vdb_pybind._extract_leaf_arrays(vdb_grid, dtype, scale, value_mask, packed)
+
+
+def unpack_value_mask(packed_mask: np.ndarray) -> np.ndarray:
+    """Convert (N, 64) bit-packed value masks into (N, 8, 8, 8) bool arrays."""
+    bits = np.unpackbits(packed_mask, axis=-1, bitorder="little")
+    return bits.reshape(-1, 8, 8, 8).view(bool)
+
+
+def _read_only(array: np.ndarray) -> np.ndarray:
+    """A read-only view of array, sharing its memory."""
+    view = array.view()
+    view.flags.writeable = False
+    return view
 
 
 class LeafNodeGrid:
@@ -12,63 +62,255 @@ class LeafNodeGrid:
 
     Some functionallity will be lost in the way, but this class is only intended to use
     for getting training data
+
+    The stacked arrays can be shared without copying them: numpy(copy=False) returns read-only
+    views, and the grid itself exports its (N, 8, 8, 8) leaf nodes through the DLPack protocol
+    (torch.from_dlpack(grid), jax.dlpack.from_dlpack(grid), np.from_dlpack(grid)), __array__ and
+    the buffer protocol (memoryview(grid)). The buffer protocol needs Python 3.12+ (PEP 688), on
+    older interpreters use memoryview(grid.numpy(copy=False)[1]) instead. These views keep the
+    arrays alive on their own, even after the grid is gone, except for the shared memory released
+    by close_shared_memory(). They must be treated as read-only, consumers writing to them would
+    corrupt the grid.
     """
 
-    def __init__(self, vdb_grid: vdb.FloatGrid, normalize: bool = False):
-        """Convert a pyopenvdb.FloatGrid to a Numpy-based LeafNodeGrid."""
+    # Set by share_memory()
+    _shared_arrays = None
+
+    def __init__(
+        self,
+        vdb_grid: vdb.FloatGrid,
+        normalize: bool = False,
+        value_mask: bool = False,
+        dtype=np.float32,
+        scale: Optional[float] = None,
+    ):
+        """Convert a pyopenvdb.FloatGrid to a Numpy-based LeafNodeGrid.
+
+        If value_mask is set, the active state of each voxel is also extracted, use value_masks()
+        to access it.
+
+        The leaf nodes can be stored with reduced precision, float16, or quantized to int8/int16.
+        For integer types the values are stored as round(value / scale), by default the full range
+        of the type covers [-sdf_trunc, +sdf_trunc] (or [-1, +1] when normalizing).
+        """
         if not isinstance(vdb_grid, vdb.FloatGrid):
             raise ValueError("GridType: '{}' not supported".format(type(vdb_grid)))
         self.vdb_grid = vdb_grid.copy()
-        self.leaf_nodes = vdb_pybind.extract_leaf_nodes(self.vdb_grid)
         self.voxel_size = np.float32(self.vdb_grid.transform.voxelSize()[0])
         self.background = np.float32(self.vdb_grid.background)
         self.transform = self.vdb_grid.transform
         self.gridClass = self.vdb_grid.gridClass
 
-        # Normalize the leaf_nodes_a array if specified
-        if normalize:
-            for _, leaf_node in self.leaf_nodes:
-                leaf_node /= self.background
+        # Dequantization scale, stored_value * scale = value
+        self.dtype = np.dtype(dtype)
+        self.value_range = np.float32(1.0 if normalize else self.background)
+        if np.issubdtype(self.dtype, np.integer):
+            self.scale = np.float32(scale or self.value_range / np.iinfo(self.dtype).max)
+        else:
+            self.scale = np.float32(1.0)
+
+        # Cache the array format for the LeafNodeGrid, normalizing the leaf nodes if specified
+        leaf_arrays = extract_leaf_arrays(
+            self.vdb_grid,
+            value_mask=value_mask,
+            packed=True,
+            dtype=self.dtype,
+            scale=(self.background if normalize else 1.0) * self.scale,
+        )
+        self.coords_ijk_a, self.leaf_nodes_a = leaf_arrays[:2]
+        self.value_mask_a = leaf_arrays[2] if value_mask else None
+
+    def to_arrays(self) -> dict:
+        """Return the stacked arrays and metadata that fully describe this LeafNodeGrid.
+
+        The metadata is stored as an uint8 array with the JSON encoding of the grid properties,
+        so everything can be saved, or memory-mapped, as plain .npy files. See from_arrays.
+        """
+        metadata = {
+            "transform": transform_to_matrix(self.transform).tolist(),
+            "background": float(self.background),
+            "gridClass": self.gridClass,
+            "dtype": self.dtype.name,
+            "scale": float(self.scale),
+            "value_range": float(self.value_range),
+        }
+        arrays = {
+            "coords_ijk": self.coords_ijk_a,
+            "leaf_nodes": self.leaf_nodes_a,
+            "metadata": np.frombuffer(json.dumps(metadata).encode(), dtype=np.uint8),
+        }
+        if self.value_mask_a is not None:
+            arrays["value_mask"] = self.value_mask_a
+        return arrays
 
-        # Cache the array format for the LeafNodeGrid
-        if len(self.leaf_nodes) != 0:
-            coords_ijk, nodes = list(zip(*self.leaf_nodes))
-            self.coords_ijk_a = np.asarray(coords_ijk, dtype=np.int32)
-            self.leaf_nodes_a = np.asarray(nodes, dtype=np.float32)
+    @classmethod
+    def from_arrays(cls, coords_ijk, leaf_nodes, metadata, value_mask=None):
+        """Create a LeafNodeGrid from the output of to_arrays(), the arrays are not copied.
 
-    def numpy(self) -> Tuple[np.ndarray, np.ndarray]:
-        """Convert the current represetantion of the LeafNode grid to stacked numpy arrays."""
+        The resulting LeafNodeGrid has no vdb_grid, use to_vdb() if you need one.
+        """
+        metadata = json.loads(np.asarray(metadata).tobytes())
+        grid = cls.__new__(cls)
+        grid.vdb_grid = None
+        grid.transform = matrix_to_transform(metadata["transform"])
+        grid.voxel_size = np.float32(grid.transform.voxelSize()[0])
+        grid.background = np.float32(metadata["background"])
+        grid.gridClass = metadata["gridClass"]
+        grid.dtype = np.dtype(metadata["dtype"])
+        grid.scale = np.float32(metadata["scale"])
+        grid.value_range = np.float32(metadata["value_range"])
+        grid.coords_ijk_a, grid.leaf_nodes_a = coords_ijk, leaf_nodes
+        grid.value_mask_a = value_mask
+        return grid
+
+    def share_memory(self) -> "LeafNodeGrid":
+        """Move the stacked arrays to shared memory.
+
+        Pickling the grid then only sends the names of the shared memory blocks, the processes
+        receiving it (multiprocessing, DataLoader workers) map the same memory without copying it.
+        This process owns the memory, call close_shared_memory() once the workers are done.
+        """
+        if self._shared_arrays is None:
+            arrays = self.to_arrays()
+            arrays.pop("metadata")
+            self._shared_arrays = SharedArrays.create(arrays)
+            self._set_arrays(**self._shared_arrays.arrays)
+        return self
+
+    def close_shared_memory(self):
+        """Copy the stacked arrays back to private memory and release the shared memory."""
+        if self._shared_arrays is not None:
+            arrays = {name: np.array(array) for name, array in self._shared_arrays.arrays.items()}
+            self._set_arrays(**arrays)
+            self._shared_arrays.close()
+            self._shared_arrays = None
+
+    def _set_arrays(self, coords_ijk, leaf_nodes, value_mask=None):
+        self.coords_ijk_a, self.leaf_nodes_a, self.value_mask_a = coords_ijk, leaf_nodes, value_mask
+
+    @classmethod
+    def _attach_shared_memory(cls, handles, metadata):
+        shared_arrays = SharedArrays.attach(handles)
+        grid = cls.from_arrays(metadata=metadata, **shared_arrays.arrays)
+        grid._shared_arrays = shared_arrays
+        return grid
+
+    def __reduce_ex__(self, protocol):
+        """Only the stacked arrays and the metadata are pickled, the vdb_grid is not.
+
+        With protocol 5 the arrays support out-of-band pickling (numpy passes them as PickleBuffer
+        to the buffer_callback), and after share_memory() only the shared memory names are sent.
+        """
+        arrays = self.to_arrays()
+        if self._shared_arrays is not None:
+            handles = self._shared_arrays.handles()
+            return type(self)._attach_shared_memory, (handles, arrays["metadata"])
+        return type(self).from_arrays, (
+            np.asarray(arrays["coords_ijk"]),
+            np.asarray(arrays["leaf_nodes"]),
+            arrays["metadata"],
+            arrays.get("value_mask"),
+        )
+
+    def numpy(self, dequantize: bool = False, copy: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        """Convert the current represetantion of the LeafNode grid to stacked numpy arrays.
+
+        If dequantize is set, the leaf nodes are converted back to float32 values. With copy=False
+        the stacked arrays are returned as read-only views, without copying them, this raises a
+        ValueError if the leaf nodes must be dequantized.
+        """
+        if not copy:
+            if dequantize and self.dtype != np.float32:
+                raise ValueError("Dequantizing {} leaf nodes needs a copy".format(self.dtype))
+            return _read_only(self.coords_ijk_a), _read_only(self.leaf_nodes_a)
+        if dequantize:
+            return self.coords_ijk_a.copy(), self.dequantize(self.leaf_nodes_a)
         return self.coords_ijk_a.copy(), self.leaf_nodes_a.copy()
 
+    def dequantize(self, leaf_nodes: np.ndarray) -> np.ndarray:
+        """Convert leaf nodes stored in self.dtype back to float32 values."""
+        leaf_nodes = leaf_nodes.astype(np.float32)
+        if self.dtype == np.float32:
+            return leaf_nodes
+        leaf_nodes *= self.scale
+
+        # Snap the +/- background fill back to its exact value, lost with the reduced precision
+        if np.issubdtype(self.dtype, np.integer):
+            tolerance = self.scale / 2
+        else:
+            tolerance = self.value_range * np.finfo(self.dtype).eps / 2
+        fill = np.abs(np.abs(leaf_nodes) - self.value_range) <= tolerance
+        leaf_nodes[fill] = np.copysign(self.value_range, leaf_nodes[fill])
+        return leaf_nodes
+
+    def __array__(self, dtype=None, copy=None):
+        """The (N, 8, 8, 8) leaf nodes, a read-only view unless a copy or another dtype is asked."""
+        if copy or (dtype is not None and np.dtype(dtype) != self.leaf_nodes_a.dtype):
+            if copy is False:
+                raise ValueError("Converting the leaf nodes to {} needs a copy".format(dtype))
+            return np.array(self.leaf_nodes_a, dtype=dtype)
+        return _read_only(self.leaf_nodes_a)
+
+    def __dlpack__(self, **kwargs):
+        """Export the (N, 8, 8, 8) leaf nodes through DLPack, without copying them.
+
+        Consumers supporting DLPack 1.0 get a read-only tensor. Older ones get the storage itself,
+        DLPack can't tell them it's read-only.
+        """
+        try:
+            return _read_only(self.leaf_nodes_a).__dlpack__(**kwargs)
+        except BufferError:
+            if not self.leaf_nodes_a.flags.writeable:
+                raise
+            return self.leaf_nodes_a.__dlpack__(**kwargs)
+
+    def __dlpack_device__(self):
+        return self.leaf_nodes_a.__dlpack_device__()
+
+    def __buffer__(self, flags):
+        """Read-only buffer over the (N, 8, 8, 8) leaf nodes, see PEP 688 (Python 3.12+)."""
+        if flags & inspect.BufferFlags.WRITABLE:
+            raise BufferError("The leaf nodes of a LeafNodeGrid are read-only")
+        return memoryview(_read_only(self.leaf_nodes_a))
+
+    def value_masks(self, packed: bool = True) -> np.ndarray:
+        """Return the active state of each voxel, (N, 64) bit-packed or (N, 8, 8, 8) bool."""
+        if self.value_mask_a is None:
+            raise ValueError("LeafNodeGrid was created without value_mask=True")
+        return self.value_mask_a.copy() if packed else unpack_value_mask(self.value_mask_a)
+
+    @profiled("LeafNodeGrid.to_vdb", items=lambda grid: grid.leafCount())
     def to_vdb(self):
         """Convert to vdb format."""
         vdb_grid = vdb.FloatGrid()
         vdb_grid.transform = self.transform
         vdb_grid.background = self.background
         vdb_grid.gridClass = self.gridClass
-        coords_ijk, leaf_nodes = self.numpy()
+        coords_ijk, leaf_nodes = self.numpy(dequantize=True)
         for i, ijk in enumerate(coords_ijk):
             vdb_grid.copyFromArray(leaf_nodes[i], ijk)
         return vdb_grid
 
     def __len__(self):
-        return len(self.leaf_nodes)
+        return len(self.coords_ijk_a)
 
     def __getitem__(self, idx):
         """Returns a tuple of (coord_ijk, leaf_node_buffer)."""
-        if idx > len(self):
+        if idx >= len(self):
             raise IndexError("idx:{} >= max_idx:{}".format(idx, len(self)))
-        return self.leaf_nodes[idx]
+        return self.coords_ijk_a[idx], self.leaf_nodes_a[idx]
 
     def __iter__(self):
-        return self.leaf_nodes.__iter__()
+        return zip(self.coords_ijk_a, self.leaf_nodes_a)
 
-    def __next__(self):
-        return self.leaf_nodes.__next__()
+    @property
+    def leaf_nodes(self):
+        """List of (coord_ijk, leaf_node_buffer) tuples, views over the stacked arrays."""
+        return list(self)
 
     @property
     def leaf_node_shape(self):
-        return self.leaf_nodes[0][1].shape
+        return self.leaf_nodes_a.shape[1:]
 
     @property
     def sdf_trunc(self):
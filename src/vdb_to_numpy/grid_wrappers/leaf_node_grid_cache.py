@@ -0,0 +1,46 @@
+from typing import Callable, Optional
+
+from ..utils.batch import file_digest
+from ..utils.cache import ArrayCache, array_digest
+from ..vdb_tools import read_grid
+from .leaf_node_grid import LeafNodeGrid
+
+
+def leaf_node_grid_key(filename: str, **params) -> str:
+    """Cache key for the LeafNodeGrid computed from filename, the content of the file and the
+    conversion parameters are hashed, so edited files don't return stale data."""
+    return array_digest(content=file_digest(filename), **params)
+
+
+def cached_leaf_node_grid(
+    cache: ArrayCache, key: str, build: Callable[[], LeafNodeGrid], mmap_mode: Optional[str] = "r"
+) -> LeafNodeGrid:
+    """Return the LeafNodeGrid stored under key, or build() it and store it in the cache.
+
+    The stacked arrays are stored as plain .npy files, by default a cache hit just memory-maps
+    them (read-only), without unpickling nor copying any data.
+    """
+    arrays = cache.get(key, mmap_mode=mmap_mode)
+    if arrays is not None:
+        return LeafNodeGrid.from_arrays(**arrays)
+    grid = build()
+    cache.put(key, **grid.to_arrays())
+    return grid
+
+
+def load_leaf_node_grid(
+    filename: str, grid_name: Optional[str] = None, cache: Optional[ArrayCache] = None, **kwargs
+) -> LeafNodeGrid:
+    """Read a grid from a .vdb file (the first one if no grid_name is given) as a LeafNodeGrid.
+
+    The kwargs are forwarded to LeafNodeGrid. If a cache is provided, the result is reused as long
+    as the file content and the conversion parameters are the same.
+    """
+
+    def build():
+        return LeafNodeGrid(read_grid(filename, grid_name), **kwargs)
+
+    if cache is None:
+        return build()
+    key = leaf_node_grid_key(filename, grid_name=grid_name, **kwargs)
+    return cached_leaf_node_grid(cache, key, build)
@@ -1,13 +1,17 @@
 import numpy as np
-import open3d as o3d
 import pyopenvdb as vdb
 
 from ..pybind import vdb_pybind
+from ..utils.profiling import profiled
 
 
+@profiled(items=lambda mesh: len(mesh.triangles))
 def vdb_to_triangle_mesh(vdb_grid: vdb.FloatGrid):
     """Returns an Open3D TriangleMesh format, maybe we should just return the triangles and vertices
     and let the user decide what to do."""
+    # open3d takes seconds to import, don't make every user of the package pay for it
+    import open3d as o3d
+
     if not isinstance(vdb_grid, vdb.FloatGrid):
         raise ValueError("GridType: '{}' not supported".format(type(vdb_grid)))
     voxel_size = np.float32(vdb_grid.transform.voxelSize()[0])
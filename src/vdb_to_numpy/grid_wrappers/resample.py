@@ -0,0 +1,45 @@
+from typing import Optional, Union
+
+import numpy as np
+import pyopenvdb as vdb
+
+from ..pybind import vdb_pybind
+from ..utils.profiling import profiled
+from .transform import transform_to_matrix
+
+
+@profiled(items=lambda grid: grid.leafCount())
+def resample_grid(
+    vdb_grid: vdb.FloatGrid,
+    voxel_size: Optional[float] = None,
+    transform: Union[vdb.Transform, np.ndarray, None] = None,
+    order: int = 1,
+) -> vdb.FloatGrid:
+    """Resample a pyopenvdb.FloatGrid to a new voxel size or transform, without the original mesh.
+
+    Pass either voxel_size, which keeps the origin and orientation of the grid, or a linear
+    transform, as a pyopenvdb.Transform or a (4, 4) matrix (see transform_to_matrix). The values
+    are interpolated with nearest neighbor (order=0), trilinear (order=1) or triquadratic
+    (order=2) interpolation, on all the cores with the GIL released. Level sets are rebuilt at the
+    new resolution instead, with the same world-space background, so the narrow band keeps its
+    width in world units.
+
+    Returns a new pyopenvdb.FloatGrid, with the metadata of vdb_grid, ready for LeafNodeGrid.
+    """
+    if not isinstance(vdb_grid, vdb.FloatGrid):
+        raise ValueError("GridType: '{}' not supported".format(type(vdb_grid)))
+    if (voxel_size is None) == (transform is None):
+        raise ValueError("Pass either voxel_size or transform")
+
+    if voxel_size is not None:
+        if voxel_size <= 0:
+            raise ValueError("voxel_size must be positive")
+        matrix = transform_to_matrix(vdb_grid.transform)
+        matrix[:3, :3] *= voxel_size / np.linalg.norm(matrix[:3, :3], axis=1, keepdims=True)
+    elif isinstance(transform, vdb.Transform):
+        matrix = transform_to_matrix(transform)
+    else:
+        matrix = np.asarray(transform, dtype=np.float64)
+        if matrix.shape != (4, 4):
+            raise ValueError("transform must be a pyopenvdb.Transform or a (4, 4) matrix")
+    return vdb_pybind._resample_grid(vdb_grid, matrix, order)
@@ -0,0 +1,34 @@
+from typing import Optional
+
+import numpy as np
+import pyopenvdb as vdb
+
+from ..pybind import vdb_pybind
+from ..utils.profiling import profiled
+
+
+@profiled(items=lambda arrays: len(arrays[0]))
+def sample_surface_points(
+    vdb_grid: vdb.FloatGrid,
+    num_points: int,
+    surface_ratio: float = 0.5,
+    seed: Optional[int] = None,
+    gradients: bool = False,
+):
+    """Draw (point, sdf) training pairs directly from the narrow band of a pyopenvdb.FloatGrid.
+
+    Returns a tuple with the (N, 3) float32 world-space points and their (N, 1) float32 values,
+    trilinearly interpolated. The first round(surface_ratio * N) points are concentrated near the
+    zero level set, drawn from the leaf nodes with a zero crossing, the others are uniform in the
+    band, drawn from all the leaf nodes. In both cases the leaf nodes are weighted by their active
+    voxels, and each point is uniform inside of an active voxel.
+
+    If gradients is set, the (N, 3) float32 world-space gradients, computed with central
+    differences, are appended to the tuple. The samples are reproducible for a given seed,
+    whatever the number of threads.
+    """
+    if not isinstance(vdb_grid, vdb.FloatGrid):
+        raise ValueError("GridType: '{}' not supported".format(type(vdb_grid)))
+    if seed is None:
+        seed = int(np.random.default_rng().integers(2**63))
+    return vdb_pybind._sample_surface_points(vdb_grid, num_points, surface_ratio, seed, gradients)
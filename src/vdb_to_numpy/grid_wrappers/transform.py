@@ -0,0 +1,21 @@
+import numpy as np
+import pyopenvdb as vdb
+
+
+def transform_to_matrix(transform: vdb.Transform) -> np.ndarray:
+    """Return the (4, 4) matrix of a linear pyopenvdb.Transform.
+
+    The matrix follows the OpenVDB convention, row vectors and the translation in the last row,
+    so that [x, y, z, 1] = [i, j, k, 1] @ matrix.
+    """
+    origin = np.asarray(transform.indexToWorld((0, 0, 0)))
+    matrix = np.eye(4)
+    for axis, ijk in enumerate(np.eye(3)):
+        matrix[axis, :3] = np.asarray(transform.indexToWorld(tuple(ijk))) - origin
+    matrix[3, :3] = origin
+    return matrix
+
+
+def matrix_to_transform(matrix: np.ndarray) -> vdb.Transform:
+    """Create a linear pyopenvdb.Transform from a (4, 4) matrix, see transform_to_matrix."""
+    return vdb.createLinearTransform(matrix=np.asarray(matrix, dtype=np.float64).tolist())
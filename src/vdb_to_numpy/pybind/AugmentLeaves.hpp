@@ -0,0 +1,179 @@
+#pragma once
+
+// TBB
+#include <tbb/blocked_range.h>
+#include <tbb/parallel_for.h>
+
+// pybind11
+#include <pybind11/numpy.h>
+#include <pybind11/pybind11.h>
+
+// STL
+#include <algorithm>
+#include <cstdint>
+#include <random>
+#include <stdexcept>
+#include <type_traits>
+#include <vector>
+
+#include "ThreadArena.hpp"
+
+namespace vdb_to_numpy {
+
+namespace py = pybind11;
+
+/// The 48 axis-aligned rotations and flips of a cube are numbered as
+/// transform_id = 8 * permutation + flips: output axis a is input axis
+/// kAxisPermutations[permutation][a], mirrored if bit a of flips is set.
+constexpr int kNumTransforms = 48;
+constexpr int kAxisPermutations[6][3] = {{0, 1, 2}, {0, 2, 1}, {1, 0, 2},
+                                         {1, 2, 0}, {2, 0, 1}, {2, 1, 0}};
+
+/// Apply the transform of each sample to its (D, D, D) values and its origin,
+/// writing them to out_values and out_coords, which may alias the inputs. The
+/// voxels are mirrored around -1/2, x -> -1 - x, so a mirrored origin becomes
+/// -origin - leaf_dim and stays aligned to the leaf nodes. With noise_std > 0,
+/// Gaussian noise is added to the values, seeded per sample from seed and the
+/// sample index, so the result doesn't depend on the thread scheduling.
+template <typename T>
+void AugmentLeavesAs(const T* values,
+                     const int32_t* coords,
+                     const int32_t* transform_ids,
+                     T* out_values,
+                     int32_t* out_coords,
+                     std::size_t num_samples,
+                     std::ptrdiff_t dim,
+                     int leaf_dim,
+                     float noise_std,
+                     uint64_t seed) {
+    const std::size_t size = dim * dim * dim;
+    const std::ptrdiff_t in_strides[3] = {dim * dim, dim, 1};
+    tbb::parallel_for(
+        tbb::blocked_range<std::size_t>(0, num_samples),
+        [&](const tbb::blocked_range<std::size_t>& range) {
+            // The input is copied first, so the output can be the input
+            std::vector<T> sample(size);
+            for (auto n = range.begin(); n != range.end(); ++n) {
+                const int transform_id = transform_ids[n];
+                const int* permutation = kAxisPermutations[transform_id / 8];
+                const int flips = transform_id % 8;
+
+                int32_t origin[3];
+                std::ptrdiff_t strides[3], start = 0;
+                for (int a = 0; a < 3; ++a) {
+                    const int32_t coord = coords[3 * n + permutation[a]];
+                    strides[a] = in_strides[permutation[a]];
+                    if ((flips >> a) & 1) {
+                        origin[a] = -coord - leaf_dim;
+                        start += (dim - 1) * strides[a];
+                        strides[a] = -strides[a];
+                    } else {
+                        origin[a] = coord;
+                    }
+                }
+                std::copy(origin, origin + 3, out_coords + 3 * n);
+
+                std::copy(values + size * n, values + size * (n + 1),
+                          sample.begin());
+                T* out = out_values + size * n;
+                for (std::ptrdiff_t i = 0; i < dim; ++i) {
+                    for (std::ptrdiff_t j = 0; j < dim; ++j) {
+                        const T* row =
+                            sample.data() + start + i * strides[0] +
+                            j * strides[1];
+                        for (std::ptrdiff_t k = 0; k < dim; ++k) {
+                            *out++ = row[k * strides[2]];
+                        }
+                    }
+                }
+
+                if constexpr (std::is_floating_point_v<T>) {
+                    if (noise_std > 0.0f) {
+                        std::seed_seq seed_seq{
+                            static_cast<uint32_t>(seed),
+                            static_cast<uint32_t>(seed >> 32),
+                            static_cast<uint32_t>(n),
+                            static_cast<uint32_t>(uint64_t(n) >> 32)};
+                        std::mt19937 generator(seed_seq);
+                        std::normal_distribution<T> noise(0, noise_std);
+                        T* out_sample = out_values + size * n;
+                        for (std::size_t m = 0; m < size; ++m) {
+                            out_sample[m] += noise(generator);
+                        }
+                    }
+                }
+            }
+        });
+}
+
+/// Dispatch on the dtype of the values, float32 supports noise, any other
+/// dtype is only rotated and flipped, as raw items of the same size.
+inline void AugmentLeaves(py::array values,
+                          py::array_t<int32_t> coords,
+                          py::array_t<int32_t> transform_ids,
+                          py::array out_values,
+                          py::array_t<int32_t> out_coords,
+                          int leaf_dim,
+                          float noise_std,
+                          uint64_t seed) {
+    const auto num_samples = static_cast<std::size_t>(values.shape(0));
+    const std::ptrdiff_t dim = values.ndim() == 4 ? values.shape(1) : 0;
+    if (values.ndim() != 4 || values.shape(2) != dim ||
+        values.shape(3) != dim || !values.dtype().is(out_values.dtype()) ||
+        values.size() != out_values.size() ||
+        !(values.flags() & py::array::c_style) ||
+        !(out_values.flags() & py::array::c_style)) {
+        throw std::invalid_argument(
+            "values and out_values must be C-contiguous (N, D, D, D) arrays of "
+            "the same dtype");
+    }
+    if (coords.size() != py::ssize_t(3 * num_samples) ||
+        out_coords.size() != coords.size() ||
+        transform_ids.size() != py::ssize_t(num_samples)) {
+        throw std::invalid_argument(
+            "coords must be (N, 3) and transform_ids (N,) arrays");
+    }
+    const int32_t* ids = transform_ids.data();
+    for (std::size_t n = 0; n < num_samples; ++n) {
+        if (ids[n] < 0 || ids[n] >= kNumTransforms) {
+            throw std::invalid_argument("transform_ids must be in [0, 48)");
+        }
+    }
+    const bool is_float = values.dtype().is(py::dtype::of<float>());
+    if (noise_std > 0.0f && !is_float) {
+        throw std::invalid_argument("noise is only supported for float32");
+    }
+    const auto itemsize = values.itemsize();
+    if (!is_float && itemsize != 1 && itemsize != 2 && itemsize != 4 &&
+        itemsize != 8) {
+        throw std::invalid_argument("dtype not supported");
+    }
+
+    const void* in = values.data();
+    void* out = out_values.mutable_data();
+    const int32_t* in_coords = coords.data();
+    int32_t* out_coords_ptr = out_coords.mutable_data();
+
+    py::gil_scoped_release release;
+    ThreadArena::Instance().Execute([&] {
+        auto augment = [&](auto* typed_out) {
+            using T = std::remove_pointer_t<decltype(typed_out)>;
+            AugmentLeavesAs<T>(static_cast<const T*>(in), in_coords, ids,
+                               typed_out, out_coords_ptr, num_samples, dim,
+                               leaf_dim, noise_std, seed);
+        };
+        if (is_float) {
+            augment(static_cast<float*>(out));
+        } else if (itemsize == 1) {
+            augment(static_cast<uint8_t*>(out));
+        } else if (itemsize == 2) {
+            augment(static_cast<uint16_t*>(out));
+        } else if (itemsize == 4) {
+            augment(static_cast<uint32_t*>(out));
+        } else {
+            augment(static_cast<uint64_t*>(out));
+        }
+    });
+}
+
+}  // namespace vdb_to_numpy
@@ -0,0 +1,57 @@
+#pragma once
+
+// OpenVDB
+#include <openvdb/openvdb.h>
+#include <openvdb/tools/GridTransformer.h>
+#include <openvdb/tools/Interpolation.h>
+
+// pybind11
+#include <pybind11/numpy.h>
+#include <pybind11/pybind11.h>
+
+// STL
+#include <stdexcept>
+
+#include "ThreadArena.hpp"
+
+namespace vdb_to_numpy {
+
+namespace py = pybind11;
+
+/// Resample a grid into a new grid with the linear transform given by a (4, 4)
+/// matrix, in the OpenVDB row-vector convention, using nearest neighbor
+/// (order 0), trilinear (order 1) or triquadratic (order 2) interpolation.
+/// Level sets are rebuilt at the new resolution instead, keeping their
+/// world-space background. The metadata of the grid is copied to the output.
+inline openvdb::FloatGrid::Ptr ResampleGrid(
+    openvdb::FloatGrid::Ptr grid,
+    py::array_t<double, py::array::c_style | py::array::forcecast> matrix,
+    int order) {
+    if (matrix.size() != 16) {
+        throw std::invalid_argument("matrix must be a (4, 4) array");
+    }
+    if (order < 0 || order > 2) {
+        throw std::invalid_argument("order must be 0, 1 or 2");
+    }
+    const openvdb::math::Mat4d mat(matrix.data());
+    auto output = grid->copyWithNewTree();
+    output->setTransform(openvdb::math::Transform::createLinearTransform(mat));
+    {
+        py::gil_scoped_release release;
+        ThreadArena::Instance().Execute([&] {
+            if (order == 0) {
+                openvdb::tools::resampleToMatch<openvdb::tools::PointSampler>(
+                    *grid, *output);
+            } else if (order == 1) {
+                openvdb::tools::resampleToMatch<openvdb::tools::BoxSampler>(
+                    *grid, *output);
+            } else {
+                openvdb::tools::resampleToMatch<
+                    openvdb::tools::QuadraticSampler>(*grid, *output);
+            }
+        });
+    }
+    return output;
+}
+
+}  // namespace vdb_to_numpy
@@ -0,0 +1,181 @@
+#pragma once
+
+// OpenVDB
+#include <openvdb/openvdb.h>
+#include <openvdb/tools/Interpolation.h>
+#include <openvdb/tree/LeafManager.h>
+
+// TBB
+#include <tbb/blocked_range.h>
+#include <tbb/parallel_for.h>
+
+// pybind11
+#include <pybind11/numpy.h>
+#include <pybind11/pybind11.h>
+
+// STL
+#include <algorithm>
+#include <cmath>
+#include <cstdint>
+#include <numeric>
+#include <random>
+#include <stdexcept>
+#include <vector>
+
+#include "ThreadArena.hpp"
+
+namespace vdb_to_numpy {
+
+namespace py = pybind11;
+
+/// The points are drawn in chunks, each one with its own generator seeded from
+/// the seed and the chunk index, so the samples don't depend on the thread
+/// scheduling.
+constexpr std::size_t kSampleChunkSize = 4096;
+
+/// Draw num_points world-space points from the active voxels of a grid,
+/// writing their trilinearly interpolated values and, if gradients is not
+/// null, their finite-difference world-space gradients. The first
+/// num_surface points come from the leaf nodes containing a zero crossing,
+/// the others from all the leaf nodes, both weighted by active voxels.
+template <typename GridType>
+void SampleSurfacePointsInto(const GridType& grid,
+                             std::size_t num_points,
+                             std::size_t num_surface,
+                             uint64_t seed,
+                             float* points,
+                             float* values,
+                             float* gradients) {
+    using TreeType = typename GridType::TreeType;
+    using LeafNodeType = typename TreeType::LeafNodeType;
+
+    // Sort the leaf nodes by origin, so the samples only depend on the seed
+    openvdb::tree::LeafManager<const TreeType> leaf_manager(grid.tree());
+    std::vector<const LeafNodeType*> leaves(leaf_manager.leafCount());
+    for (std::size_t n = 0; n < leaves.size(); ++n) {
+        leaves[n] = &leaf_manager.leaf(n);
+    }
+    std::sort(leaves.begin(), leaves.end(), [](const auto* a, const auto* b) {
+        return a->origin() < b->origin();
+    });
+
+    // Cumulative active voxel counts, of all the leaf nodes and only of the
+    // ones with both negative and positive active values
+    std::vector<uint64_t> band_cdf(leaves.size()), surface_cdf(leaves.size());
+    tbb::parallel_for(
+        tbb::blocked_range<std::size_t>(0, leaves.size()),
+        [&](const tbb::blocked_range<std::size_t>& range) {
+            for (auto n = range.begin(); n != range.end(); ++n) {
+                bool negative = false, positive = false;
+                for (auto iter = leaves[n]->cbeginValueOn(); iter; ++iter) {
+                    (*iter < 0 ? negative : positive) = true;
+                }
+                band_cdf[n] = leaves[n]->onVoxelCount();
+                surface_cdf[n] = negative && positive ? band_cdf[n] : 0;
+            }
+        });
+    std::partial_sum(band_cdf.begin(), band_cdf.end(), band_cdf.begin());
+    std::partial_sum(surface_cdf.begin(), surface_cdf.end(),
+                     surface_cdf.begin());
+    if (num_points > num_surface && (band_cdf.empty() || !band_cdf.back())) {
+        throw std::invalid_argument("The grid has no active voxels");
+    }
+    if (num_surface && (surface_cdf.empty() || !surface_cdf.back())) {
+        throw std::invalid_argument("The grid has no zero crossing");
+    }
+
+    const auto& transform = grid.transform();
+    const auto map = transform.baseMap();
+    const std::size_t num_chunks =
+        (num_points + kSampleChunkSize - 1) / kSampleChunkSize;
+    tbb::parallel_for(
+        tbb::blocked_range<std::size_t>(0, num_chunks, 1),
+        [&](const tbb::blocked_range<std::size_t>& range) {
+            auto accessor = grid.getConstAccessor();
+            auto sample = [&](const openvdb::Vec3d& ijk) {
+                return openvdb::tools::BoxSampler::sample(accessor, ijk);
+            };
+            std::uniform_real_distribution<double> jitter(-0.5, 0.5);
+            for (auto chunk = range.begin(); chunk != range.end(); ++chunk) {
+                std::seed_seq seed_seq{
+                    static_cast<uint32_t>(seed),
+                    static_cast<uint32_t>(seed >> 32),
+                    static_cast<uint32_t>(chunk),
+                    static_cast<uint32_t>(uint64_t(chunk) >> 32)};
+                std::mt19937 generator(seed_seq);
+                const auto end =
+                    std::min(num_points, (chunk + 1) * kSampleChunkSize);
+                for (auto m = chunk * kSampleChunkSize; m < end; ++m) {
+                    // Pick an active voxel, uniformly among the selected leaves
+                    const auto& cdf = m < num_surface ? surface_cdf : band_cdf;
+                    std::uniform_int_distribution<uint64_t> draw(
+                        0, cdf.back() - 1);
+                    const uint64_t r = draw(generator);
+                    const auto n = static_cast<std::size_t>(
+                        std::upper_bound(cdf.begin(), cdf.end(), r) -
+                        cdf.begin());
+                    uint64_t k = r - (n ? cdf[n - 1] : 0);
+                    auto iter = leaves[n]->cbeginValueOn();
+                    for (; k; --k) ++iter;
+
+                    // And a point uniformly inside of it
+                    openvdb::Vec3d ijk = iter.getCoord().asVec3d();
+                    for (int a = 0; a < 3; ++a) ijk[a] += jitter(generator);
+                    const auto xyz = transform.indexToWorld(ijk);
+                    for (int a = 0; a < 3; ++a) {
+                        points[3 * m + a] = static_cast<float>(xyz[a]);
+                    }
+                    values[m] = sample(ijk);
+
+                    if (gradients) {
+                        // Central differences half a voxel away, so over one
+                        // voxel in index space, mapped to world space
+                        openvdb::Vec3d gradient;
+                        for (int a = 0; a < 3; ++a) {
+                            openvdb::Vec3d step(0.0);
+                            step[a] = 0.5;
+                            gradient[a] =
+                                sample(ijk + step) - sample(ijk - step);
+                        }
+                        gradient = map->applyIJT(gradient);
+                        for (int a = 0; a < 3; ++a) {
+                            gradients[3 * m + a] =
+                                static_cast<float>(gradient[a]);
+                        }
+                    }
+                }
+            }
+        });
+}
+
+/// Return (points, values) or (points, values, gradients) as float32 arrays
+/// of shape (N, 3), (N, 1) and (N, 3), with the GIL released while sampling.
+inline py::tuple SampleSurfacePoints(openvdb::FloatGrid::Ptr grid,
+                                     std::size_t num_points,
+                                     float surface_ratio,
+                                     uint64_t seed,
+                                     bool gradients) {
+    if (!(surface_ratio >= 0.0f && surface_ratio <= 1.0f)) {
+        throw std::invalid_argument("surface_ratio must be in [0, 1]");
+    }
+    const auto num_surface =
+        static_cast<std::size_t>(std::round(surface_ratio * num_points));
+    const auto size = static_cast<py::ssize_t>(num_points);
+    py::array_t<float> points({size, py::ssize_t(3)});
+    py::array_t<float> values({size, py::ssize_t(1)});
+    py::array_t<float> grads({gradients ? size : 0, py::ssize_t(3)});
+    auto* points_ptr = points.mutable_data();
+    auto* values_ptr = values.mutable_data();
+    auto* grads_ptr = gradients ? grads.mutable_data() : nullptr;
+    {
+        py::gil_scoped_release release;
+        ThreadArena::Instance().Execute([&] {
+            SampleSurfacePointsInto(*grid, num_points, num_surface, seed,
+                                    points_ptr, values_ptr, grads_ptr);
+        });
+    }
+    if (gradients) return py::make_tuple(points, values, grads);
+    return py::make_tuple(points, values);
+}
+
+}  // namespace vdb_to_numpy
@@ -0,0 +1,68 @@
+#pragma once
+
+#include <tbb/task_arena.h>
+
+#include <algorithm>
+#include <memory>
+#include <mutex>
+
+namespace vdb_to_numpy {
+
+/// The TBB arena every native entry point runs its parallel work in, so the
+/// number of threads used by vdb_to_numpy can be limited, e.g. inside
+/// DataLoader workers or on shared nodes.
+class ThreadArena {
+public:
+    static ThreadArena& Instance() {
+        static ThreadArena instance;
+        return instance;
+    }
+
+    /// Limit the native code to num_threads, 0 restores the TBB default (all
+    /// the cores). Returns the previous setting. The calls already running
+    /// finish in the arena they started in.
+    int SetNumThreads(int num_threads) {
+        std::lock_guard<std::mutex> lock(mutex_);
+        const int previous = num_threads_;
+        num_threads_ = std::max(num_threads, 0);
+        arena_ = num_threads_ > 0
+                         ? std::make_shared<tbb::task_arena>(num_threads_)
+                         : std::make_shared<tbb::task_arena>();
+        return previous;
+    }
+
+    /// The value given to SetNumThreads, 0 if the TBB default is used.
+    int NumThreadsSetting() {
+        std::lock_guard<std::mutex> lock(mutex_);
+        return num_threads_;
+    }
+
+    /// The number of threads the native code runs with.
+    int NumThreads() {
+        std::lock_guard<std::mutex> lock(mutex_);
+        return num_threads_ > 0 ? num_threads_
+                                : tbb::this_task_arena::max_concurrency();
+    }
+
+    /// Run f in the arena, the nested TBB algorithms (tbb::parallel_for,
+    /// LeafManager::foreach, the OpenVDB tools) are limited by its size. f must
+    /// not touch any Python object, it may run in another thread.
+    template <typename F>
+    auto Execute(F&& f) {
+        std::shared_ptr<tbb::task_arena> arena;
+        {
+            std::lock_guard<std::mutex> lock(mutex_);
+            arena = arena_;
+        }
+        return arena->execute(f);
+    }
+
+private:
+    ThreadArena() : arena_(std::make_shared<tbb::task_arena>()) {}
+
+    std::mutex mutex_;
+    int num_threads_ = 0;
+    std::shared_ptr<tbb::task_arena> arena_;
+};
+
+}  // namespace vdb_to_numpy
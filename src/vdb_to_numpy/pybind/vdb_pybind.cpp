@@ -12,8 +12,12 @@
 #include <memory>
 #include <vector>
 
+#include "AugmentLeaves.hpp"
 #include "BlendGrids.hpp"
 #include "MarchingCubes.h"
+#include "ResampleGrid.hpp"
+#include "SurfaceSamples.hpp"
+#include "ThreadArena.hpp"
 
 PYBIND11_MAKE_OPAQUE(std::vector<Eigen::Vector3d>)
 PYBIND11_MAKE_OPAQUE(std::vector<Eigen::Vector3i>)
@@ -61,8 +65,92 @@ PYBIND11_MODULE(vdb_pybind, m) {
           "(8, 8, 8) grid containing the floating point values of the leaf "
           "node.",
           "grid"_a);
-    m.def("_extract_triangle_mesh", &ExtractTriangleMesh);
-    m.def("_blend_grids", &BlendGrids, "grid_a"_a, "grid_b"_a, "eta"_a);
-    m.def("_normalize_grid", &NormalizeGrid, "grid"_a);
+    m.def("_extract_leaf_arrays", &ExtractLeafArrays<openvdb::FloatGrid>,
+          "Extract all the leaf nodes from a openvdb::FloatGrid into stacked "
+          "numpy arrays of (N, 3) origins and (N, 8, 8, 8) values, stored as "
+          "value / scale in the given dtype, optionally followed by the value "
+          "masks of each leaf node.",
+          "grid"_a, "dtype"_a = "float32", "scale"_a = 1.0f,
+          "value_mask"_a = false, "packed"_a = true);
+    m.def("_extract_active_voxels", &ExtractActiveVoxels<openvdb::FloatGrid>,
+          "Extract the active voxels from a openvdb::FloatGrid in sparse COO "
+          "format, (M, 3) coordinates and (M, 1) values, optionally followed "
+          "by the (M, 3) world-space coordinates.",
+          "grid"_a, "include_inactive"_a = false, "world_coords"_a = false);
+    m.def("_extract_aligned_leaf_arrays",
+          &ExtractAlignedLeafArrays<openvdb::FloatGrid>,
+          "Extract the leaf nodes of several openvdb::FloatGrid aligned on the "
+          "leaf nodes of a reference grid into (N, 3) origins and a single "
+          "(N, C, 8, 8, 8) array.",
+          "grids"_a, "reference"_a);
+    m.def("_read_grid_metadata", &ReadGridMetadata,
+          "Read the properties of a grid of a .vdb file, loading only its "
+          "topology.",
+          "filename"_a, "grid_name"_a = "");
+    m.def("_read_float_grid", &ReadFloatGrid,
+          "Read a single openvdb::FloatGrid from a .vdb file, optionally with "
+          "delayed loading and clipped to a world-space bounding box.",
+          "filename"_a, "grid_name"_a = "", "bbox"_a = std::vector<double>(),
+          "delay_load"_a = true);
+    m.def("_mesh_to_level_set_tiles", &MeshToLevelSetTiles,
+          "Convert a list of closed triangle meshes into level sets, in "
+          "parallel, and merge them into a single openvdb::FloatGrid with a "
+          "CSG union.",
+          "points"_a, "triangles"_a, "voxel_size"_a, "half_width"_a = 3.0f);
+    m.def("_augment_leaves", &AugmentLeaves,
+          "Rotate and flip a batch of (N, D, D, D) leaf nodes and their (N, 3) "
+          "origins with one of the 48 axis-aligned transforms per sample, "
+          "optionally adding Gaussian noise, writing to the output arrays.",
+          "values"_a, "coords"_a, "transform_ids"_a, "out_values"_a,
+          "out_coords"_a, "leaf_dim"_a, "noise_std"_a = 0.0f, "seed"_a = 0);
+    m.def("_sample_surface_points", &SampleSurfacePoints,
+          "Draw world-space points from the active voxels of a "
+          "openvdb::FloatGrid, a surface_ratio of them from the leaf nodes "
+          "with a zero crossing, returning the (N, 3) points, their (N, 1) "
+          "interpolated values and optionally their (N, 3) gradients.",
+          "grid"_a, "num_points"_a, "surface_ratio"_a = 0.5f, "seed"_a = 0,
+          "gradients"_a = false);
+    m.def("_resample_grid", &ResampleGrid,
+          "Resample a openvdb::FloatGrid into a new grid with the linear "
+          "transform of a (4, 4) matrix, using interpolation of the given "
+          "order (0, 1 or 2).",
+          "grid"_a, "matrix"_a, "order"_a = 1);
+    m.def("_extract_triangle_mesh",
+          [](openvdb::FloatGrid::Ptr grid, float voxel_size) {
+              return ThreadArena::Instance().Execute(
+                  [&] { return ExtractTriangleMesh(grid, voxel_size); });
+          });
+    m.def(
+        "_blend_grids",
+        [](openvdb::FloatGrid::Ptr grid_a, openvdb::FloatGrid::Ptr grid_b,
+           float eta) {
+            ThreadArena::Instance().Execute(
+                [&] { BlendGrids(grid_a, grid_b, eta); });
+        },
+        "grid_a"_a, "grid_b"_a, "eta"_a);
+    m.def(
+        "_normalize_grid",
+        [](openvdb::FloatGrid::Ptr grid) {
+            return ThreadArena::Instance().Execute(
+                [&] { return NormalizeGrid(grid); });
+        },
+        "grid"_a);
+    m.def(
+        "_set_num_threads",
+        [](int num_threads) {
+            return ThreadArena::Instance().SetNumThreads(num_threads);
+        },
+        "Limit the native code to num_threads, 0 for the TBB default. Returns "
+        "the previous setting.",
+        "num_threads"_a);
+    m.def(
+        "_get_num_threads",
+        [](bool setting) {
+            auto& arena = ThreadArena::Instance();
+            return setting ? arena.NumThreadsSetting() : arena.NumThreads();
+        },
+        "Number of threads used by the native code, or the value given to "
+        "_set_num_threads (0 for the TBB default) if setting is true.",
+        "setting"_a = false);
 }
 }  // namespace vdb_to_numpy
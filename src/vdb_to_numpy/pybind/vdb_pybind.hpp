@@ -1,3 +1,16 @@
+// OpenVDB
+#include <openvdb/Types.h>
+#include <openvdb/io/File.h>
+#include <openvdb/openvdb.h>
+#include <openvdb/tools/Composite.h>
+#include <openvdb/tools/MeshToVolume.h>
+#include <openvdb/tools/SignedFloodFill.h>
+#include <openvdb/tree/LeafManager.h>
+
+// TBB
+#include <tbb/blocked_range.h>
+#include <tbb/parallel_for.h>
+
 // pybind11
 #include <pybind11/numpy.h>
 #include <pybind11/pybind11.h>
@@ -5,6 +18,17 @@
 // Boost Python
 #include <boost/python.hpp>
 
+// STL
+#include <algorithm>
+#include <cmath>
+#include <limits>
+#include <memory>
+#include <stdexcept>
+#include <string>
+#include <vector>
+
+#include "ThreadArena.hpp"
+
 namespace vdb_to_numpy {
 
 namespace py = pybind11;
@@ -76,6 +100,20 @@ typename GridType::Ptr getGridFromPyObject(py::object py_obj) {
     }
 }
 
+/// Build the LeafManager of a tree inside the thread arena, with the GIL
+/// released, since its constructor already walks the tree in parallel.
+template <typename TreeType>
+std::unique_ptr<openvdb::tree::LeafManager<const TreeType>> MakeLeafManager(
+    const TreeType& tree) {
+    std::unique_ptr<openvdb::tree::LeafManager<const TreeType>> leaf_manager;
+    py::gil_scoped_release release;
+    ThreadArena::Instance().Execute([&] {
+        leaf_manager =
+            std::make_unique<openvdb::tree::LeafManager<const TreeType>>(tree);
+    });
+    return leaf_manager;
+}
+
 template <typename GridType>
 py::list ExtractLeafNodes(py::object py_obj) {
     auto grid = getGridFromPyObject<GridType>(py_obj);
@@ -88,4 +126,443 @@ py::list ExtractLeafNodes(py::object py_obj) {
     return leaf_nodes;
 }
 
+/// Output conversions for the leaf values, all of them store value / scale.
+struct ToFloat {
+    float scale;
+    float operator()(float value) const { return value / scale; }
+};
+
+struct ToHalf {
+    float scale;
+    uint16_t operator()(float value) const {
+        return openvdb::math::half(value / scale).bits();
+    }
+};
+
+/// Symmetric quantization, rounds to the nearest integer and saturates.
+template <typename IntType>
+struct ToInt {
+    float scale;
+    IntType operator()(float value) const {
+        constexpr auto max = static_cast<float>(
+            std::numeric_limits<IntType>::max());
+        return static_cast<IntType>(
+            std::round(std::clamp(value / scale, -max, max)));
+    }
+};
+
+/// Extract all the leaf nodes at once into stacked numpy arrays, the (N, 3)
+/// origins and the (N, 8, 8, 8) values, converted to the output type in the
+/// same loop. If value_mask is set, the active state of each voxel is also
+/// copied from LeafNode::getValueMask(), either bit-packed (N, 64) uint8
+/// (little bit order) or unpacked (N, 8, 8, 8) bool.
+template <typename GridType, typename OutType, typename ConvertOp>
+py::tuple ExtractLeafArraysAs(typename GridType::Ptr grid,
+                              const py::dtype& dtype,
+                              const ConvertOp& convert,
+                              bool value_mask,
+                              bool packed) {
+    using TreeType = typename GridType::TreeType;
+    using LeafNodeType = typename TreeType::LeafNodeType;
+    using ValueType = typename GridType::ValueType;
+    constexpr py::ssize_t DIM = LeafNodeType::DIM;
+    constexpr std::size_t SIZE = LeafNodeType::SIZE;
+    constexpr std::size_t MASK_BYTES = SIZE / 8;
+
+    const auto leaf_manager_ptr = MakeLeafManager(grid->tree());
+    const auto& leaf_manager = *leaf_manager_ptr;
+    const auto leaf_count = static_cast<py::ssize_t>(leaf_manager.leafCount());
+
+    py::array_t<int32_t> coords({leaf_count, py::ssize_t(3)});
+    py::array values(dtype, {leaf_count, DIM, DIM, DIM});
+    py::array_t<uint8_t> packed_masks;
+    py::array_t<bool> masks;
+    if (value_mask && packed) {
+        packed_masks = py::array_t<uint8_t>(
+            {leaf_count, static_cast<py::ssize_t>(MASK_BYTES)});
+    } else if (value_mask) {
+        masks = py::array_t<bool>({leaf_count, DIM, DIM, DIM});
+    }
+
+    auto* coords_ptr = coords.mutable_data();
+    auto* values_ptr = static_cast<OutType*>(values.mutable_data());
+    auto* packed_masks_ptr = value_mask && packed ? packed_masks.mutable_data()
+                                                  : nullptr;
+    auto* masks_ptr = value_mask && !packed ? masks.mutable_data() : nullptr;
+    {
+        py::gil_scoped_release release;
+        ThreadArena::Instance().Execute([&] {
+            leaf_manager.foreach([&](const LeafNodeType& leaf, std::size_t n) {
+                const auto& origin = leaf.origin();
+                std::copy(origin.data(), origin.data() + 3, coords_ptr + 3 * n);
+                const ValueType* buffer = leaf.buffer().data();
+                std::transform(buffer, buffer + SIZE, values_ptr + SIZE * n,
+                               convert);
+
+                const auto& mask = leaf.getValueMask();
+                if (packed_masks_ptr) {
+                    auto* out = packed_masks_ptr + MASK_BYTES * n;
+                    for (openvdb::Index i = 0; i < MASK_BYTES; ++i) {
+                        out[i] = mask.template getWord<uint8_t>(i);
+                    }
+                } else if (masks_ptr) {
+                    auto* out = masks_ptr + SIZE * n;
+                    for (openvdb::Index i = 0; i < SIZE; ++i) {
+                        out[i] = mask.isOn(i);
+                    }
+                }
+            });
+        });
+    }
+
+    if (!value_mask) return py::make_tuple(coords, values);
+    if (packed) return py::make_tuple(coords, values, packed_masks);
+    return py::make_tuple(coords, values, masks);
+}
+
+/// Dispatch on the output dtype: "float32", "float16", "int8" or "int16".
+template <typename GridType>
+py::tuple ExtractLeafArrays(py::object py_obj,
+                            const std::string& dtype,
+                            float scale,
+                            bool value_mask,
+                            bool packed) {
+    auto grid = getGridFromPyObject<GridType>(py_obj);
+    if (dtype == "float32") {
+        return ExtractLeafArraysAs<GridType, float>(
+            grid, py::dtype::of<float>(), ToFloat{scale}, value_mask, packed);
+    } else if (dtype == "float16") {
+        return ExtractLeafArraysAs<GridType, uint16_t>(
+            grid, py::dtype("float16"), ToHalf{scale}, value_mask, packed);
+    } else if (dtype == "int8") {
+        return ExtractLeafArraysAs<GridType, int8_t>(
+            grid, py::dtype::of<int8_t>(), ToInt<int8_t>{scale}, value_mask,
+            packed);
+    } else if (dtype == "int16") {
+        return ExtractLeafArraysAs<GridType, int16_t>(
+            grid, py::dtype::of<int16_t>(), ToInt<int16_t>{scale}, value_mask,
+            packed);
+    }
+    throw std::invalid_argument("dtype: " + dtype + " not supported");
+}
+
+/// Extract the active voxels (all the leaf voxels if include_inactive is set)
+/// in sparse COO format, (M, 3) int32 coordinates and (M, 1) values. The
+/// voxels are sorted by leaf origin and then by offset within each leaf. If
+/// world_coords is set, the (M, 3) float32 world-space coordinates are also
+/// computed with the grid transform. Active tiles are not included.
+template <typename GridType>
+py::tuple ExtractActiveVoxels(py::object py_obj,
+                              bool include_inactive,
+                              bool world_coords) {
+    using TreeType = typename GridType::TreeType;
+    using LeafNodeType = typename TreeType::LeafNodeType;
+    using ValueType = typename GridType::ValueType;
+
+    auto grid = getGridFromPyObject<GridType>(py_obj);
+    const auto& transform = grid->transform();
+
+    // Sort the leaf nodes by origin, and compute where each one starts
+    std::vector<const LeafNodeType*> leaves;
+    std::vector<std::size_t> offsets;
+    {
+        py::gil_scoped_release release;
+        ThreadArena::Instance().Execute([&] {
+            openvdb::tree::LeafManager<const TreeType> leaf_manager(
+                grid->tree());
+            leaves.resize(leaf_manager.leafCount());
+            for (std::size_t n = 0; n < leaves.size(); ++n) {
+                leaves[n] = &leaf_manager.leaf(n);
+            }
+            std::sort(leaves.begin(), leaves.end(),
+                      [](const auto* a, const auto* b) {
+                          return a->origin() < b->origin();
+                      });
+            offsets.assign(leaves.size() + 1, 0);
+            for (std::size_t n = 0; n < leaves.size(); ++n) {
+                offsets[n + 1] = offsets[n] + (include_inactive
+                                                   ? LeafNodeType::SIZE
+                                                   : leaves[n]->onVoxelCount());
+            }
+        });
+    }
+    const auto voxel_count = static_cast<py::ssize_t>(offsets.back());
+
+    py::array_t<int32_t> coords({voxel_count, py::ssize_t(3)});
+    py::array_t<ValueType> values({voxel_count, py::ssize_t(1)});
+    py::array_t<float> points({world_coords ? voxel_count : 0, py::ssize_t(3)});
+    auto* coords_ptr = coords.mutable_data();
+    auto* values_ptr = values.mutable_data();
+    auto* points_ptr = world_coords ? points.mutable_data() : nullptr;
+    {
+        py::gil_scoped_release release;
+        auto write_voxels = [&](auto iter, std::size_t m) {
+            for (; iter; ++iter, ++m) {
+                const auto ijk = iter.getCoord();
+                std::copy(ijk.data(), ijk.data() + 3, coords_ptr + 3 * m);
+                values_ptr[m] = *iter;
+                if (points_ptr) {
+                    const auto xyz = transform.indexToWorld(ijk);
+                    points_ptr[3 * m + 0] = static_cast<float>(xyz.x());
+                    points_ptr[3 * m + 1] = static_cast<float>(xyz.y());
+                    points_ptr[3 * m + 2] = static_cast<float>(xyz.z());
+                }
+            }
+        };
+        ThreadArena::Instance().Execute([&] {
+            tbb::parallel_for(
+                tbb::blocked_range<std::size_t>(0, leaves.size()),
+                [&](const tbb::blocked_range<std::size_t>& range) {
+                    for (auto n = range.begin(); n != range.end(); ++n) {
+                        if (include_inactive) {
+                            write_voxels(leaves[n]->cbeginValueAll(),
+                                         offsets[n]);
+                        } else {
+                            write_voxels(leaves[n]->cbeginValueOn(),
+                                         offsets[n]);
+                        }
+                    }
+                });
+        });
+    }
+
+    if (world_coords) return py::make_tuple(coords, values, points);
+    return py::make_tuple(coords, values);
+}
+
+/// Extract the leaf nodes of C grids, aligned on the leaf nodes of the
+/// reference grid, into a single (N, C, 8, 8, 8) array plus the (N, 3)
+/// origins. Leaf nodes missing in a grid are filled with the value of that
+/// grid at the leaf origin, its background or the value of the enclosing tile.
+template <typename GridType>
+py::tuple ExtractAlignedLeafArrays(py::list py_grids, py::object py_reference) {
+    using TreeType = typename GridType::TreeType;
+    using LeafNodeType = typename TreeType::LeafNodeType;
+    using ValueType = typename GridType::ValueType;
+    constexpr py::ssize_t DIM = LeafNodeType::DIM;
+    constexpr std::size_t SIZE = LeafNodeType::SIZE;
+
+    std::vector<typename GridType::ConstPtr> grids;
+    for (const auto& py_grid : py_grids) {
+        grids.push_back(getGridFromPyObject<GridType>(
+            py::reinterpret_borrow<py::object>(py_grid)));
+    }
+    auto reference = getGridFromPyObject<GridType>(py_reference);
+    const auto leaf_manager_ptr = MakeLeafManager(reference->tree());
+    const auto& leaf_manager = *leaf_manager_ptr;
+    const auto leaf_count = static_cast<py::ssize_t>(leaf_manager.leafCount());
+    const auto channels = static_cast<py::ssize_t>(grids.size());
+
+    py::array_t<int32_t> coords({leaf_count, py::ssize_t(3)});
+    py::array_t<ValueType> values({leaf_count, channels, DIM, DIM, DIM});
+    auto* coords_ptr = coords.mutable_data();
+    auto* values_ptr = values.mutable_data();
+    {
+        py::gil_scoped_release release;
+        ThreadArena::Instance().Execute([&] {
+            tbb::parallel_for(
+                tbb::blocked_range<std::size_t>(0, leaf_manager.leafCount()),
+                [&](const tbb::blocked_range<std::size_t>& range) {
+                    // Each task traverses the grids with its own accessors
+                    std::vector<typename GridType::ConstAccessor> accessors;
+                    for (const auto& grid : grids) {
+                        accessors.push_back(grid->getConstAccessor());
+                    }
+                    for (auto n = range.begin(); n != range.end(); ++n) {
+                        const auto& origin = leaf_manager.leaf(n).origin();
+                        std::copy(origin.data(), origin.data() + 3,
+                                  coords_ptr + 3 * n);
+                        for (std::size_t c = 0; c < accessors.size(); ++c) {
+                            auto* out = values_ptr +
+                                        (n * accessors.size() + c) * SIZE;
+                            const auto* leaf =
+                                accessors[c].probeConstLeaf(origin);
+                            if (leaf) {
+                                const ValueType* buffer = leaf->buffer().data();
+                                std::copy(buffer, buffer + SIZE, out);
+                            } else {
+                                std::fill(out, out + SIZE,
+                                          accessors[c].getValue(origin));
+                            }
+                        }
+                    }
+                });
+        });
+    }
+    return py::make_tuple(coords, values);
+}
+
+/// Name of the grid to read from an open file, the first one if grid_name is
+/// empty.
+inline std::string GridNameOrFirst(openvdb::io::File& file,
+                                   const std::string& grid_name) {
+    if (!grid_name.empty()) {
+        if (!file.hasGrid(grid_name)) {
+            throw std::invalid_argument("Grid: '" + grid_name +
+                                        "' not found in " + file.filename());
+        }
+        return grid_name;
+    }
+    auto name_iter = file.beginName();
+    if (name_iter == file.endName()) {
+        throw std::invalid_argument("No grids found in " + file.filename());
+    }
+    return name_iter.gridName();
+}
+
+/// Read the properties of one grid of a .vdb file without loading its voxel
+/// values. The file is opened with delayed loading, so only the tree topology
+/// is read from disk, which is enough to count the leaf nodes.
+inline py::dict ReadGridMetadata(const std::string& filename,
+                                 const std::string& grid_name) {
+    openvdb::initialize();
+    openvdb::io::File file(filename);
+    openvdb::GridBase::Ptr grid;
+    std::string name;
+    openvdb::CoordBBox bbox;
+    openvdb::Index64 leaf_count = 0, active_voxel_count = 0;
+    {
+        // The topology queries below run in parallel too
+        py::gil_scoped_release release;
+        ThreadArena::Instance().Execute([&] {
+            file.open(/*delayLoad=*/true);
+            name = GridNameOrFirst(file, grid_name);
+            grid = file.readGrid(name);
+            file.close();
+            bbox = grid->evalActiveVoxelBoundingBox();
+            leaf_count = grid->baseTree().leafCount();
+            active_voxel_count = grid->activeVoxelCount();
+        });
+    }
+    const auto voxel_size = grid->voxelSize();
+    py::object background = py::none();
+    if (auto float_grid = openvdb::gridPtrCast<openvdb::FloatGrid>(grid)) {
+        background = py::float_(float_grid->background());
+    }
+    py::dict metadata;
+    metadata["name"] = name;
+    metadata["value_type"] = grid->valueType();
+    metadata["gridClass"] =
+        openvdb::GridBase::gridClassToString(grid->getGridClass());
+    metadata["leaf_count"] = leaf_count;
+    metadata["active_voxel_count"] = active_voxel_count;
+    metadata["bbox"] = py::make_tuple(
+        py::make_tuple(bbox.min().x(), bbox.min().y(), bbox.min().z()),
+        py::make_tuple(bbox.max().x(), bbox.max().y(), bbox.max().z()));
+    metadata["voxel_size"] =
+        py::make_tuple(voxel_size.x(), voxel_size.y(), voxel_size.z());
+    metadata["background"] = background;
+    return metadata;
+}
+
+/// Read a single FloatGrid from a .vdb file. With delay_load the voxel values
+/// are only read from disk when accessed. If a world-space bbox is given,
+/// (xmin, ymin, zmin, xmax, ymax, zmax), the grid is clipped while reading it
+/// and the rest of the file is never loaded.
+inline openvdb::FloatGrid::Ptr ReadFloatGrid(const std::string& filename,
+                                             const std::string& grid_name,
+                                             const std::vector<double>& bbox,
+                                             bool delay_load) {
+    if (!bbox.empty() && bbox.size() != 6) {
+        throw std::invalid_argument("bbox must have 6 values");
+    }
+    openvdb::initialize();
+    openvdb::io::File file(filename);
+    openvdb::GridBase::Ptr grid;
+    {
+        py::gil_scoped_release release;
+        ThreadArena::Instance().Execute([&] {
+            file.open(delay_load);
+            const auto name = GridNameOrFirst(file, grid_name);
+            if (bbox.empty()) {
+                grid = file.readGrid(name);
+            } else {
+                grid = file.readGrid(
+                    name,
+                    openvdb::BBoxd(openvdb::Vec3d(bbox[0], bbox[1], bbox[2]),
+                                   openvdb::Vec3d(bbox[3], bbox[4], bbox[5])));
+            }
+            file.close();
+        });
+    }
+    auto float_grid = openvdb::gridPtrCast<openvdb::FloatGrid>(grid);
+    if (!float_grid) {
+        throw std::invalid_argument("GridType: '" + grid->valueType() +
+                                    "' not supported");
+    }
+    return float_grid;
+}
+
+/// Convert several closed triangle meshes (tiles) into level sets sharing the
+/// same transform, concurrently, and merge them with a CSG union. The result is
+/// the level set of the union of all the tiles, the narrow bands overlapping
+/// other tiles are resolved by the union.
+inline openvdb::FloatGrid::Ptr MeshToLevelSetTiles(
+    const std::vector<py::array_t<float, py::array::c_style |
+                                            py::array::forcecast>>& points,
+    const std::vector<py::array_t<int32_t, py::array::c_style |
+                                               py::array::forcecast>>&
+        triangles,
+    double voxel_size,
+    float half_width) {
+    const std::size_t num_tiles = points.size();
+    if (num_tiles == 0 || triangles.size() != num_tiles) {
+        throw std::invalid_argument(
+            "points and triangles must be non-empty lists of the same size");
+    }
+    openvdb::initialize();
+    const auto transform =
+        openvdb::math::Transform::createLinearTransform(voxel_size);
+
+    // Copy the inputs while holding the GIL
+    std::vector<std::vector<openvdb::Vec3s>> tile_points(num_tiles);
+    std::vector<std::vector<openvdb::Vec3I>> tile_triangles(num_tiles);
+    for (std::size_t t = 0; t < num_tiles; ++t) {
+        if (points[t].ndim() != 2 || points[t].shape(1) != 3 ||
+            triangles[t].ndim() != 2 || triangles[t].shape(1) != 3) {
+            throw std::invalid_argument(
+                "points and triangles must be (N, 3) arrays");
+        }
+        auto p = points[t].unchecked<2>();
+        auto f = triangles[t].unchecked<2>();
+        tile_points[t].reserve(p.shape(0));
+        for (py::ssize_t i = 0; i < p.shape(0); ++i) {
+            tile_points[t].emplace_back(p(i, 0), p(i, 1), p(i, 2));
+        }
+        tile_triangles[t].reserve(f.shape(0));
+        for (py::ssize_t i = 0; i < f.shape(0); ++i) {
+            tile_triangles[t].emplace_back(f(i, 0), f(i, 1), f(i, 2));
+        }
+    }
+
+    std::vector<openvdb::FloatGrid::Ptr> grids(num_tiles);
+    {
+        py::gil_scoped_release release;
+        ThreadArena::Instance().Execute([&] {
+            tbb::parallel_for(std::size_t(0), num_tiles, [&](std::size_t t) {
+                grids[t] = openvdb::tools::meshToLevelSet<openvdb::FloatGrid>(
+                    *transform, tile_points[t], tile_triangles[t], half_width);
+                std::vector<openvdb::Vec3s>().swap(tile_points[t]);
+                std::vector<openvdb::Vec3I>().swap(tile_triangles[t]);
+            });
+
+            // Pairwise reduction, the union empties the second grid of each
+            // pair
+            for (std::size_t step = 1; step < num_tiles; step *= 2) {
+                const std::size_t num_pairs = (num_tiles - 1) / (2 * step) + 1;
+                tbb::parallel_for(
+                    std::size_t(0), num_pairs, [&](std::size_t n) {
+                        const std::size_t a = 2 * step * n, b = a + step;
+                        if (b < num_tiles) {
+                            openvdb::tools::csgUnion(*grids[a], *grids[b]);
+                            grids[b].reset();
+                        }
+                    });
+            }
+            openvdb::tools::signedFloodFill(grids[0]->tree());
+        });
+    }
+    return grids[0];
+}
+
 }  // namespace vdb_to_numpy
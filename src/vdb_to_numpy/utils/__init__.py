@@ -1,3 +1,32 @@
-from .mesh_processing import *
-from .mesher import extract_mesh
-from .serialization import SerializableMesh
+import importlib
+
+from .batch import MESH_EXTENSIONS, Manifest, file_digest, is_up_to_date, list_input_files
+from .batch import run_batch
+from .cache import ArrayCache, array_digest
+from .profiling import PROFILE_ENV_VAR, Profiler, get_profiler, profiled, profiling, stage
+from .shared_memory import SharedArrayHandle, SharedArrays
+from .threads import get_num_threads, set_num_threads, thread_limit
+
+# These modules need manifold, open3d or skimage, they are only imported when first used (PEP 562)
+_LAZY_ATTRIBUTES = {
+    "scale_vertices_to_unit_sphere": ".mesh_processing",
+    "scale_vertices_to_unit_cube": ".mesh_processing",
+    "scale_to_unit_sphere": ".mesh_processing",
+    "scale_to_unit_cube": ".mesh_processing",
+    "watertight_mesh": ".mesh_processing",
+    "preprocess_mesh": ".mesh_processing",
+    "extract_mesh": ".mesher",
+    "SerializableMesh": ".serialization",
+}
+
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError("module '{}' has no attribute '{}'".format(__name__, name))
+    value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
@@ -0,0 +1,222 @@
+import collections
+import hashlib
+import json
+import multiprocessing
+import multiprocessing.connection
+import os
+import signal
+import time
+
+# Mesh formats read by open3d.io.read_triangle_mesh, see list_input_files
+MESH_EXTENSIONS = (".ply", ".obj", ".off", ".stl", ".gltf", ".glb")
+
+
+class Manifest:
+    """Append-only record of the finished jobs, one JSON line per input file.
+
+    Reruns use it to skip the inputs whose outputs were already produced. Only the parent process
+    writes to it, so it's safe to use with a process pool.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.records = {}
+        if os.path.exists(filename):
+            with open(filename) as manifest:
+                for line in manifest:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # a partially written line, e.g. after a crash
+                    self.records[record["input"]] = record
+
+    def is_done(self, filename, check_digest=False):
+        """True if the input finished successfully and all its outputs are still there.
+
+        If check_digest is set, the content of the input must also be the same, see run_batch.
+        """
+        record = self.records.get(os.path.abspath(filename))
+        if record is None or record["status"] != "ok":
+            return False
+        if check_digest and record.get("digest") != file_digest(filename):
+            return False
+        return all(os.path.exists(output) for output in record["outputs"])
+
+    def add(self, record):
+        self.records[record["input"]] = record
+        with open(self.filename, "a") as manifest:
+            manifest.write(json.dumps(record) + "\n")
+
+
+def list_input_files(path, extensions):
+    """List the files to process, path can be a file, a directory or a .txt list of files."""
+    path = os.path.abspath(path)
+    if os.path.isdir(path):
+        return sorted(
+            os.path.join(dirpath, filename)
+            for dirpath, _, filenames in os.walk(path)
+            for filename in filenames
+            if os.path.splitext(filename)[-1].lower() in extensions
+        )
+    if os.path.splitext(path)[-1] == ".txt":
+        base_dir = os.path.dirname(path)
+        with open(path) as file_list:
+            lines = [line.strip() for line in file_list]
+        return [os.path.join(base_dir, line) for line in lines if line and not line.startswith("#")]
+    return [path]
+
+
+def file_digest(filename, chunk_size=1 << 20):
+    """SHA-1 hex digest of the content of a file."""
+    digest = hashlib.sha1()
+    with open(filename, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def is_up_to_date(input_file, output_file):
+    """True if the output exists and was modified after the input."""
+    if not os.path.exists(output_file):
+        return False
+    return os.path.getmtime(output_file) >= os.path.getmtime(input_file)
+
+
+def _raise_timeout(signum, frame):
+    raise TimeoutError
+
+
+def _failed_record(filename, status, error, digest, seconds):
+    return {
+        "input": filename,
+        "status": status,
+        "outputs": [],
+        "error": error,
+        "digest": file_digest(filename) if digest else None,
+        "seconds": seconds,
+    }
+
+
+def _run_job(func, filename, timeout, digest):
+    """Run func(filename) and report how it went, never raises.
+
+    The timeout uses SIGALRM, which only fires once the job returns to the interpreter, so it's
+    only used when the jobs run in the calling process, see run_batch.
+    """
+    record = {"input": filename, "status": "ok", "outputs": [], "error": None}
+    record["digest"] = file_digest(filename) if digest else None
+    start = time.perf_counter()
+    if timeout:
+        previous_handler = signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        record["outputs"] = [os.path.abspath(output) for output in func(filename)]
+    except TimeoutError:
+        record["status"] = "timeout"
+    except Exception as error:
+        record["status"] = "error"
+        record["error"] = repr(error)
+    finally:
+        if timeout:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous_handler)
+    record["seconds"] = time.perf_counter() - start
+    return record
+
+
+def _job_process(func, filename, digest, connection):
+    connection.send(_run_job(func, filename, None, digest))
+    connection.close()
+
+
+def _mp_context():
+    # Forking inherits the imports of the parent, so the jobs don't pay them again
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context()
+
+
+def _run_processes(func, filenames, workers, timeout, digest):
+    """Run each job in its own process, killing the ones that exceed the timeout.
+
+    The timeout is enforced by the parent, so it also stops jobs stuck in native code, and a
+    worker that crashes (a segfault, the OOM killer) only fails its own job.
+    """
+    context = _mp_context()
+    pending = collections.deque(filenames)
+    running = {}  # connection -> (process, filename, start)
+    try:
+        while pending or running:
+            while pending and len(running) < workers:
+                filename = pending.popleft()
+                receiver, sender = context.Pipe(duplex=False)
+                process = context.Process(
+                    target=_job_process, args=(func, filename, digest, sender), daemon=True
+                )
+                process.start()
+                sender.close()
+                running[receiver] = (process, filename, time.perf_counter())
+
+            wait_timeout = None
+            if timeout:
+                first_start = min(start for _, _, start in running.values())
+                wait_timeout = max(0.0, first_start + timeout - time.perf_counter())
+            ready = multiprocessing.connection.wait(list(running), wait_timeout)
+
+            now = time.perf_counter()
+            for connection in list(running):
+                process, filename, start = running[connection]
+                if connection in ready:
+                    try:
+                        record = connection.recv()
+                    except EOFError:
+                        # The worker died without reporting, e.g. killed by a signal
+                        process.join()
+                        error = "Worker exited with code {}".format(process.exitcode)
+                        record = _failed_record(filename, "error", error, digest, now - start)
+                elif timeout and now - start >= timeout:
+                    process.kill()
+                    record = _failed_record(filename, "timeout", None, digest, now - start)
+                else:
+                    continue
+                process.join()
+                connection.close()
+                del running[connection]
+                yield record
+    finally:
+        for connection, (process, _, _) in running.items():
+            process.kill()
+            process.join()
+            connection.close()
+
+
+def run_batch(func, filenames, workers=None, timeout=None, manifest=None, digest=False):
+    """Run func over all the input filenames in worker processes.
+
+    func must be a picklable callable that takes one input filename and returns the list of output
+    files it wrote. Each job runs in its own process, forked from the parent so the heavy imports
+    of the parent process are paid only once, and can be limited to timeout seconds. Jobs that
+    time out are killed, even inside native code, and jobs whose worker crashes are recorded as
+    errors, without stopping the batch. With a single worker, the jobs run in the calling process
+    and the timeout only interrupts Python code.
+
+    If a Manifest is provided, the inputs that already finished are skipped and every finished job
+    is recorded. If digest is set, the content hash of each input is also recorded, and inputs that
+    changed are not skipped.
+
+    Yields one record (a dict with the input, status, outputs, error and seconds) per finished job,
+    in completion order.
+    """
+    filenames = [os.path.abspath(filename) for filename in filenames]
+    if manifest is not None:
+        filenames = [f for f in filenames if not manifest.is_done(f, check_digest=digest)]
+
+    workers = workers or os.cpu_count()
+    if workers == 1:
+        records = (_run_job(func, filename, timeout, digest) for filename in filenames)
+    else:
+        records = _run_processes(func, filenames, workers, timeout, digest)
+    for record in records:
+        if manifest is not None:
+            manifest.add(record)
+        yield record
@@ -0,0 +1,97 @@
+import fcntl
+import hashlib
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+
+def array_digest(*arrays, **params):
+    """SHA-1 hex digest of the content, dtype and shape of the arrays plus some extra params."""
+    digest = hashlib.sha1()
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        digest.update(str((array.dtype.str, array.shape)).encode())
+        digest.update(array.data)
+    digest.update(repr(sorted(params.items())).encode())
+    return digest.hexdigest()
+
+
+class ArrayCache:
+    """On-disk, content-addressed cache of numpy arrays with a LRU size limit.
+
+    Each entry is a directory of .npy files, so cache hits can be memory-mapped. Entries are
+    written to a temporary directory and atomically renamed into place, concurrent readers never
+    see a partial entry and concurrent writers of the same key are harmless. This makes it safe to
+    share the same cache between processes, runs and worker pools.
+
+    When the cache grows above max_bytes the least recently used entries are removed.
+    """
+
+    def __init__(self, directory, max_bytes=4 * 1024**3):
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _entry_path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def __contains__(self, key):
+        return os.path.isdir(self._entry_path(key))
+
+    def get(self, key, mmap_mode=None):
+        """Returns the dict of arrays stored under key, or None on a cache miss."""
+        entry_path = self._entry_path(key)
+        try:
+            arrays = {
+                os.path.splitext(filename)[0]: np.load(
+                    os.path.join(entry_path, filename), mmap_mode=mmap_mode
+                )
+                for filename in os.listdir(entry_path)
+            }
+            # Mark the entry as recently used
+            os.utime(entry_path)
+        except FileNotFoundError:
+            return None  # Not there, or evicted while reading it
+        return arrays
+
+    def put(self, key, **arrays):
+        """Store the arrays under key, e.g. cache.put(key, vertices=vertices)."""
+        entry_path = self._entry_path(key)
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        tmp_path = tempfile.mkdtemp(dir=self.directory, prefix=".tmp_")
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp_path, name + ".npy"), array)
+        try:
+            os.rename(tmp_path, entry_path)
+        except OSError:
+            shutil.rmtree(tmp_path)  # someone else already stored the same key
+        if self.max_bytes is not None:
+            self.evict()
+
+    def evict(self):
+        """Remove the least recently used entries until the cache fits in max_bytes."""
+        with open(os.path.join(self.directory, ".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            entries, total_bytes = [], 0
+            for entry in self._entries():
+                try:
+                    size = sum(f.stat().st_size for f in os.scandir(entry.path))
+                    entries.append((entry.stat().st_mtime, size, entry.path))
+                except FileNotFoundError:
+                    continue
+                total_bytes += size
+            for _, size, entry_path in sorted(entries):
+                if total_bytes <= self.max_bytes:
+                    break
+                # Rename first, so the entry disappears at once for the readers
+                tmp_path = tempfile.mkdtemp(dir=self.directory, prefix=".tmp_")
+                os.rename(entry_path, os.path.join(tmp_path, "entry"))
+                shutil.rmtree(tmp_path)
+                total_bytes -= size
+
+    def _entries(self):
+        for prefix in os.scandir(self.directory):
+            if prefix.is_dir() and not prefix.name.startswith("."):
+                yield from os.scandir(prefix.path)
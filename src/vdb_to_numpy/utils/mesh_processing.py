@@ -1,59 +1,98 @@
-import copy
-
 import manifold
 import numpy as np
 import open3d as o3d
 
+from .cache import array_digest
+from .profiling import profiled
+
+
+def scale_vertices_to_unit_sphere(vertices, scale=1, padding=0.1):
+    """Scale the (N, 3) vertices into a unit sphere, returns a new array."""
+    vertices = np.asarray(vertices)
+    center = (vertices.min(axis=0) + vertices.max(axis=0)) / 2
+    scaled_vertices = vertices - center
+    radius = np.sqrt(np.max(np.einsum("ij,ij->i", scaled_vertices, scaled_vertices)))
+    scaled_vertices *= scale * (1 - padding) / radius
+    return scaled_vertices
+
+
+def scale_vertices_to_unit_cube(vertices, scale=1, padding=0.1):
+    """Scale the (N, 3) vertices into a unit cube, returns a new array."""
+    vertices = np.asarray(vertices)
+    min_bound, max_bound = vertices.min(axis=0), vertices.max(axis=0)
+    scaled_vertices = vertices - (min_bound + max_bound) / 2
+    scaled_vertices *= scale * (1 - padding) * 2 / np.max(max_bound - min_bound)
+    return scaled_vertices
+
+
+def _with_vertices(mesh, vertices):
+    """Copy of the mesh with new vertices, without deep copying the whole Open3D mesh.
+
+    Only meant for similarity transforms, normals and colors are kept as they are. The texture
+    coordinates, textures and material ids are kept too, so textured meshes can be written back.
+    """
+    new_mesh = o3d.geometry.TriangleMesh(o3d.utility.Vector3dVector(vertices), mesh.triangles)
+    if mesh.has_vertex_normals():
+        new_mesh.vertex_normals = mesh.vertex_normals
+    if mesh.has_vertex_colors():
+        new_mesh.vertex_colors = mesh.vertex_colors
+    if mesh.has_triangle_normals():
+        new_mesh.triangle_normals = mesh.triangle_normals
+    if mesh.has_triangle_uvs():
+        new_mesh.triangle_uvs = mesh.triangle_uvs
+    if mesh.has_textures():
+        new_mesh.textures = mesh.textures
+    if mesh.has_triangle_material_ids():
+        new_mesh.triangle_material_ids = mesh.triangle_material_ids
+    return new_mesh
+
 
 def scale_to_unit_sphere(mesh, scale=1, padding=0.1):
     """Scale the input mesh into a unit sphere."""
-    # Get bbox of original mesh
-    bbox = mesh.get_axis_aligned_bounding_box()
-
-    # Translate the mesh
-    scaled_mesh = copy.deepcopy(mesh)
-    scaled_mesh.translate(-bbox.get_center())
-    distances = np.linalg.norm(np.asarray(scaled_mesh.vertices), axis=1)
-    scaled_mesh.scale(1 / np.max(distances), center=[0, 0, 0])
-    scaled_mesh.scale(scale * (1 - padding), center=[0, 0, 0])
-    return scaled_mesh
+    vertices = scale_vertices_to_unit_sphere(mesh.vertices, scale, padding)
+    return _with_vertices(mesh, vertices)
 
 
 def scale_to_unit_cube(mesh, scale=1, padding=0.1):
     """Scale the input mesh into a unit cube."""
-    # Get bbox of original mesh
-    bbox = mesh.get_axis_aligned_bounding_box()
-
-    # Translate the mesh
-    scaled_mesh = copy.deepcopy(mesh)
-    scaled_mesh.translate(-bbox.get_center())
-    scaled_mesh.scale(2 / bbox.get_max_extent(), center=[0, 0, 0])
-    scaled_mesh.scale(scale * (1 - padding), center=[0, 0, 0])
-    return scaled_mesh
-
-
-def watertight_mesh(mesh, depth=8):
-    """Conver the input mesh to a watertight model."""
-    processor = manifold.Processor(
-        np.asarray(mesh.vertices),
-        np.asarray(mesh.triangles),
-    )
+    vertices = scale_vertices_to_unit_cube(mesh.vertices, scale, padding)
+    return _with_vertices(mesh, vertices)
+
+
+@profiled(items=lambda mesh: len(mesh.triangles))
+def watertight_mesh(mesh, depth=8, cache=None):
+    """Conver the input mesh to a watertight model.
+
+    If an ArrayCache is provided, the results are reused for the same input mesh and depth.
+    """
+    vertices, triangles = np.asarray(mesh.vertices), np.asarray(mesh.triangles)
+    if cache is not None:
+        key = array_digest(vertices, triangles, op="watertight_mesh", depth=depth)
+    cached = cache.get(key) if cache is not None else None
+    if cached is not None:
+        output_vertices, output_triangles = cached["vertices"], cached["triangles"]
+    else:
+        processor = manifold.Processor(vertices, triangles)
+        output_vertices, output_triangles = processor.get_manifold_mesh(depth)
+        if cache is not None:
+            cache.put(key, vertices=output_vertices, triangles=output_triangles)
 
-    output_vertices, output_triangles = processor.get_manifold_mesh(depth)
     return o3d.geometry.TriangleMesh(
         o3d.utility.Vector3dVector(output_vertices),
         o3d.utility.Vector3iVector(output_triangles),
     )
 
 
-def preprocess_mesh(mesh, scale=False, watertight=False):
+@profiled(items=lambda mesh: len(mesh.triangles))
+def preprocess_mesh(mesh, scale=False, watertight=False, cache=None):
     """The mesh MUST be a closed surface, but not necessary watertight and can
     also contain self-intersecting faces, in contrast to most of mesh-to-sdf
     algorithms.
 
-    Scaling is not mandatory, but it's for your own sanity
+    Scaling is not mandatory, but it's for your own sanity. The watertight
+    meshes can be reused across runs through an ArrayCache.
     """
     mesh = scale_to_unit_sphere(mesh) if scale else mesh
-    mesh = watertight_mesh(mesh) if watertight else mesh
+    mesh = watertight_mesh(mesh, cache=cache) if watertight else mesh
     mesh.compute_vertex_normals()
     return mesh
@@ -2,7 +2,10 @@ import numpy as np
 import open3d as o3d
 from skimage.measure import marching_cubes
 
+from .profiling import profiled
 
+
+@profiled(items=lambda mesh: len(mesh.triangles))
 def extract_mesh(volume, mask=None):
     """Run marching_cubes and extract a triangular mesh of the volume.
 
@@ -0,0 +1,233 @@
+"""Stage-level timing and memory instrumentation.
+
+The stages of the conversion pipeline (mesh_to_level_set, extract_leaf_arrays, save_sdf, ...) are
+wrapped with @profiled. While profiling is disabled, the default, this only costs a global lookup
+per call. Enable it for a block of code with the profiling() context manager:
+
+    with profiling("profile.json") as profiler:
+        mesh_to_sdf(...)
+    print(profiler.summary())
+
+or for a whole process by setting VDB_TO_NUMPY_PROFILE, to 1 to print a summary on exit, or to a
+.json/.csv filename to save the stages there ("{pid}" is replaced by the process id, for workers).
+"""
+import atexit
+from collections import OrderedDict
+from contextlib import contextmanager
+import csv
+import functools
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from typing import Callable, Optional
+
+PROFILE_ENV_VAR = "VDB_TO_NUMPY_PROFILE"
+
+# Columns of Profiler.records(), in this order in the CSV output
+PROFILE_FIELDS = (
+    "stage",
+    "calls",
+    "wall_seconds",
+    "cpu_seconds",
+    "items",
+    "items_per_second",
+    "peak_rss_mb",
+    "rss_increase_mb",
+)
+
+# The active Profiler, None when profiling is disabled
+_profiler = None
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far, in MB."""
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 1024**2
+
+
+class Profiler:
+    """Accumulate the wall time, CPU time, peak RSS and processed items of each stage.
+
+    The CPU time is the one of the whole process, including the native threads, so the ratio
+    cpu_seconds / wall_seconds tells how well a stage runs in parallel. Nested stages are also
+    accounted in their parent stage. rss_increase_mb is the largest growth of the peak RSS seen
+    during a single call, the memory a stage needs on top of what the process already used.
+    """
+
+    def __init__(self):
+        self.stages = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, name, wall_seconds, cpu_seconds, items, rss_before, rss_after):
+        with self._lock:
+            stats = self.stages.setdefault(
+                name,
+                {"calls": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0, "items": 0},
+            )
+            stats["calls"] += 1
+            stats["wall_seconds"] += wall_seconds
+            stats["cpu_seconds"] += cpu_seconds
+            stats["items"] += items
+            stats["peak_rss_mb"] = rss_after
+            stats["rss_increase_mb"] = max(
+                stats.get("rss_increase_mb", 0.0), rss_after - rss_before
+            )
+
+    def records(self) -> list:
+        """One dict per stage, with the PROFILE_FIELDS keys, in order of first completion."""
+        with self._lock:
+            stages = [(name, dict(stats)) for name, stats in self.stages.items()]
+        records = []
+        for name, stats in stages:
+            wall_seconds = stats["wall_seconds"]
+            stats["items_per_second"] = stats["items"] / wall_seconds if wall_seconds else 0.0
+            records.append({field: stats.get(field, name) for field in PROFILE_FIELDS})
+        return records
+
+    def summary(self) -> str:
+        """Human readable table of the stages."""
+        lines = [
+            "{:<32s} {:>6s} {:>10s} {:>10s} {:>12s} {:>14s} {:>10s} {:>10s}".format(
+                "stage",
+                "calls",
+                "wall [s]",
+                "cpu [s]",
+                "items",
+                "items/s",
+                "peak [MB]",
+                "+rss [MB]",
+            )
+        ]
+        for record in self.records():
+            lines.append(
+                "{stage:<32s} {calls:>6d} {wall_seconds:>10.3f} {cpu_seconds:>10.3f} {items:>12d} "
+                "{items_per_second:>14.1f} {peak_rss_mb:>10.1f} {rss_increase_mb:>10.1f}".format(
+                    **record
+                )
+            )
+        return "\n".join(lines)
+
+    def save(self, filename: str):
+        """Save the stage records as JSON or CSV, depending on the extension of filename."""
+        filename = filename.replace("{pid}", str(os.getpid()))
+        if filename.endswith(".csv"):
+            with open(filename, "w", newline="") as csv_file:
+                writer = csv.DictWriter(csv_file, fieldnames=PROFILE_FIELDS)
+                writer.writeheader()
+                writer.writerows(self.records())
+        else:
+            with open(filename, "w") as json_file:
+                json.dump({"pid": os.getpid(), "stages": self.records()}, json_file, indent=2)
+
+
+class _Stage:
+    """Measure one call of a stage, set items inside the block to report the processed items."""
+
+    def __init__(self, profiler, name, items=0):
+        self.profiler, self.name, self.items = profiler, name, items
+
+    def __enter__(self):
+        self._rss = peak_rss_mb()
+        self._cpu = time.process_time()
+        self._wall = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        wall_seconds = time.perf_counter() - self._wall
+        cpu_seconds = time.process_time() - self._cpu
+        self.profiler.add(
+            self.name, wall_seconds, cpu_seconds, int(self.items), self._rss, peak_rss_mb()
+        )
+
+
+class _NullStage:
+    """What stage() returns while profiling is disabled, does nothing."""
+
+    items = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+def stage(name: str, items: int = 0):
+    """Context manager measuring a block of code as a stage of the active profiler, if any.
+
+    The processed items can be given upfront or set on the yielded object:
+
+        with stage("read_meshes") as record:
+            meshes = read_meshes(filenames)
+            record.items = len(meshes)
+    """
+    if _profiler is None:
+        return _NULL_STAGE
+    return _Stage(_profiler, name, items)
+
+
+def profiled(name: Optional[str] = None, items: Optional[Callable] = None):
+    """Decorator measuring each call of the function as a stage, named after it by default.
+
+    items, if given, computes the number of processed items from the return value.
+    """
+
+    def decorator(func):
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _profiler is None:
+                return func(*args, **kwargs)
+            with _Stage(_profiler, stage_name) as record:
+                result = func(*args, **kwargs)
+                record.items = items(result) if items is not None else 0
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def get_profiler() -> Optional[Profiler]:
+    """The active Profiler, None if profiling is disabled."""
+    return _profiler
+
+
+@contextmanager
+def profiling(output: Optional[str] = None):
+    """Enable profiling inside the block, yields the Profiler collecting the stages.
+
+    If output is given, the stages are saved there on exit, see Profiler.save.
+    """
+    global _profiler
+    previous, _profiler = _profiler, Profiler()
+    profiler = _profiler
+    try:
+        yield profiler
+    finally:
+        _profiler = previous
+        if output:
+            profiler.save(output)
+
+
+def _profile_from_env():
+    global _profiler
+    output = os.environ.get(PROFILE_ENV_VAR, "")
+    if output.lower() in ("", "0", "false"):
+        return
+    _profiler = profiler = Profiler()
+    if output.lower() in ("1", "true"):
+        atexit.register(lambda: print(profiler.summary(), file=sys.stderr))
+    else:
+        atexit.register(profiler.save, output)
+
+
+_profile_from_env()
@@ -1,12 +1,53 @@
 import numpy as np
 import open3d as o3d
 
+from .shared_memory import SharedArrays
+
 
 class SerializableMesh:
+    # Set by share_memory()
+    _shared_arrays = None
+
     def __init__(self, mesh: o3d.geometry.TriangleMesh):
         self.vertices = np.asarray(mesh.vertices)
         self.triangles = np.asarray(mesh.triangles)
 
+    @classmethod
+    def from_arrays(cls, vertices, triangles):
+        """Create a SerializableMesh from its arrays, without copying them."""
+        mesh = cls.__new__(cls)
+        mesh.vertices, mesh.triangles = vertices, triangles
+        return mesh
+
+    def share_memory(self) -> "SerializableMesh":
+        """Move the vertices and triangles to shared memory, see LeafNodeGrid.share_memory."""
+        if self._shared_arrays is None:
+            arrays = {"vertices": self.vertices, "triangles": self.triangles}
+            self._shared_arrays = SharedArrays.create(arrays)
+            self.vertices = self._shared_arrays.arrays["vertices"]
+            self.triangles = self._shared_arrays.arrays["triangles"]
+        return self
+
+    def close_shared_memory(self):
+        """Copy the arrays back to private memory and release the shared memory."""
+        if self._shared_arrays is not None:
+            self.vertices, self.triangles = np.array(self.vertices), np.array(self.triangles)
+            self._shared_arrays.close()
+            self._shared_arrays = None
+
+    @classmethod
+    def _attach_shared_memory(cls, handles):
+        shared_arrays = SharedArrays.attach(handles)
+        mesh = cls.from_arrays(**shared_arrays.arrays)
+        mesh._shared_arrays = shared_arrays
+        return mesh
+
+    def __reduce_ex__(self, protocol):
+        """Out-of-band pickling with protocol 5, or shared memory names after share_memory()."""
+        if self._shared_arrays is not None:
+            return type(self)._attach_shared_memory, (self._shared_arrays.handles(),)
+        return type(self).from_arrays, (np.asarray(self.vertices), np.asarray(self.triangles))
+
     def as_open3d(self) -> o3d.geometry.TriangleMesh:
         return o3d.geometry.TriangleMesh(
             vertices=o3d.utility.Vector3dVector(self.vertices),
@@ -0,0 +1,80 @@
+import sys
+import threading
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, NamedTuple, Tuple
+
+import numpy as np
+
+_untracked_lock = threading.Lock()
+
+
+def _attach_block(name: str) -> SharedMemory:
+    """Open an existing block without tracking it, only its owner may unlink it.
+
+    Otherwise the resource tracker of the attaching process destroys the block when it exits.
+    """
+    if sys.version_info >= (3, 13):
+        return SharedMemory(name=name, track=False)
+    with _untracked_lock:
+        register, resource_tracker.register = resource_tracker.register, lambda *args: None
+        try:
+            return SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+class SharedArrayHandle(NamedTuple):
+    """Everything another process needs to map a shared array, cheap to pickle."""
+
+    name: str
+    dtype: str
+    shape: Tuple[int, ...]
+
+
+class SharedArrays:
+    """A set of named numpy arrays, each one stored in a multiprocessing.shared_memory block.
+
+    The process that creates the blocks owns them, and must call close() once nobody else needs
+    them. The other processes attach() to the blocks through their handles, without copying any
+    data, and close() them when done. The arrays must not be used after close().
+    """
+
+    def __init__(self, blocks: Dict[str, SharedMemory], arrays: Dict[str, np.ndarray], owner):
+        self.blocks = blocks
+        self.arrays = arrays
+        self.owner = owner
+
+    @classmethod
+    def create(cls, arrays: Dict[str, np.ndarray]) -> "SharedArrays":
+        """Copy the arrays into new shared memory blocks."""
+        blocks, shared_arrays = {}, {}
+        for name, array in arrays.items():
+            block = SharedMemory(create=True, size=max(array.nbytes, 1))
+            shared_arrays[name] = np.ndarray(array.shape, array.dtype, buffer=block.buf)
+            shared_arrays[name][...] = array
+            blocks[name] = block
+        return cls(blocks, shared_arrays, owner=True)
+
+    @classmethod
+    def attach(cls, handles: Dict[str, SharedArrayHandle]) -> "SharedArrays":
+        """Map the shared memory blocks created by another process."""
+        blocks, arrays = {}, {}
+        for name, handle in handles.items():
+            blocks[name] = _attach_block(handle.name)
+            arrays[name] = np.ndarray(handle.shape, handle.dtype, buffer=blocks[name].buf)
+        return cls(blocks, arrays, owner=False)
+
+    def handles(self) -> Dict[str, SharedArrayHandle]:
+        return {
+            name: SharedArrayHandle(self.blocks[name].name, array.dtype.str, array.shape)
+            for name, array in self.arrays.items()
+        }
+
+    def close(self):
+        """Release the shared memory blocks, the owner also destroys them."""
+        self.arrays.clear()
+        for block in self.blocks.values():
+            block.close()
+            block.unlink() if self.owner else None
+        self.blocks.clear()
@@ -0,0 +1,61 @@
+"""Number of threads used by the native code.
+
+All the vdb_pybind entry points run their parallel work in a single TBB arena, whose size is set
+with set_num_threads. By default it's taken from VDB_TO_NUMPY_NUM_THREADS, or OMP_NUM_THREADS, when
+the package is imported, otherwise TBB uses all the cores. Inside DataLoader workers, limit each
+worker with set_num_threads in the worker_init_fn, or temporarily with the thread_limit context
+manager. The pyopenvdb methods, e.g. FloatGrid.createLevelSetFromPolygons, are not limited.
+"""
+from contextlib import contextmanager
+import os
+from typing import Optional
+import warnings
+
+from ..pybind import vdb_pybind
+
+# Read in this order when the package is imported, the first one set wins
+NUM_THREADS_ENV_VARS = ("VDB_TO_NUMPY_NUM_THREADS", "OMP_NUM_THREADS")
+
+
+def set_num_threads(num_threads: Optional[int]) -> None:
+    """Limit the native code to num_threads, None or 0 restores the default, all the cores."""
+    num_threads = num_threads or 0
+    if num_threads < 0:
+        raise ValueError(
+            "num_threads must be non-negative (0 = default), got {}".format(num_threads)
+        )
+    vdb_pybind._set_num_threads(num_threads)
+
+
+def get_num_threads() -> int:
+    """Number of threads the native code currently runs with."""
+    return vdb_pybind._get_num_threads()
+
+
+@contextmanager
+def thread_limit(num_threads: Optional[int]):
+    """Run the native code inside the block with num_threads, restores the previous setting."""
+    previous = vdb_pybind._get_num_threads(setting=True)
+    set_num_threads(num_threads)
+    try:
+        yield
+    finally:
+        vdb_pybind._set_num_threads(previous)
+
+
+def num_threads_from_env() -> Optional[int]:
+    """The number of threads requested by the NUM_THREADS_ENV_VARS, None if not set."""
+    for env_var in NUM_THREADS_ENV_VARS:
+        value = os.environ.get(env_var, "").strip()
+        if value:
+            # OMP_NUM_THREADS can be a list for nested regions, the first level is the one we use
+            try:
+                return max(int(value.split(",")[0]), 0)
+            except ValueError:
+                warnings.warn("Ignoring {}={}, not a number of threads".format(env_var, value))
+    return None
+
+
+_env_num_threads = num_threads_from_env()
+if _env_num_threads:
+    set_num_threads(_env_num_threads)
@@ -1 +1,2 @@
 from .vdb_tools import *
+from .sdf_io import SDF_DTYPES, SDF_FORMATS, load_sdf, quantize_volume, save_sdf
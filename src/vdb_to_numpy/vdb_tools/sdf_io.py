@@ -0,0 +1,127 @@
+import json
+import os
+from typing import Tuple
+
+import numpy as np
+import pyopenvdb as vdb
+
+from ..grid_wrappers.leaf_node_grid import LeafNodeGrid
+from ..utils.profiling import profiled
+from .vdb_tools import level_set_to_numpy
+
+# Output formats of save_sdf, see the README for their size and throughput
+SDF_FORMATS = ("npy", "npz", "chunked", "leaves")
+SDF_DTYPES = ("float32", "float16", "int16", "int8")
+
+
+def quantize_volume(volume: np.ndarray, value_range: float, dtype) -> Tuple[np.ndarray, float]:
+    """Store volume in dtype, returns the stored array and the scale, volume ~= stored * scale.
+
+    For integer types the full range of the type covers [-value_range, +value_range].
+    """
+    dtype = np.dtype(dtype)
+    if not np.issubdtype(dtype, np.integer):
+        return volume.astype(dtype), 1.0
+    max_value = np.iinfo(dtype).max
+    scale = float(value_range) / max_value
+    stored = np.clip(np.rint(volume / scale), -max_value, max_value).astype(dtype)
+    return stored, scale
+
+
+@profiled()
+def save_sdf(
+    filename: str, vdb_grid: vdb.FloatGrid, format: str = "npy", dtype=np.float32, chunk_size=64
+) -> str:
+    """Save a level set to filename (without extension) in one of the SDF_FORMATS.
+
+    - npy: the dense float volume of the active bbox, as np.save, without metadata.
+    - npz: the same dense volume, zlib compressed, plus its origin, voxel_size and scale.
+    - chunked: a directory of chunk_size^3 compressed chunks of the dense volume, the chunks with
+      a single value (far from the surface) are not stored at all.
+    - leaves: the sparse LeafNodeGrid.to_arrays() of the grid, only the leaf nodes are stored.
+
+    The values are stored in dtype, integer types are quantized over [-background, background].
+    Returns the path written, use load_sdf to read it back.
+    """
+    if format not in SDF_FORMATS:
+        raise ValueError("format: '{}' not supported, use one of {}".format(format, SDF_FORMATS))
+    if np.dtype(dtype).name not in SDF_DTYPES:
+        raise ValueError("dtype: '{}' not supported, use one of {}".format(dtype, SDF_DTYPES))
+
+    if format == "leaves":
+        path = filename + ".npz"
+        np.savez(path, **LeafNodeGrid(vdb_grid, dtype=dtype).to_arrays())
+        return path
+
+    volume, origin = level_set_to_numpy(vdb_grid)
+    if format == "npy":
+        if np.issubdtype(dtype, np.integer):
+            raise ValueError("The npy format has no room for the quantization scale, use npz")
+        path = filename + ".npy"
+        np.save(path, volume.astype(dtype))
+        return path
+
+    sdf, scale = quantize_volume(volume, vdb_grid.background, dtype)
+    metadata = {
+        "origin": list(origin),
+        "voxel_size": vdb_grid.transform.voxelSize()[0],
+        "background": vdb_grid.background,
+        "scale": scale,
+    }
+    if format == "npz":
+        path = filename + ".npz"
+        np.savez_compressed(path, sdf=sdf, metadata=json.dumps(metadata))
+        return path
+
+    path = filename + "_chunks"
+    os.makedirs(path, exist_ok=True)
+    chunks_shape = tuple(-(-dim // chunk_size) for dim in sdf.shape)
+    # The value of the chunks not written to disk, NaN for the stored ones
+    fill = np.full(chunks_shape, np.nan)
+    for chunk_idx in np.ndindex(*chunks_shape):
+        chunk = sdf[tuple(slice(i * chunk_size, (i + 1) * chunk_size) for i in chunk_idx)]
+        if (chunk == chunk.flat[0]).all():
+            fill[chunk_idx] = chunk.flat[0]
+            continue
+        np.savez_compressed(os.path.join(path, "{}.{}.{}.npz".format(*chunk_idx)), chunk=chunk)
+    np.save(os.path.join(path, "fill.npy"), fill)
+    metadata.update(shape=sdf.shape, chunk_size=chunk_size, dtype=sdf.dtype.name)
+    with open(os.path.join(path, "metadata.json"), "w") as metadata_file:
+        json.dump(metadata, metadata_file)
+    return path
+
+
+@profiled(items=lambda result: result[0].size)
+def load_sdf(path: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Read any of the files written by save_sdf as a dense float32 volume and its origin.
+
+    The origin of .npy files is unknown, (0, 0, 0) is returned. The sparse leaves format can also
+    be read without densifying it, with LeafNodeGrid.from_arrays(**np.load(path)).
+    """
+    if os.path.isdir(path):
+        with open(os.path.join(path, "metadata.json")) as metadata_file:
+            metadata = json.load(metadata_file)
+        chunk_size = metadata["chunk_size"]
+        fill = np.load(os.path.join(path, "fill.npy"))
+        sdf = np.empty(metadata["shape"], dtype=metadata["dtype"])
+        for chunk_idx in np.ndindex(*fill.shape):
+            region = tuple(slice(i * chunk_size, (i + 1) * chunk_size) for i in chunk_idx)
+            if np.isnan(fill[chunk_idx]):
+                chunk_path = os.path.join(path, "{}.{}.{}.npz".format(*chunk_idx))
+                with np.load(chunk_path) as chunk:
+                    sdf[region] = chunk["chunk"]
+            else:
+                sdf[region] = fill[chunk_idx]
+    elif path.endswith(".npy"):
+        return np.load(path).astype(np.float32), np.zeros(3)
+    else:
+        with np.load(path) as arrays:
+            if "leaf_nodes" in arrays:
+                grid = LeafNodeGrid.from_arrays(**arrays)
+                return level_set_to_numpy(grid.to_vdb())
+            sdf, metadata = arrays["sdf"], json.loads(str(arrays["metadata"]))
+
+    volume = sdf.astype(np.float32)
+    if np.issubdtype(sdf.dtype, np.integer):
+        volume *= metadata["scale"]
+    return volume, np.asarray(metadata["origin"])
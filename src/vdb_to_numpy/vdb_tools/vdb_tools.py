@@ -1,14 +1,86 @@
 import os
-from typing import Tuple
+from typing import Optional, Tuple
 
 import numpy as np
-import open3d as o3d
 import pyopenvdb as vdb
 
-from ..utils import extract_mesh
+from ..pybind import vdb_pybind
+from ..utils.profiling import profiled
 
 
-def mesh_to_level_set(mesh, voxel_size, half_width=3):
+def read_grid_metadata(filename: str, grid_name: Optional[str] = None) -> dict:
+    """Read the properties of a grid in a .vdb file (the first one if no grid_name is given).
+
+    Only the tree topology is read, the voxel values stay on disk. Returns a dict with the name,
+    value_type, gridClass, leaf_count, active_voxel_count, index-space bbox, voxel_size and
+    background (None for non-float grids) of the grid.
+    """
+    return vdb_pybind._read_grid_metadata(filename, grid_name or "")
+
+
+@profiled(items=lambda grid: grid.leafCount())
+def read_grid(
+    filename: str, grid_name: Optional[str] = None, bbox=None, delay_load: bool = True
+) -> vdb.FloatGrid:
+    """Read a single FloatGrid from a .vdb file (the first one if no grid_name is given).
+
+    Unlike vdb.readAll, the other grids of the file are never loaded. With delay_load the voxel
+    values are only read from disk when accessed. If a world-space bbox ((xmin, ymin, zmin),
+    (xmax, ymax, zmax)) is given, only the part of the grid inside it is loaded.
+    """
+    bbox = [] if bbox is None else np.asarray(bbox, dtype=np.float64).ravel().tolist()
+    return vdb_pybind._read_float_grid(filename, grid_name or "", bbox, delay_load)
+
+
+def split_mesh_into_tiles(mesh, tiles: int):
+    """Group the connected components of mesh into at most `tiles` spatially coherent tiles.
+
+    The components are sorted along the longest axis of the mesh and split into tiles with a
+    similar number of triangles. A closed surface is never split, since its level set can't be
+    computed from a part of it. The duplicated vertices are merged first, on a copy, so meshes
+    with one vertex per triangle corner (STL, many OBJ exports) keep their connectivity. Returns a
+    list of (vertices, triangles) arrays, one per tile.
+    """
+    import open3d as o3d
+
+    mesh = o3d.geometry.TriangleMesh(mesh).remove_duplicated_vertices()
+    vertices, triangles = np.asarray(mesh.vertices), np.asarray(mesh.triangles)
+    cluster_ids, cluster_sizes, _ = mesh.cluster_connected_triangles()
+    cluster_ids, cluster_sizes = np.asarray(cluster_ids), np.asarray(cluster_sizes)
+
+    axis = np.argmax(vertices.max(axis=0) - vertices.min(axis=0))
+    centers = vertices[triangles, axis].mean(axis=1)
+    cluster_centers = np.bincount(cluster_ids, weights=centers) / cluster_sizes
+    order = np.argsort(cluster_centers)
+    first_triangle = np.cumsum(cluster_sizes[order]) - cluster_sizes[order]
+    cluster_tiles = np.empty(len(order), dtype=np.int64)
+    cluster_tiles[order] = np.minimum(first_triangle * tiles // len(triangles), tiles - 1)
+
+    triangle_tiles = cluster_tiles[cluster_ids]
+    tile_meshes = []
+    for tile in np.unique(triangle_tiles):
+        used_vertices, tile_triangles = np.unique(
+            triangles[triangle_tiles == tile], return_inverse=True
+        )
+        tile_meshes.append((vertices[used_vertices], tile_triangles.reshape(-1, 3)))
+    return tile_meshes
+
+
+@profiled(items=lambda grid: grid.leafCount())
+def mesh_to_level_set(mesh, voxel_size, half_width=3, tiles=1):
+    """Convert a closed triangle mesh into a narrow-band level set.
+
+    For large meshes made of many closed surfaces, such as scenes, use tiles > 1: the mesh is
+    split into that many tiles (see split_mesh_into_tiles) that are converted concurrently, with
+    the GIL released, and merged with a CSG union. The result is the same level set, computed
+    with better parallelism.
+    """
+    tile_meshes = split_mesh_into_tiles(mesh, tiles) if tiles > 1 else []
+    if len(tile_meshes) > 1:
+        points, triangles = zip(*tile_meshes)
+        return vdb_pybind._mesh_to_level_set_tiles(
+            list(points), list(triangles), voxel_size, half_width
+        )
     return vdb.FloatGrid.createLevelSetFromPolygons(
         points=np.asarray(mesh.vertices),
         triangles=np.asarray(mesh.triangles),
@@ -18,6 +90,8 @@ def mesh_to_level_set(mesh, voxel_size, half_width=3):
 
 
 def level_set_to_triangle_mesh(grid):
+    import open3d as o3d
+
     points, quads = grid.convertToQuads()
     faces = np.array([[[f[0], f[1], f[2]], [f[0], f[2], f[3]]] for f in quads]).reshape((-1, 3))
     mesh = o3d.geometry.TriangleMesh(
@@ -29,12 +103,15 @@ def level_set_to_triangle_mesh(grid):
 
 
 def sdf_level_set_to_triangle_mesh(grid):
+    from ..utils.mesher import extract_mesh
+
     sdf_volume, origin = level_set_to_numpy(grid)
     mesh = extract_mesh(sdf_volume)
     mesh.translate(origin)
     return mesh
 
 
+@profiled(items=lambda result: result[0].size)
 def level_set_to_numpy(grid: vdb.FloatGrid) -> Tuple[np.ndarray, np.ndarray]:
     """Given an input level set (in vdb format) extract the dense array representation of the volume
     and convert it to a numpy array.
@@ -1,4 +1,4 @@
-import copy
+from concurrent.futures import ThreadPoolExecutor
 from functools import partial
 import time
 
@@ -24,16 +24,132 @@ def get_leaf_node_voxel_grid(origin, shape, color, voxel_size=1.0):
     )
 
 
+class LeafMeshCache:
+    """Triangle meshes of the leaf nodes of a LeafNodeGrid, computed ahead of time.
+
+    The meshes of the next `prefetch` leaf nodes, in the direction we are moving, are extracted
+    by a pool of background threads, so stepping through the grid only swaps already built
+    geometries. With premesh all the leaf nodes are meshed at once, otherwise only the meshes
+    around the current leaf node are kept. The meshes are in leaf node coordinates (metric
+    units, the leaf origin at zero), None for the leaf nodes without surface.
+    """
+
+    def __init__(self, grid, prefetch=8, premesh=False, workers=1):
+        self.grid = grid
+        self.prefetch = prefetch
+        self.premesh = premesh
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._meshes = {}  # idx -> Future
+        for idx in range(len(grid)) if premesh else []:
+            self._submit(idx)
+
+    def _extract(self, idx):
+        _, leaf_node = self.grid[idx]
+        try:
+            mesh = extract_mesh(leaf_node)
+        except ValueError:
+            return None  # No surface inside this leaf node
+        mesh.scale(self.grid.voxel_size, center=np.zeros(3))
+        mesh.paint_uniform_color(AIS_RED)
+        return mesh
+
+    def _submit(self, idx):
+        idx %= len(self.grid)
+        if idx not in self._meshes:
+            self._meshes[idx] = self._executor.submit(self._extract, idx)
+
+    def get(self, idx, direction=1):
+        """The mesh of the leaf node idx, then starts meshing the next ones in direction."""
+        self._submit(idx)
+        mesh = self._meshes[idx].result()
+        for step in range(1, self.prefetch + 1):
+            self._submit(idx + direction * step)
+        if not self.premesh:
+            n = len(self.grid)
+            for cached_idx in list(self._meshes):
+                if min((cached_idx - idx) % n, (idx - cached_idx) % n) > 2 * self.prefetch:
+                    del self._meshes[cached_idx]
+        return mesh
+
+
+class ReconstructionBuffer:
+    """Append-only mesh made of the leaf node meshes visited so far, each one added only once.
+
+    The reconstruction is split into chunks, Open3D meshes of at most chunk_size triangles, which
+    are the only copy of it. New leaf node meshes are appended to the last chunk, a new one is
+    started when it's full. The renderer re-uploads a whole geometry when it changes, so only the
+    last chunk is uploaded again, adding a leaf node costs at most chunk_size triangles and not the
+    size of the whole reconstruction. The chunks grow with Open3D's own vectors, not with
+    preallocated buffers.
+    """
+
+    def __init__(self, chunk_size=1 << 16):
+        self.chunk_size = chunk_size
+        self.chunks = []
+        self.leaf_ranges = {}  # leaf idx -> (chunk idx, first vertex, first triangle)
+
+    @property
+    def num_vertices(self):
+        return sum(len(chunk.vertices) for chunk in self.chunks)
+
+    @property
+    def num_triangles(self):
+        return sum(len(chunk.triangles) for chunk in self.chunks)
+
+    def add(self, idx, leaf_node_mesh, origin):
+        """Add the mesh of the leaf node idx, translated to origin, unless it's already there.
+
+        Returns the chunk that changed, None if the leaf node was already there.
+        """
+        if idx in self.leaf_ranges:
+            return None
+        if not self.chunks or len(self.chunks[-1].triangles) >= self.chunk_size:
+            self.chunks.append(o3d.geometry.TriangleMesh())
+        chunk = self.chunks[-1]
+        if not leaf_node_mesh.has_vertex_normals():
+            # Keep the normals of the chunk in step with its vertices
+            leaf_node_mesh = o3d.geometry.TriangleMesh(leaf_node_mesh).compute_vertex_normals()
+
+        num_vertices, num_triangles = len(chunk.vertices), len(chunk.triangles)
+        vertices = np.asarray(leaf_node_mesh.vertices) + origin
+        triangles = np.asarray(leaf_node_mesh.triangles) + num_vertices
+        self.leaf_ranges[idx] = (len(self.chunks) - 1, num_vertices, num_triangles)
+
+        chunk.vertices.extend(o3d.utility.Vector3dVector(vertices))
+        chunk.triangles.extend(o3d.utility.Vector3iVector(triangles))
+        chunk.vertex_normals.extend(leaf_node_mesh.vertex_normals)
+        chunk.vertex_colors.extend(o3d.utility.Vector3dVector(np.tile(AIS_RED, (len(vertices), 1))))
+        return chunk
+
+
 class LeafNodeGridVisualizer:
-    def __init__(self, grid, model, sleep_time=200e-3):
+    def __init__(self, grid, model, sleep_time=200e-3, prefetch=8, premesh=False, workers=1):
         # Store the LeafNodeGrid and the original mesh model
         self.grid = grid
         self.model = model
+        self.leaf_meshes = LeafMeshCache(grid, prefetch, premesh, workers)
+
+        # The model is translated in place for the local view, instead of copied
+        self.model_translation = np.zeros(3)
+        leaf_node_size = grid.leaf_node_shape[0] * grid.voxel_size
+        self.leaf_node_origin = o3d.geometry.TriangleMesh.create_coordinate_frame(
+            size=leaf_node_size
+        )
+        self.leaf_node_voxels = get_leaf_node_voxel_grid(
+            origin=np.zeros(3),
+            shape=grid.leaf_node_shape,
+            color=AIS_GREY,
+            voxel_size=grid.voxel_size,
+        )
 
         # Acess the leaf model from the class level
         self.camera_params = None
         self.geometries = None
-        self.reconstructed_mesh = o3d.geometry.TriangleMesh()
+        self.reconstruction = ReconstructionBuffer()
+
+        # Geometries registered in the visualizer, and the ones changed in place since then
+        self._shown_geometries = []
+        self._changed_geometries = set()
 
         # Visualizer
         self.vis = o3d.visualization.VisualizerWithKeyCallback()
@@ -64,57 +180,45 @@ class LeafNodeGridVisualizer:
         self.update_visualizer(reset_bounding_box=True)
 
     def update_geometries(self, inc_idx=1):
-        """Tries to extract a mesh from a leaf node until it suceeds."""
-        self.geometries = []
-        while not self.geometries:
-            try:
-                # Obtain the new mesh patch
-                origin_ijk, leaf_node = self.grid.leaf_nodes[self.idx]
-                leaf_node_mesh = extract_mesh(leaf_node)
-                leaf_node_mesh.scale(self.grid.voxel_size, center=np.zeros(3))
-                leaf_node_mesh.paint_uniform_color(AIS_RED)
-
-                # Get a coordinate_frame for visualization
-                leaf_node_origin = o3d.geometry.TriangleMesh.create_coordinate_frame(
-                    size=leaf_node.shape[0] * self.grid.voxel_size
-                )
-
-                # Compute the XYZ origin using the grid index and the voxel_size
-                origin_xyz = self.grid.voxel_size * origin_ijk
-
-                # Always update the reconstructed_mesh no matter what
-                self._update_reconstruction(leaf_node_mesh, origin_xyz)
-
-                if self.global_view:
-                    model = self.model
-                    leaf_node_mesh.translate(origin_xyz)
-                    leaf_node_origin.translate(origin_xyz)
-                    leaf_node_voxels = get_leaf_node_voxel_grid(
-                        origin=origin_xyz,
-                        shape=leaf_node.shape,
-                        color=AIS_GREY,
-                        voxel_size=self.grid.voxel_size,
-                    )
-                else:  # local_view
-                    model = copy.deepcopy(self.model)
-                    model.translate(-origin_xyz)
-                    leaf_node_voxels = get_leaf_node_voxel_grid(
-                        origin=np.zeros(3),
-                        shape=leaf_node.shape,
-                        color=AIS_GREY,
-                        voxel_size=self.grid.voxel_size,
-                    )
-                # Update self.geometries cache
-                self.geometries.append(leaf_node_mesh)
-                if self.render_mesh:
-                    self.geometries.append(model)
-                if self.render_reconstruction and self.global_view:
-                    self.geometries.append(self.reconstructed_mesh)
-                if self.render_voxels:
-                    self.geometries.append(leaf_node_voxels)
-                    self.geometries.append(leaf_node_origin)
-            except ValueError:
-                self.idx = (self.idx + inc_idx) % self.leaf_count
+        """Swap in the mesh of the current leaf node, skipping the ones without surface."""
+        direction = inc_idx or 1
+        leaf_node_mesh = self.leaf_meshes.get(self.idx, direction)
+        while leaf_node_mesh is None:
+            self.idx = (self.idx + direction) % self.leaf_count
+            leaf_node_mesh = self.leaf_meshes.get(self.idx, direction)
+
+        # Compute the XYZ origin using the grid index and the voxel_size
+        origin_ijk, _ = self.grid[self.idx]
+        origin_xyz = self.grid.voxel_size * origin_ijk
+
+        # Always update the reconstruction no matter what
+        self._update_reconstruction(leaf_node_mesh, origin_xyz)
+
+        if self.global_view:
+            self._translate_model(np.zeros(3))
+            leaf_node_mesh = o3d.geometry.TriangleMesh(leaf_node_mesh).translate(origin_xyz)
+            leaf_node_origin = o3d.geometry.TriangleMesh(self.leaf_node_origin)
+            leaf_node_origin.translate(origin_xyz)
+            leaf_node_voxels = get_leaf_node_voxel_grid(
+                origin=origin_xyz,
+                shape=self.grid.leaf_node_shape,
+                color=AIS_GREY,
+                voxel_size=self.grid.voxel_size,
+            )
+        else:  # local_view
+            self._translate_model(-origin_xyz)
+            leaf_node_origin = self.leaf_node_origin
+            leaf_node_voxels = self.leaf_node_voxels
+
+        # Update self.geometries cache
+        self.geometries = [leaf_node_mesh]
+        if self.render_mesh:
+            self.geometries.append(self.model)
+        if self.render_reconstruction and self.global_view:
+            self.geometries.extend(self.reconstruction.chunks)
+        if self.render_voxels:
+            self.geometries.append(leaf_node_voxels)
+            self.geometries.append(leaf_node_origin)
 
         # When succeed, update the debug message
         print(
@@ -126,16 +230,37 @@ class LeafNodeGridVisualizer:
             end="\r",
         )
 
+    def _translate_model(self, translation):
+        """Move the model to translation, relative to its original position."""
+        if np.any(translation != self.model_translation):
+            self.model.translate(translation - self.model_translation)
+            self.model_translation = translation
+            self._changed_geometries.add(id(self.model))
+
     def _update_reconstruction(self, leaf_node_mesh, origin):
-        leaf_node_mesh_t = copy.deepcopy(leaf_node_mesh)
-        leaf_node_mesh_t.translate(origin)
-        leaf_node_mesh_t.paint_uniform_color(AIS_RED)
-        self.reconstructed_mesh += leaf_node_mesh_t
+        chunk = self.reconstruction.add(self.idx, leaf_node_mesh, origin)
+        if chunk is not None:
+            self._changed_geometries.add(id(chunk))
 
     def update_visualizer(self, reset_bounding_box=False):
-        self.vis.clear_geometries()
-        for geom in self.geometries:
-            self.vis.add_geometry(geom, reset_bounding_box=reset_bounding_box)
+        """Show self.geometries, uploading only the geometries that are new or changed.
+
+        Geometries that stay on screen are kept registered and refreshed in place with
+        update_geometry, and only when they changed. For the reconstruction that is only its last
+        chunk, the new chunks are added with add_geometry, see ReconstructionBuffer.
+        """
+        shown = {id(geom): geom for geom in self._shown_geometries}
+        wanted = {id(geom): geom for geom in self.geometries}
+        for key, geom in shown.items():
+            if key not in wanted:
+                self.vis.remove_geometry(geom, reset_bounding_box=False)
+        for key, geom in wanted.items():
+            if key not in shown:
+                self.vis.add_geometry(geom, reset_bounding_box=reset_bounding_box)
+            elif key in self._changed_geometries:
+                self.vis.update_geometry(geom)
+        self._shown_geometries = list(self.geometries)
+        self._changed_geometries.clear()
         if reset_bounding_box and self.global_view and not self.render_mesh:
             self.vis.reset_view_point(True)
         self.vis.update_renderer()
@@ -0,0 +1,48 @@
+"""Test the sparse COO export of active voxels."""
+
+import unittest
+
+import numpy as np
+import pyopenvdb as vdb
+
+from vdb_to_numpy.grid_wrappers import LeafNodeGrid, extract_active_voxels
+
+
+class ActiveVoxelsTest(unittest.TestCase):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.grid = vdb.createLevelSetSphere(2.0, voxelSize=0.1)
+
+    def test_active_voxels(self):
+        coords, values = extract_active_voxels(self.grid)
+        self.assertEqual(coords.shape, (self.grid.activeVoxelCount(), 3))
+        self.assertEqual(values.shape, (self.grid.activeVoxelCount(), 1))
+        self.assertEqual(coords.dtype, np.int32)
+        self.assertEqual(values.dtype, np.float32)
+
+        # No duplicated voxels and the values match the grid
+        self.assertEqual(len(np.unique(coords, axis=0)), len(coords))
+        accessor = self.grid.getConstAccessor()
+        for ijk, value in zip(coords[::97], values[::97]):
+            self.assertTrue(accessor.isValueOn(tuple(ijk)))
+            self.assertEqual(accessor.getValue(tuple(ijk)), value[0])
+
+    def test_leaf_order(self):
+        # Including inactive voxels must match the LeafNodeGrid layout, once sorted by origin
+        coords, values = extract_active_voxels(self.grid, include_inactive=True)
+        coords_ijk, leaf_nodes = LeafNodeGrid(self.grid).numpy()
+        order = np.lexsort(coords_ijk.T[::-1])
+        np.testing.assert_array_equal(values.reshape(leaf_nodes.shape), leaf_nodes[order])
+        np.testing.assert_array_equal(coords.reshape(-1, 512, 3)[:, 0], coords_ijk[order])
+
+    def test_world_coords(self):
+        coords, _, points = extract_active_voxels(self.grid, world_coords=True)
+        self.assertEqual(points.shape, coords.shape)
+        self.assertEqual(points.dtype, np.float32)
+        for ijk, xyz in zip(coords[::97], points[::97]):
+            ref_xyz = self.grid.transform.indexToWorld(tuple(ijk))
+            np.testing.assert_allclose(xyz, ref_xyz, atol=1e-6)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+"""Test the co-extraction of leaf nodes from several grids."""
+
+import unittest
+
+import numpy as np
+import pyopenvdb as vdb
+
+from vdb_to_numpy.grid_wrappers import LeafNodeGrid, extract_aligned_leaf_arrays
+
+
+class AlignedLeavesTest(unittest.TestCase):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Same index space, different topologies
+        self.grid_a = vdb.createLevelSetSphere(2.0, voxelSize=0.1)
+        self.grid_b = vdb.createLevelSetSphere(1.5, voxelSize=0.1, halfWidth=5.0)
+
+    def test_reference_topology(self):
+        coords, values = extract_aligned_leaf_arrays([self.grid_a, self.grid_b])
+        ref_coords, ref_values = LeafNodeGrid(self.grid_a).numpy()
+        self.assertEqual(values.shape, (len(ref_coords), 2, 8, 8, 8))
+        np.testing.assert_array_equal(coords, ref_coords)
+        np.testing.assert_array_equal(values[:, 0], ref_values)
+
+    def test_missing_leaves(self):
+        coords, values = extract_aligned_leaf_arrays([self.grid_b], reference=self.grid_a)
+        accessor = self.grid_b.getConstAccessor()
+        leaves_b = {tuple(ijk): leaf for ijk, leaf in LeafNodeGrid(self.grid_b)}
+        for ijk, leaf in zip(coords, values[:, 0]):
+            if tuple(ijk) in leaves_b:
+                np.testing.assert_array_equal(leaf, leaves_b[tuple(ijk)])
+            else:
+                # The missing leaf nodes are filled with the background/tile value
+                np.testing.assert_array_equal(leaf, accessor.getValue(tuple(ijk)))
+
+    def test_empty_list(self):
+        with self.assertRaises(ValueError):
+            extract_aligned_leaf_arrays([])
+
+
+if __name__ == "__main__":
+    unittest.main()
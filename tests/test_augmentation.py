@@ -0,0 +1,85 @@
+"""Test the batched leaf node augmentation."""
+
+import unittest
+
+import numpy as np
+
+from vdb_to_numpy.dataset import (
+    NUM_TRANSFORMS,
+    ROTATION_IDS,
+    augment_leaves,
+    random_transform_ids,
+    transform_matrix,
+)
+
+
+class AugmentLeavesTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.leaf_nodes = rng.normal(size=(NUM_TRANSFORMS, 8, 8, 8)).astype(np.float32)
+        self.coords = rng.integers(-100, 100, (NUM_TRANSFORMS, 3)).astype(np.int32) * 8
+        self.transform_ids = np.arange(NUM_TRANSFORMS, dtype=np.int32)
+
+    def _assert_same_voxels(self, leaf_nodes, coords, out_leaf_nodes, out_coords):
+        """Every voxel must keep its value at its transformed index-space coordinates."""
+        dim = leaf_nodes.shape[1]
+        halo = (dim - 8) // 2
+        offsets = np.stack(np.meshgrid(*[np.arange(dim)] * 3, indexing="ij"), -1).reshape(-1, 3)
+        for n, transform_id in enumerate(self.transform_ids):
+            matrix = transform_matrix(transform_id)
+            voxels = (coords[n] - halo + offsets) @ matrix[:3, :3].T + matrix[:3, 3]
+            out_offsets = voxels - (out_coords[n] - halo)
+            self.assertTrue(((out_offsets >= 0) & (out_offsets < dim)).all())
+            np.testing.assert_array_equal(
+                out_leaf_nodes[n][tuple(out_offsets.T)], leaf_nodes[n].reshape(-1)
+            )
+
+    def test_transforms(self):
+        out_leaf_nodes, out_coords = augment_leaves(
+            self.leaf_nodes, self.coords, self.transform_ids
+        )
+        self._assert_same_voxels(self.leaf_nodes, self.coords, out_leaf_nodes, out_coords)
+        # The identity, and the origins of the leaf nodes still aligned to the leaf grid
+        np.testing.assert_array_equal(out_leaf_nodes[0], self.leaf_nodes[0])
+        self.assertTrue((out_coords % 8 == 0).all())
+
+    def test_halo(self):
+        leaf_nodes = np.random.default_rng(1).normal(size=(NUM_TRANSFORMS, 10, 10, 10))
+        out_leaf_nodes, out_coords = augment_leaves(
+            leaf_nodes, self.coords, self.transform_ids, leaf_dim=8
+        )
+        self._assert_same_voxels(leaf_nodes, self.coords, out_leaf_nodes, out_coords)
+        self.assertTrue((out_coords % 8 == 0).all())
+
+    def test_in_place(self):
+        expected = augment_leaves(self.leaf_nodes, self.coords, self.transform_ids)
+        leaf_nodes, coords = self.leaf_nodes.copy(), self.coords.copy()
+        out = augment_leaves(leaf_nodes, coords, self.transform_ids, out=(leaf_nodes, coords))
+        self.assertIs(out[0], leaf_nodes)
+        np.testing.assert_array_equal(leaf_nodes, expected[0])
+        np.testing.assert_array_equal(coords, expected[1])
+
+    def test_quantized(self):
+        leaf_nodes = (self.leaf_nodes * 30).astype(np.int8)
+        out_leaf_nodes, out_coords = augment_leaves(leaf_nodes, self.coords, self.transform_ids)
+        self._assert_same_voxels(leaf_nodes, self.coords, out_leaf_nodes, out_coords)
+        with self.assertRaises(ValueError):
+            augment_leaves(leaf_nodes, self.coords, self.transform_ids, noise_std=0.1)
+
+    def test_noise(self):
+        ids = np.zeros(NUM_TRANSFORMS, dtype=np.int32)
+        noisy, _ = augment_leaves(self.leaf_nodes, self.coords, ids, noise_std=0.1, seed=7)
+        same, _ = augment_leaves(self.leaf_nodes, self.coords, ids, noise_std=0.1, seed=7)
+        np.testing.assert_array_equal(noisy, same)
+        self.assertAlmostEqual(np.std(noisy - self.leaf_nodes), 0.1, delta=0.005)
+
+    def test_random_transform_ids(self):
+        self.assertEqual(len(ROTATION_IDS), 24)
+        ids = random_transform_ids(1000, rng=0, rotations_only=True)
+        self.assertTrue(np.isin(ids, ROTATION_IDS).all())
+        ids = random_transform_ids(1000, rng=0)
+        self.assertTrue(((ids >= 0) & (ids < NUM_TRANSFORMS)).all())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+"""Test the batch processing utilities."""
+
+import os
+import signal
+import tempfile
+import time
+import unittest
+
+from vdb_to_numpy.utils import Manifest, list_input_files, run_batch
+
+
+def _copy_file(filename):
+    if filename.endswith("error.ply"):
+        raise RuntimeError("Corrupted mesh")
+    if filename.endswith("slow.ply"):
+        time.sleep(10)
+    if filename.endswith("crash.ply"):
+        os.kill(os.getpid(), signal.SIGKILL)
+    output = filename + ".out"
+    with open(output, "w") as out, open(filename) as f:
+        out.write(f.read())
+    return [output]
+
+
+class BatchTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.in_dir = self.tmp_dir.name
+        for name in ("a.ply", "b.ply", "error.ply", "slow.ply", "notes.md"):
+            with open(os.path.join(self.in_dir, name), "w") as f:
+                f.write(name)
+        self.manifest_path = os.path.join(self.in_dir, "manifest.jsonl")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_worker_crash(self):
+        # A worker killed by a signal only fails its own job, and the job is recorded
+        with open(os.path.join(self.in_dir, "crash.ply"), "w") as f:
+            f.write("crash.ply")
+        filenames = list_input_files(self.in_dir, (".ply",))
+        manifest = Manifest(self.manifest_path)
+        records = list(run_batch(_copy_file, filenames, 2, timeout=1, manifest=manifest))
+        status = {os.path.basename(r["input"]): r["status"] for r in records}
+        self.assertEqual(len(records), 5)
+        self.assertEqual(status["crash.ply"], "error")
+        self.assertEqual(status["a.ply"], "ok")
+        self.assertEqual(len(Manifest(self.manifest_path).records), 5)
+
+    def test_single_worker_timeout(self):
+        # The jobs run in this process, the SIGALRM handler must be restored afterwards
+        handler = signal.getsignal(signal.SIGALRM)
+        filenames = [os.path.join(self.in_dir, name) for name in ("a.ply", "slow.ply")]
+        records = list(run_batch(_copy_file, filenames, 1, timeout=1))
+        self.assertEqual([r["status"] for r in records], ["ok", "timeout"])
+        self.assertIs(signal.getsignal(signal.SIGALRM), handler)
+
+    def test_list_input_files(self):
+        filenames = list_input_files(self.in_dir, (".ply",))
+        self.assertEqual(len(filenames), 4)
+        list_path = os.path.join(self.in_dir, "list.txt")
+        with open(list_path, "w") as f:
+            f.write("a.ply\n# comment\n\nb.ply\n")
+        self.assertEqual(
+            list_input_files(list_path, (".ply",)),
+            [os.path.join(self.in_dir, "a.ply"), os.path.join(self.in_dir, "b.ply")],
+        )
+
+    def test_run_batch(self):
+        filenames = list_input_files(self.in_dir, (".ply",))
+        manifest = Manifest(self.manifest_path)
+        records = list(run_batch(_copy_file, filenames, 2, timeout=1, manifest=manifest))
+        status = {os.path.basename(r["input"]): r["status"] for r in records}
+        self.assertEqual(
+            status, {"a.ply": "ok", "b.ply": "ok", "error.ply": "error", "slow.ply": "timeout"}
+        )
+
+        # A rerun only retries the failed inputs
+        manifest = Manifest(self.manifest_path)
+        self.assertTrue(manifest.is_done(os.path.join(self.in_dir, "a.ply")))
+        records = list(run_batch(_copy_file, filenames, 1, timeout=1, manifest=manifest))
+        self.assertEqual(len(records), 2)
+
+        # Removing an output makes the input pending again
+        os.remove(os.path.join(self.in_dir, "a.ply.out"))
+        self.assertFalse(Manifest(self.manifest_path).is_done(os.path.join(self.in_dir, "a.ply")))
+
+
+if __name__ == "__main__":
+    unittest.main()
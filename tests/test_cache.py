@@ -0,0 +1,60 @@
+"""Test the on-disk array cache."""
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from vdb_to_numpy.utils import ArrayCache, array_digest
+
+
+class ArrayCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = ArrayCache(self.tmp_dir.name, max_bytes=None)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_digest(self):
+        vertices = np.random.random_sample((100, 3))
+        triangles = np.random.randint(0, 100, (50, 3))
+        key = array_digest(vertices, triangles, depth=8)
+        self.assertEqual(key, array_digest(vertices.copy(), triangles.copy(), depth=8))
+        self.assertNotEqual(key, array_digest(vertices, triangles, depth=9))
+        self.assertNotEqual(key, array_digest(vertices.astype(np.float32), triangles, depth=8))
+
+    def test_put_get(self):
+        vertices = np.random.random_sample((100, 3))
+        key = array_digest(vertices)
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, vertices=vertices)
+        self.assertIn(key, self.cache)
+        np.testing.assert_array_equal(self.cache.get(key)["vertices"], vertices)
+        np.testing.assert_array_equal(self.cache.get(key, mmap_mode="r")["vertices"], vertices)
+
+        # Storing the same key twice is harmless
+        self.cache.put(key, vertices=vertices)
+        np.testing.assert_array_equal(self.cache.get(key)["vertices"], vertices)
+
+    def test_lru_eviction(self):
+        arrays = [np.full(1024, i, dtype=np.float64) for i in range(4)]
+        keys = [array_digest(array) for array in arrays]
+        entry_bytes = 1024 * 8 + 128  # data + npy header
+        cache = ArrayCache(self.tmp_dir.name, max_bytes=3 * entry_bytes)
+        for i, (key, array) in enumerate(zip(keys[:3], arrays)):
+            cache.put(key, values=array)
+            os.utime(cache._entry_path(key), (i, i))
+
+        # Touch the oldest entry, so the second one is the least recently used
+        cache.get(keys[0])
+        cache.put(keys[3], values=arrays[3])
+        self.assertIn(keys[0], cache)
+        self.assertNotIn(keys[1], cache)
+        self.assertIn(keys[2], cache)
+        self.assertIn(keys[3], cache)
+
+
+if __name__ == "__main__":
+    unittest.main()
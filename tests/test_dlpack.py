@@ -0,0 +1,57 @@
+"""Test the zero-copy export of the LeafNodeGrid arrays."""
+
+import sys
+import unittest
+
+import numpy as np
+import pyopenvdb as vdb
+
+from vdb_to_numpy import LeafNodeGrid
+
+
+class ZeroCopyExportTest(unittest.TestCase):
+    def setUp(self):
+        self.grid = LeafNodeGrid(vdb.createLevelSetSphere(radius=1.0, voxelSize=0.1))
+
+    def test_numpy_views(self):
+        coords, leaf_nodes = self.grid.numpy(copy=False)
+        self.assertTrue(np.shares_memory(coords, self.grid.coords_ijk_a))
+        self.assertTrue(np.shares_memory(leaf_nodes, self.grid.leaf_nodes_a))
+        self.assertFalse(leaf_nodes.flags.writeable)
+        with self.assertRaises(ValueError):
+            leaf_nodes[0] = 0
+        # The default still returns private copies
+        _, leaf_nodes = self.grid.numpy()
+        self.assertFalse(np.shares_memory(leaf_nodes, self.grid.leaf_nodes_a))
+
+    def test_numpy_views_quantized(self):
+        grid = LeafNodeGrid(self.grid.to_vdb(), dtype=np.int8)
+        with self.assertRaises(ValueError):
+            grid.numpy(dequantize=True, copy=False)
+        _, leaf_nodes = grid.numpy(copy=False)
+        self.assertEqual(leaf_nodes.dtype, np.int8)
+
+    def test_array(self):
+        leaf_nodes = np.asarray(self.grid)
+        self.assertTrue(np.shares_memory(leaf_nodes, self.grid.leaf_nodes_a))
+        self.assertFalse(leaf_nodes.flags.writeable)
+        leaf_nodes = np.array(self.grid, dtype=np.float64)
+        np.testing.assert_array_equal(leaf_nodes, self.grid.leaf_nodes_a)
+
+    def test_dlpack(self):
+        leaf_nodes = np.from_dlpack(self.grid)
+        self.assertEqual(leaf_nodes.shape, self.grid.leaf_nodes_a.shape)
+        self.assertTrue(np.shares_memory(leaf_nodes, self.grid.leaf_nodes_a))
+        self.assertFalse(leaf_nodes.flags.writeable)
+        self.assertEqual(self.grid.__dlpack_device__()[0], 1)
+
+    @unittest.skipIf(sys.version_info < (3, 12), "PEP 688 needs Python 3.12")
+    def test_buffer(self):
+        view = memoryview(self.grid)
+        self.assertTrue(view.readonly)
+        self.assertEqual(view.shape, self.grid.leaf_nodes_a.shape)
+        np.testing.assert_array_equal(np.asarray(view), self.grid.leaf_nodes_a)
+
+
+if __name__ == "__main__":
+    unittest.main()
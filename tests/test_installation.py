@@ -1,5 +1,10 @@
+import subprocess
+import sys
 import unittest
 
+# Only imported by the functions that need them, see vdb_to_numpy.utils.__getattr__
+HEAVY_MODULES = ("open3d", "manifold", "skimage")
+
 
 class ImportTest(unittest.TestCase):
     def __init__(self, *args, **kwargs):
@@ -16,3 +21,21 @@ class ImportTest(unittest.TestCase):
             import vdb_to_numpy.pybind
         except ImportError:
             self.fail("vdb_to_numpy not properly installed, please run `make`")
+
+    def test_lazy_imports(self):
+        code = "import sys, vdb_to_numpy; print(' '.join(m for m in {} if m in sys.modules))"
+        output = subprocess.run(
+            [sys.executable, "-c", code.format(HEAVY_MODULES)],
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        self.assertEqual(output.stdout.strip(), "")
+
+    def test_lazy_attributes(self):
+        import vdb_to_numpy.utils as utils
+
+        self.assertIn("preprocess_mesh", dir(utils))
+        self.assertTrue(callable(utils.extract_mesh))
+        with self.assertRaises(AttributeError):
+            utils.not_a_function
@@ -0,0 +1,84 @@
+"""Test the multi-file leaf node dataset."""
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pyopenvdb as vdb
+
+from vdb_to_numpy.dataset import LeafNodeDataset, ShuffleBufferSampler
+from vdb_to_numpy.grid_wrappers import LeafNodeGrid
+
+
+class LeafNodeDatasetTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.filenames, self.grids = [], []
+        for radius in (1.0, 1.5, 2.0):
+            vdb_grid = vdb.createLevelSetSphere(radius, voxelSize=0.1)
+            filename = os.path.join(self.tmp_dir.name, "sphere_{}.vdb".format(radius))
+            vdb.write(filename, vdb_grid)
+            self.filenames.append(filename)
+            self.grids.append(LeafNodeGrid(vdb_grid))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_index(self):
+        dataset = LeafNodeDataset(self.filenames)
+        self.assertEqual(list(dataset.leaf_counts), [len(grid) for grid in self.grids])
+        self.assertEqual(len(dataset), sum(len(grid) for grid in self.grids))
+        file_idx, local_idx = dataset.locate(len(self.grids[0]))
+        self.assertEqual((file_idx, local_idx), (1, 0))
+        with self.assertRaises(IndexError):
+            dataset[len(dataset)]
+
+    def test_lru(self):
+        # Room for a single grid at a time
+        dataset = LeafNodeDataset(self.filenames, max_bytes=1)
+        leaf_nodes = np.concatenate([grid.leaf_nodes_a for grid in self.grids])
+        for idx in np.random.default_rng(0).integers(0, len(dataset), 50):
+            np.testing.assert_array_equal(dataset[idx][1], leaf_nodes[idx])
+            self.assertEqual(len(dataset._grids), 1)
+
+        dataset = LeafNodeDataset(self.filenames)
+        indices = np.random.default_rng(1).integers(0, len(dataset), 256)
+        _, batch = dataset.get_batch(indices)
+        np.testing.assert_array_equal(batch, leaf_nodes[indices])
+        self.assertEqual(len(dataset._grids), len(self.filenames))
+
+        # An empty batch still has the right shapes and dtypes
+        coords, batch = dataset.get_batch([])
+        self.assertEqual(coords.shape, (0, 3))
+        self.assertEqual(coords.dtype, np.int32)
+        self.assertEqual(batch.shape, (0,) + self.grids[0].leaf_node_shape)
+        self.assertEqual(batch.dtype, self.grids[0].leaf_nodes_a.dtype)
+
+        # Negative indices count from the end, out of range ones raise
+        _, batch = dataset.get_batch([-1, -len(dataset)])
+        np.testing.assert_array_equal(batch, leaf_nodes[[-1, 0]])
+        with self.assertRaises(IndexError):
+            dataset.get_batch([0, len(dataset)])
+        with self.assertRaises(IndexError):
+            dataset.get_batch([-len(dataset) - 1])
+
+    def test_shuffle_sampler(self):
+        dataset = LeafNodeDataset(self.filenames)
+        sampler = ShuffleBufferSampler(dataset, batch_size=32, buffer_size=128, seed=0)
+        leaf_nodes = np.concatenate([grid.leaf_nodes_a for grid in self.grids])
+        seen = []
+        for coords, batch, file_ids in sampler:
+            self.assertTrue(batch.flags.c_contiguous)
+            self.assertLessEqual(len(batch), 32)
+            for coord, leaf_node, file_idx in zip(coords, batch, file_ids):
+                grid = self.grids[file_idx]
+                local_idx = np.flatnonzero((grid.coords_ijk_a == coord).all(axis=1))[0]
+                np.testing.assert_array_equal(leaf_node, grid.leaf_nodes_a[local_idx])
+                seen.append(dataset.offsets[file_idx] + local_idx)
+        # Every leaf node exactly once per epoch
+        self.assertEqual(sorted(seen), list(range(len(leaf_nodes))))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,7 +6,7 @@ import numpy as np
 import pyopenvdb as vdb
 
 import test_data
-from vdb_to_numpy.grid_wrappers import LeafNodeGrid
+from vdb_to_numpy.grid_wrappers import LeafNodeGrid, extract_leaf_arrays
 
 
 class LeafNodeGridTest(unittest.TestCase):
@@ -72,6 +72,40 @@ class LeafNodeGridTest(unittest.TestCase):
         float_grid = LeafNodeGrid(grid)
         self.assertEqual(float_grid.sdf_trunc, grid.background)
 
+    def _test_value_mask(self, grid=None):
+        float_grid = LeafNodeGrid(grid, value_mask=True)
+        packed = float_grid.value_masks()
+        self.assertEqual(packed.shape, (len(float_grid), 64))
+        self.assertEqual(packed.dtype, np.uint8)
+
+        # The unpacked mask must match the one written natively
+        masks = float_grid.value_masks(packed=False)
+        _, _, ref_masks = extract_leaf_arrays(grid, value_mask=True, packed=False)
+        np.testing.assert_array_equal(masks, ref_masks)
+        self.assertEqual(masks.sum(), grid.activeLeafVoxelCount())
+
+        # Inactive voxels only hold the +/- background fill
+        _, nodes = float_grid.numpy()
+        np.testing.assert_array_equal(np.abs(nodes[~masks]), float_grid.background)
+
+    def _test_dtype(self, grid=None):
+        _, ref_nodes = LeafNodeGrid(grid).numpy()
+        for dtype in (np.float16, np.int8, np.int16):
+            float_grid = LeafNodeGrid(grid, dtype=dtype)
+            _, nodes = float_grid.numpy()
+            self.assertEqual(nodes.dtype, dtype)
+
+            # The error after dequantizing must be within the precision of the type
+            _, dequantized_nodes = float_grid.numpy(dequantize=True)
+            self.assertEqual(dequantized_nodes.dtype, np.float32)
+            tolerance = float_grid.scale / 2 if dtype != np.float16 else 1e-3 * grid.background
+            np.testing.assert_allclose(dequantized_nodes, ref_nodes, rtol=0, atol=tolerance)
+
+            # The round trip keeps the topology of the original grid
+            vdb_grid = float_grid.to_vdb()
+            self.assertEqual(vdb_grid.leafCount(), grid.leafCount())
+            self.assertEqual(vdb_grid.activeVoxelCount(), grid.activeVoxelCount())
+
     def test_bunny(self):
         bunny_vdb = test_data.Bunny().vdb
         self._test_leaf_nodes(grid=bunny_vdb)
@@ -98,6 +132,8 @@ class LeafNodeGridTest(unittest.TestCase):
         self._test_get_item(grid=sphere_vdb)
         self._test_background_value(grid=sphere_vdb)
         self._test_leaf_node_shape(grid=sphere_vdb)
+        self._test_value_mask(grid=sphere_vdb)
+        self._test_dtype(grid=sphere_vdb)
 
     def test_empty_grid(self):
         self._test_leaf_nodes(grid=vdb.FloatGrid())
@@ -0,0 +1,60 @@
+"""Test the LeafNodeGrid cache."""
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pyopenvdb as vdb
+
+from vdb_to_numpy.grid_wrappers import LeafNodeGrid, load_leaf_node_grid
+from vdb_to_numpy.utils import ArrayCache
+
+
+class LeafNodeGridCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = ArrayCache(os.path.join(self.tmp_dir.name, "cache"))
+        self.vdb_path = os.path.join(self.tmp_dir.name, "sphere.vdb")
+        vdb.write(self.vdb_path, vdb.createLevelSetSphere(2.0, voxelSize=0.1))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _assert_equal_leaf_node_grids(self, grid1, grid2):
+        np.testing.assert_array_equal(grid1.coords_ijk_a, grid2.coords_ijk_a)
+        np.testing.assert_array_equal(grid1.leaf_nodes_a, grid2.leaf_nodes_a)
+        self.assertEqual(grid1.voxel_size, grid2.voxel_size)
+        self.assertEqual(grid1.background, grid2.background)
+        self.assertEqual(grid1.gridClass, grid2.gridClass)
+        self.assertEqual(grid1.transform, grid2.transform)
+
+    def test_to_from_arrays(self):
+        grid = LeafNodeGrid(vdb.createLevelSetSphere(2.0, voxelSize=0.1), value_mask=True)
+        restored_grid = LeafNodeGrid.from_arrays(**grid.to_arrays())
+        self._assert_equal_leaf_node_grids(grid, restored_grid)
+        np.testing.assert_array_equal(grid.value_masks(), restored_grid.value_masks())
+        self.assertEqual(
+            restored_grid.to_vdb().activeVoxelCount(), grid.vdb_grid.activeVoxelCount()
+        )
+
+    def test_cache_hit(self):
+        grid = load_leaf_node_grid(self.vdb_path, cache=self.cache)
+        cached_grid = load_leaf_node_grid(self.vdb_path, cache=self.cache)
+        self.assertIsInstance(cached_grid.leaf_nodes_a, np.memmap)
+        self._assert_equal_leaf_node_grids(grid, cached_grid)
+
+        # Different conversion parameters are different entries
+        normalized_grid = load_leaf_node_grid(self.vdb_path, cache=self.cache, normalize=True)
+        self.assertNotIsInstance(normalized_grid.leaf_nodes_a, np.memmap)
+
+    def test_edited_file(self):
+        load_leaf_node_grid(self.vdb_path, cache=self.cache)
+        vdb.write(self.vdb_path, vdb.createLevelSetSphere(1.0, voxelSize=0.1))
+        grid = load_leaf_node_grid(self.vdb_path, cache=self.cache)
+        self.assertNotIsInstance(grid.leaf_nodes_a, np.memmap)
+        self.assertEqual(len(grid), vdb.readAll(self.vdb_path)[0][0].leafCount())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+"""Test the tiled mesh to level set conversion."""
+
+import unittest
+
+import numpy as np
+import open3d as o3d
+
+from vdb_to_numpy.vdb_tools import mesh_to_level_set, split_mesh_into_tiles
+
+
+class TiledMeshToLevelSetTest(unittest.TestCase):
+    def setUp(self):
+        # A "scene" made of disjoint closed parts
+        self.mesh = o3d.geometry.TriangleMesh()
+        for x in (0.0, 1.5, 3.0, 6.0):
+            self.mesh += o3d.geometry.TriangleMesh.create_sphere(0.5).translate((x, 0, 0))
+        self.mesh += o3d.geometry.TriangleMesh.create_box().translate((0, 3, 0))
+
+    def test_split(self):
+        tile_meshes = split_mesh_into_tiles(self.mesh, 3)
+        self.assertEqual(len(tile_meshes), 3)
+        num_triangles = sum(len(triangles) for _, triangles in tile_meshes)
+        self.assertEqual(num_triangles, len(self.mesh.triangles))
+        for vertices, triangles in tile_meshes:
+            self.assertEqual(triangles.max(), len(vertices) - 1)
+
+    def test_split_unmerged_vertices(self):
+        # One vertex per triangle corner, as read from an STL file
+        vertices, triangles = np.asarray(self.mesh.vertices), np.asarray(self.mesh.triangles)
+        unmerged_mesh = o3d.geometry.TriangleMesh(
+            o3d.utility.Vector3dVector(vertices[triangles].reshape(-1, 3)),
+            o3d.utility.Vector3iVector(np.arange(3 * len(triangles)).reshape(-1, 3)),
+        )
+        tile_meshes = split_mesh_into_tiles(unmerged_mesh, 3)
+        merged_tile_meshes = split_mesh_into_tiles(self.mesh, 3)
+        self.assertEqual(
+            [len(triangles) for _, triangles in tile_meshes],
+            [len(triangles) for _, triangles in merged_tile_meshes],
+        )
+        self.assertEqual(len(unmerged_mesh.vertices), 3 * len(triangles))
+
+        voxel_size = 0.05
+        grid = mesh_to_level_set(self.mesh, voxel_size)
+        tiled_grid = mesh_to_level_set(unmerged_mesh, voxel_size, tiles=5)
+        accessor, tiled_accessor = grid.getConstAccessor(), tiled_grid.getConstAccessor()
+        for ijk in np.random.default_rng(0).integers(-20, 140, (2000, 3)):
+            ijk = tuple(int(c) for c in ijk)
+            self.assertAlmostEqual(
+                tiled_accessor.getValue(ijk), accessor.getValue(ijk), delta=voxel_size / 10
+            )
+
+    def test_same_level_set(self):
+        voxel_size = 0.05
+        grid = mesh_to_level_set(self.mesh, voxel_size)
+        for tiles in (2, 5, 16):
+            tiled_grid = mesh_to_level_set(self.mesh, voxel_size, tiles=tiles)
+            self.assertEqual(tiled_grid.transform, grid.transform)
+            self.assertEqual(tiled_grid.background, grid.background)
+            self.assertEqual(
+                tiled_grid.evalActiveVoxelBoundingBox(), grid.evalActiveVoxelBoundingBox()
+            )
+            # Compare the narrow band values
+            accessor, tiled_accessor = grid.getConstAccessor(), tiled_grid.getConstAccessor()
+            for ijk in np.random.default_rng(tiles).integers(-20, 140, (2000, 3)):
+                ijk = tuple(int(c) for c in ijk)
+                self.assertAlmostEqual(
+                    tiled_accessor.getValue(ijk), accessor.getValue(ijk), delta=voxel_size / 10
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
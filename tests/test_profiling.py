@@ -0,0 +1,62 @@
+"""Test the stage-level profiling hooks."""
+
+import csv
+import json
+import os
+import tempfile
+import unittest
+
+from vdb_to_numpy.utils import get_profiler, profiled, profiling, stage
+from vdb_to_numpy.utils.profiling import PROFILE_FIELDS
+
+
+@profiled(items=len)
+def _make_list(size):
+    return list(range(size))
+
+
+class ProfilingTest(unittest.TestCase):
+    def test_disabled(self):
+        self.assertIsNone(get_profiler())
+        self.assertEqual(_make_list(3), [0, 1, 2])
+        with stage("noop") as record:
+            record.items = 10
+        self.assertIsNone(get_profiler())
+
+    def test_stages(self):
+        with profiling() as profiler:
+            _make_list(3)
+            _make_list(5)
+            with stage("block", items=2):
+                _make_list(1)
+        self.assertIsNone(get_profiler())
+
+        records = {record["stage"]: record for record in profiler.records()}
+        self.assertEqual(list(records), ["_make_list", "block"])
+        self.assertEqual(records["_make_list"]["calls"], 3)
+        self.assertEqual(records["_make_list"]["items"], 9)
+        self.assertEqual(records["block"]["items"], 2)
+        for record in records.values():
+            self.assertEqual(tuple(record), PROFILE_FIELDS)
+            self.assertGreaterEqual(record["wall_seconds"], 0)
+            self.assertGreater(record["peak_rss_mb"], 0)
+        self.assertIn("_make_list", profiler.summary())
+
+    def test_save(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            json_file, csv_file = os.path.join(tmp_dir, "p.json"), os.path.join(tmp_dir, "p.csv")
+            with profiling(json_file) as profiler:
+                _make_list(4)
+            profiler.save(csv_file)
+
+            with open(json_file) as f:
+                stages = json.load(f)["stages"]
+            with open(csv_file) as f:
+                rows = list(csv.DictReader(f))
+        self.assertEqual(stages[0]["items"], 4)
+        self.assertEqual(rows[0]["stage"], "_make_list")
+        self.assertEqual(int(rows[0]["items"]), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
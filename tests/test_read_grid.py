@@ -0,0 +1,56 @@
+"""Test the lazy, metadata-only and region-limited .vdb readers."""
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pyopenvdb as vdb
+
+from vdb_to_numpy.vdb_tools import read_grid, read_grid_metadata
+
+
+class ReadGridTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.vdb_path = os.path.join(self.tmp_dir.name, "spheres.vdb")
+        self.small = vdb.createLevelSetSphere(1.0, voxelSize=0.1, name="small")
+        self.large = vdb.createLevelSetSphere(2.0, voxelSize=0.05, name="large")
+        vdb.write(self.vdb_path, [self.small, self.large])
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_metadata(self):
+        metadata = read_grid_metadata(self.vdb_path, "large")
+        self.assertEqual(metadata["name"], "large")
+        self.assertEqual(metadata["leaf_count"], self.large.leafCount())
+        self.assertEqual(metadata["active_voxel_count"], self.large.activeVoxelCount())
+        self.assertEqual(metadata["bbox"], self.large.evalActiveVoxelBoundingBox())
+        np.testing.assert_allclose(metadata["voxel_size"], self.large.transform.voxelSize())
+        self.assertAlmostEqual(metadata["background"], self.large.background)
+        self.assertEqual(metadata["gridClass"], self.large.gridClass)
+
+        # The first grid by default
+        self.assertEqual(read_grid_metadata(self.vdb_path)["name"], "small")
+        with self.assertRaises(ValueError):
+            read_grid_metadata(self.vdb_path, "missing")
+
+    def test_read_grid(self):
+        for delay_load in (True, False):
+            vdb_grid = read_grid(self.vdb_path, "large", delay_load=delay_load)
+            self.assertEqual(vdb_grid.activeVoxelCount(), self.large.activeVoxelCount())
+            self.assertEqual(vdb_grid.transform, self.large.transform)
+        self.assertEqual(read_grid(self.vdb_path).name, "small")
+
+    def test_read_bbox(self):
+        # Only the positive octant of the sphere
+        vdb_grid = read_grid(self.vdb_path, "large", bbox=((0, 0, 0), (3, 3, 3)))
+        self.assertGreater(vdb_grid.activeVoxelCount(), 0)
+        self.assertLess(vdb_grid.leafCount(), self.large.leafCount())
+        bbox_min, _ = vdb_grid.evalActiveVoxelBoundingBox()
+        self.assertTrue(all(coord >= -8 for coord in bbox_min))
+
+
+if __name__ == "__main__":
+    unittest.main()
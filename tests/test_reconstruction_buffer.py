@@ -0,0 +1,57 @@
+"""Test the append-only reconstruction buffer of the LeafNodeGridVisualizer."""
+
+import unittest
+
+import numpy as np
+import open3d as o3d
+
+from vdb_to_numpy.visualization import ReconstructionBuffer
+
+
+class ReconstructionBufferTest(unittest.TestCase):
+    def test_add(self):
+        leaf_node_mesh = o3d.geometry.TriangleMesh.create_sphere(1.0)
+        leaf_node_mesh.compute_vertex_normals()
+        num_vertices = len(leaf_node_mesh.vertices)
+        num_triangles = len(leaf_node_mesh.triangles)
+
+        # Room for two leaf node meshes per chunk
+        buffer = ReconstructionBuffer(chunk_size=2 * num_triangles)
+        chunks = [buffer.add(idx, leaf_node_mesh, np.array([idx, 0, 0])) for idx in range(10)]
+        # Only the last chunk changes, and a new one is started when it's full
+        self.assertIs(chunks[0], chunks[1])
+        self.assertIsNot(chunks[1], chunks[2])
+        self.assertEqual(len(buffer.chunks), 5)
+        # Revisiting a leaf node doesn't add its mesh again
+        self.assertIsNone(buffer.add(3, leaf_node_mesh, np.array([3, 0, 0])))
+
+        self.assertEqual(buffer.num_vertices, 10 * num_vertices)
+        self.assertEqual(buffer.num_triangles, 10 * num_triangles)
+        for chunk in buffer.chunks:
+            self.assertEqual(len(chunk.vertex_normals), len(chunk.vertices))
+            self.assertEqual(len(chunk.vertex_colors), len(chunk.vertices))
+
+        chunk_idx, first_vertex, first_triangle = buffer.leaf_ranges[3]
+        chunk = buffer.chunks[chunk_idx]
+        np.testing.assert_allclose(
+            np.asarray(chunk.vertices)[first_vertex : first_vertex + num_vertices],
+            np.asarray(leaf_node_mesh.vertices) + [3, 0, 0],
+        )
+        np.testing.assert_array_equal(
+            np.asarray(chunk.triangles)[first_triangle : first_triangle + num_triangles],
+            np.asarray(leaf_node_mesh.triangles) + first_vertex,
+        )
+
+    def test_add_without_normals(self):
+        # Leaf node meshes without normals keep the normals in step with the vertices
+        buffer = ReconstructionBuffer()
+        with_normals = o3d.geometry.TriangleMesh.create_sphere(1.0).compute_vertex_normals()
+        without_normals = o3d.geometry.TriangleMesh.create_box()
+        buffer.add(0, with_normals, np.zeros(3))
+        chunk = buffer.add(1, without_normals, np.ones(3))
+        self.assertFalse(without_normals.has_vertex_normals())
+        self.assertEqual(len(chunk.vertex_normals), len(chunk.vertices))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+"""Test the resampling of grids to a new voxel size or transform."""
+
+import unittest
+
+import numpy as np
+import pyopenvdb as vdb
+
+from vdb_to_numpy.grid_wrappers import (
+    LeafNodeGrid,
+    extract_active_voxels,
+    resample_grid,
+    transform_to_matrix,
+)
+
+
+class ResampleGridTest(unittest.TestCase):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.level_set = vdb.createLevelSetSphere(1.0, voxelSize=0.1)
+        # A linear ramp, which trilinear interpolation reproduces exactly
+        self.ramp = vdb.FloatGrid()
+        self.ramp.transform = vdb.createLinearTransform(voxelSize=0.1)
+        accessor = self.ramp.getAccessor()
+        for ijk in np.ndindex(16, 16, 16):
+            accessor.setValueOn(ijk, float(sum(ijk)))
+
+    def test_level_set(self):
+        grid = resample_grid(self.level_set, voxel_size=0.05)
+        self.assertIsInstance(grid, vdb.FloatGrid)
+        self.assertAlmostEqual(grid.transform.voxelSize()[0], 0.05)
+        self.assertEqual(grid.gridClass, self.level_set.gridClass)
+        self.assertAlmostEqual(grid.background, self.level_set.background, places=6)
+        self.assertGreater(grid.activeVoxelCount(), self.level_set.activeVoxelCount())
+
+        _, values, points = extract_active_voxels(grid, world_coords=True)
+        distance = np.linalg.norm(points, axis=1) - 1.0
+        near = np.abs(distance) < 0.1
+        np.testing.assert_allclose(values[near, 0], distance[near], atol=0.01)
+        self.assertGreater(len(LeafNodeGrid(grid).leaf_nodes_a), 0)
+
+    def test_identity(self):
+        grid = resample_grid(self.ramp, transform=self.ramp.transform, order=0)
+        coords, values = extract_active_voxels(grid)
+        ref_coords, ref_values = extract_active_voxels(self.ramp)
+        np.testing.assert_array_equal(coords, ref_coords)
+        np.testing.assert_array_equal(values, ref_values)
+
+    def test_transform(self):
+        # Half the voxel size, as a matrix: index (2i, 2j, 2k) lands on (i, j, k)
+        matrix = transform_to_matrix(self.ramp.transform)
+        matrix[:3, :3] /= 2
+        for order in (1, 2):
+            grid = resample_grid(self.ramp, transform=matrix, order=order)
+            accessor = grid.getConstAccessor()
+            self.assertAlmostEqual(accessor.getValue((10, 12, 14)), 18.0, places=4)
+            self.assertAlmostEqual(accessor.getValue((11, 12, 14)), 18.5, places=4)
+
+    def test_arguments(self):
+        with self.assertRaises(ValueError):
+            resample_grid(self.ramp)
+        with self.assertRaises(ValueError):
+            resample_grid(self.ramp, voxel_size=0.05, transform=self.ramp.transform)
+        with self.assertRaises(ValueError):
+            resample_grid(self.ramp, transform=np.eye(3))
+        with self.assertRaises(ValueError):
+            resample_grid(self.ramp, voxel_size=0.05, order=3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,7 +6,12 @@ import numpy as np
 import numpy.testing
 import open3d as o3d
 
-from vdb_to_numpy.utils import scale_to_unit_sphere, scale_to_unit_cube
+from vdb_to_numpy.utils import (
+    scale_to_unit_cube,
+    scale_to_unit_sphere,
+    scale_vertices_to_unit_cube,
+    scale_vertices_to_unit_sphere,
+)
 
 
 # TODO: complete the unit tests to check for unit_cube the same way we do for
@@ -113,6 +118,47 @@ class MeshScalingTest(unittest.TestCase):
             delta=0.1 * self.unit_sphere_volume,
         )
 
+    def test_vertices_scaling(self):
+        _, mesh = self.sample_random_sphere(max_radius=100)
+        mesh.translate(100 * np.random.random_sample(size=3))
+        vertices = np.asarray(mesh.vertices).copy()
+
+        scale, padding = 2, 0.1
+
+        # Unit sphere: bounding box centered at the origin, radius of scale * (1 - padding)
+        scaled_vertices = scale_vertices_to_unit_sphere(mesh.vertices, scale, padding)
+        center = (scaled_vertices.min(axis=0) + scaled_vertices.max(axis=0)) / 2
+        numpy.testing.assert_array_almost_equal(center, np.zeros(3))
+        radius = np.linalg.norm(scaled_vertices, axis=1).max()
+        self.assertAlmostEqual(radius, scale * (1 - padding))
+
+        # Unit cube: bounding box centered at the origin, largest side of 2 * scale * (1 - padding)
+        scaled_vertices = scale_vertices_to_unit_cube(mesh.vertices, scale, padding)
+        min_bound, max_bound = scaled_vertices.min(axis=0), scaled_vertices.max(axis=0)
+        numpy.testing.assert_array_almost_equal((min_bound + max_bound) / 2, np.zeros(3))
+        self.assertAlmostEqual(np.max(max_bound - min_bound), 2 * scale * (1 - padding))
+
+        # The scaled meshes keep their triangles, and the input mesh is left untouched
+        for scale_mesh in (scale_to_unit_sphere, scale_to_unit_cube):
+            scaled_mesh = scale_mesh(mesh, scale, padding)
+            numpy.testing.assert_array_equal(scaled_mesh.triangles, mesh.triangles)
+        numpy.testing.assert_array_equal(vertices, mesh.vertices)
+
+    def test_textured_mesh_scaling(self):
+        # The texture coordinates, textures and materials survive the scaling
+        mesh = o3d.geometry.TriangleMesh.create_box(create_uv_map=True)
+        mesh.textures = [o3d.geometry.Image(np.zeros((4, 4, 3), dtype=np.uint8))]
+        mesh.triangle_material_ids = o3d.utility.IntVector(np.zeros(len(mesh.triangles), np.int32))
+        for scale_mesh in (scale_to_unit_sphere, scale_to_unit_cube):
+            scaled_mesh = scale_mesh(mesh)
+            self.assertTrue(scaled_mesh.has_triangle_uvs())
+            numpy.testing.assert_array_equal(scaled_mesh.triangle_uvs, mesh.triangle_uvs)
+            self.assertTrue(scaled_mesh.has_textures())
+            self.assertEqual(len(scaled_mesh.textures), 1)
+            numpy.testing.assert_array_equal(
+                scaled_mesh.triangle_material_ids, mesh.triangle_material_ids
+            )
+
     @staticmethod
     def sample_random_sphere(max_radius):
         """Sample a random sphere from a normal distribution."""
@@ -0,0 +1,47 @@
+"""Test the SDF output formats."""
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pyopenvdb as vdb
+
+from vdb_to_numpy.vdb_tools import SDF_FORMATS, level_set_to_numpy, load_sdf, save_sdf
+
+
+class SDFFormatsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.vdb_grid = vdb.createLevelSetSphere(1.0, voxelSize=0.05)
+        self.sdf_volume, self.origin = level_set_to_numpy(self.vdb_grid)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _round_trip(self, format, dtype):
+        filename = os.path.join(self.tmp_dir.name, "{}_{}".format(format, dtype))
+        return load_sdf(
+            save_sdf(filename, self.vdb_grid, format=format, dtype=dtype, chunk_size=16)
+        )
+
+    def test_lossless(self):
+        for format in SDF_FORMATS:
+            sdf_volume, origin = self._round_trip(format, "float32")
+            np.testing.assert_array_equal(sdf_volume, self.sdf_volume)
+            if format != "npy":
+                np.testing.assert_allclose(origin, self.origin)
+
+    def test_quantized(self):
+        for format in ("npz", "chunked", "leaves"):
+            for dtype, bits in (("int16", 16), ("int8", 8)):
+                sdf_volume, _ = self._round_trip(format, dtype)
+                tolerance = self.vdb_grid.background / (2 ** (bits - 1) - 1)
+                np.testing.assert_allclose(sdf_volume, self.sdf_volume, atol=tolerance)
+
+        with self.assertRaises(ValueError):
+            self._round_trip("npy", "int8")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+"""Test the sharded leaf dataset writer and reader."""
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pyopenvdb as vdb
+
+from vdb_to_numpy.dataset import ShardedLeafDataset, ShardedLeafWriter
+from vdb_to_numpy.dataset.sharded_leaves import INDEX_FILENAME
+from vdb_to_numpy.grid_wrappers import LeafNodeGrid
+
+
+class ShardedLeafDatasetTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.grids = [
+            LeafNodeGrid(vdb.createLevelSetSphere(radius, voxelSize=0.1)) for radius in (1.0, 2.0)
+        ]
+        with ShardedLeafWriter(self.tmp_dir.name, shard_size=100) as writer:
+            for grid in self.grids:
+                writer.add_grid(grid)
+        self.dataset = ShardedLeafDataset(self.tmp_dir.name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_layout(self):
+        num_leaves = sum(len(grid) for grid in self.grids)
+        self.assertEqual(len(self.dataset), num_leaves)
+        self.assertEqual(self.dataset.index["num_shards"], -(-num_leaves // 100))
+        self.assertEqual(self.dataset.leaf_shape, self.grids[0].leaf_node_shape)
+
+    def test_random_access(self):
+        coords = np.concatenate([grid.coords_ijk_a for grid in self.grids])
+        leaf_nodes = np.concatenate([grid.leaf_nodes_a for grid in self.grids])
+        grid_ids = np.repeat(np.arange(len(self.grids)), [len(grid) for grid in self.grids])
+        indices = np.random.default_rng(0).integers(0, len(self.dataset), 256)
+        batch = self.dataset.get_batch(indices)
+        np.testing.assert_array_equal(batch[0], coords[indices])
+        np.testing.assert_array_equal(batch[1], leaf_nodes[indices])
+        np.testing.assert_array_equal(batch[2], grid_ids[indices])
+
+        # The output arrays can be reused
+        out_batch = self.dataset.get_batch(indices[::-1], out=batch)
+        self.assertIs(out_batch[1], batch[1])
+        np.testing.assert_array_equal(out_batch[1], leaf_nodes[indices[::-1]])
+
+        coord, leaf_node, grid_id = self.dataset[len(self.dataset) - 1]
+        np.testing.assert_array_equal(leaf_node, leaf_nodes[-1])
+        with self.assertRaises(IndexError):
+            self.dataset[len(self.dataset)]
+
+    def test_negative_indices(self):
+        indices = np.array([-1, -len(self.dataset), 5])
+        batch = self.dataset.get_batch(indices)
+        expected = self.dataset.get_batch(indices % len(self.dataset))
+        for array, expected_array in zip(batch, expected):
+            np.testing.assert_array_equal(array, expected_array)
+        with self.assertRaises(IndexError):
+            self.dataset.get_batch([-len(self.dataset) - 1])
+        with self.assertRaises(IndexError):
+            self.dataset.get_batch([len(self.dataset)])
+
+    def test_streamed_grid(self):
+        # Leaf nodes added one by one, the grid still gets its metadata and leaf range
+        with ShardedLeafWriter(self.tmp_dir.name, shard_size=100) as writer:
+            writer.add_grid(self.grids[0])
+            grid_id = writer.begin_grid(self.grids[1].to_arrays()["metadata"], name="streamed")
+            writer.add_leaves(iter(self.grids[1]), grid_id)
+            with self.assertRaises(ValueError):
+                writer.add_leaves(iter(self.grids[0]), 0)
+        dataset = ShardedLeafDataset(self.tmp_dir.name)
+        self.assertEqual(dataset.grids[grid_id]["name"], "streamed")
+        self.assertEqual(len(dataset.grid_leaf_range(grid_id)), len(self.grids[1]))
+        restored_grid = dataset.leaf_node_grid(grid_id)
+        np.testing.assert_array_equal(restored_grid.coords_ijk_a, self.grids[1].coords_ijk_a)
+        np.testing.assert_array_equal(restored_grid.leaf_nodes_a, self.grids[1].leaf_nodes_a)
+        self.assertEqual(restored_grid.transform, self.grids[1].transform)
+        self.assertEqual(restored_grid.background, self.grids[1].background)
+
+    def test_failed_write(self):
+        # A writer interrupted by an error doesn't write the index of the unfinished dataset
+        with tempfile.TemporaryDirectory() as directory:
+            with self.assertRaises(RuntimeError):
+                with ShardedLeafWriter(directory, shard_size=100) as writer:
+                    writer.add_grid(self.grids[0])
+                    raise RuntimeError("Corrupted grid")
+            self.assertFalse(os.path.exists(os.path.join(directory, INDEX_FILENAME)))
+
+    def test_leaf_node_grid(self):
+        for grid_id, grid in enumerate(self.grids):
+            restored_grid = self.dataset.leaf_node_grid(grid_id)
+            np.testing.assert_array_equal(restored_grid.coords_ijk_a, grid.coords_ijk_a)
+            np.testing.assert_array_equal(restored_grid.leaf_nodes_a, grid.leaf_nodes_a)
+            self.assertEqual(restored_grid.transform, grid.transform)
+            self.assertEqual(restored_grid.background, grid.background)
+
+
+if __name__ == "__main__":
+    unittest.main()
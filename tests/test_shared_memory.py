@@ -0,0 +1,73 @@
+"""Test the zero-copy pickling and shared memory transfer of the array containers."""
+
+import multiprocessing
+import pickle
+import unittest
+
+import numpy as np
+import open3d as o3d
+import pyopenvdb as vdb
+
+from vdb_to_numpy.grid_wrappers import LeafNodeGrid
+from vdb_to_numpy.utils import SerializableMesh, SharedArrays
+
+
+def _leaf_nodes_sum(grid):
+    return float(grid.leaf_nodes_a.sum()), len(grid)
+
+
+def _vertices_sum(mesh):
+    return float(mesh.vertices.sum()), len(mesh.triangles)
+
+
+class SharedMemoryTest(unittest.TestCase):
+    def setUp(self):
+        self.grid = LeafNodeGrid(vdb.createLevelSetSphere(2.0, voxelSize=0.1), value_mask=True)
+        self.mesh = SerializableMesh(o3d.geometry.TriangleMesh.create_sphere())
+
+    def test_shared_arrays(self):
+        arrays = {"a": np.arange(10), "empty": np.zeros((0, 3), dtype=np.float32)}
+        shared_arrays = SharedArrays.create(arrays)
+        attached_arrays = SharedArrays.attach(pickle.loads(pickle.dumps(shared_arrays.handles())))
+        for name, array in arrays.items():
+            np.testing.assert_array_equal(attached_arrays.arrays[name], array)
+        shared_arrays.arrays["a"][0] = 42
+        self.assertEqual(attached_arrays.arrays["a"][0], 42)
+        attached_arrays.close()
+        shared_arrays.close()
+
+    def test_out_of_band_pickle(self):
+        buffers = []
+        data = pickle.dumps(self.grid, protocol=5, buffer_callback=buffers.append)
+        self.assertGreaterEqual(len(buffers), 2)
+        self.assertLess(len(data), self.grid.leaf_nodes_a.nbytes)
+        grid = pickle.loads(data, buffers=buffers)
+        self.assertIsNone(grid.vdb_grid)
+        np.testing.assert_array_equal(grid.coords_ijk_a, self.grid.coords_ijk_a)
+        np.testing.assert_array_equal(grid.leaf_nodes_a, self.grid.leaf_nodes_a)
+        np.testing.assert_array_equal(grid.value_masks(), self.grid.value_masks())
+        self.assertEqual(grid.transform, self.grid.transform)
+
+        buffers = []
+        data = pickle.dumps(self.mesh, protocol=5, buffer_callback=buffers.append)
+        mesh = pickle.loads(data, buffers=buffers)
+        np.testing.assert_array_equal(mesh.vertices, self.mesh.vertices)
+        np.testing.assert_array_equal(mesh.triangles, self.mesh.triangles)
+
+    def test_share_memory(self):
+        self.grid.share_memory()
+        self.mesh.share_memory()
+        try:
+            self.assertLess(len(pickle.dumps(self.grid)), 1024)
+            with multiprocessing.get_context("spawn").Pool(2) as pool:
+                grid_result = pool.apply(_leaf_nodes_sum, (self.grid,))
+                mesh_result = pool.apply(_vertices_sum, (self.mesh,))
+        finally:
+            self.grid.close_shared_memory()
+            self.mesh.close_shared_memory()
+        self.assertEqual(grid_result, _leaf_nodes_sum(self.grid))
+        self.assertEqual(mesh_result, _vertices_sum(self.mesh))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+"""Test the point/SDF sampling of the narrow band."""
+
+import unittest
+
+import numpy as np
+import pyopenvdb as vdb
+
+from vdb_to_numpy.grid_wrappers import sample_surface_points
+
+
+class SurfaceSamplesTest(unittest.TestCase):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.voxel_size = 0.05
+        self.grid = vdb.createLevelSetSphere(1.0, voxelSize=self.voxel_size)
+
+    def test_samples(self):
+        points, sdf = sample_surface_points(self.grid, 10000, seed=0)
+        self.assertEqual(points.shape, (10000, 3))
+        self.assertEqual(sdf.shape, (10000, 1))
+        self.assertEqual(points.dtype, np.float32)
+        self.assertEqual(sdf.dtype, np.float32)
+
+        # The points stay in the narrow band, and away from its border, where the interpolation
+        # reaches the background value, the values match the distance to the sphere
+        distance = np.linalg.norm(points, axis=1, keepdims=True) - 1.0
+        self.assertTrue((np.abs(distance) < 4 * self.voxel_size).all())
+        inner = np.abs(distance) < 2 * self.voxel_size
+        np.testing.assert_allclose(sdf[inner], distance[inner], atol=0.1 * self.voxel_size)
+
+        # The surface samples are closer to the zero level set than the band samples
+        self.assertLess(np.abs(sdf[:5000]).mean(), np.abs(sdf[5000:]).mean())
+
+    def test_gradients(self):
+        points, _, gradients = sample_surface_points(self.grid, 1000, seed=0, gradients=True)
+        self.assertEqual(gradients.shape, (1000, 3))
+        distance = np.linalg.norm(points, axis=1, keepdims=True)
+        inner = np.abs(distance[:, 0] - 1.0) < 2 * self.voxel_size
+        np.testing.assert_allclose(gradients[inner], (points / distance)[inner], atol=0.05)
+
+    def test_seed(self):
+        samples = sample_surface_points(self.grid, 10000, seed=7)
+        same_samples = sample_surface_points(self.grid, 10000, seed=7)
+        for array, same_array in zip(samples, same_samples):
+            np.testing.assert_array_equal(array, same_array)
+        other_points, _ = sample_surface_points(self.grid, 10000, seed=8)
+        self.assertFalse(np.array_equal(samples[0], other_points))
+
+    def test_surface_ratio(self):
+        _, sdf = sample_surface_points(self.grid, 1000, surface_ratio=0.0, seed=0)
+        self.assertEqual(len(sdf), 1000)
+        with self.assertRaises(ValueError):
+            sample_surface_points(self.grid, 1000, surface_ratio=1.5)
+        with self.assertRaises(ValueError):
+            sample_surface_points(vdb.FloatGrid(), 1000)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+"""Test the thread count of the native code."""
+
+import os
+import unittest
+from unittest import mock
+
+import numpy as np
+import pyopenvdb as vdb
+
+from vdb_to_numpy import LeafNodeGrid, get_num_threads, set_num_threads, thread_limit
+from vdb_to_numpy.utils.threads import num_threads_from_env
+
+
+class ThreadsTest(unittest.TestCase):
+    def tearDown(self):
+        set_num_threads(None)
+
+    def test_set_num_threads(self):
+        set_num_threads(2)
+        self.assertEqual(get_num_threads(), 2)
+        set_num_threads(None)
+        self.assertGreaterEqual(get_num_threads(), 1)
+        with self.assertRaises(ValueError):
+            set_num_threads(-1)
+
+    def test_thread_limit(self):
+        set_num_threads(3)
+        with thread_limit(1):
+            self.assertEqual(get_num_threads(), 1)
+        self.assertEqual(get_num_threads(), 3)
+
+    def test_env_vars(self):
+        with mock.patch.dict(os.environ, {"OMP_NUM_THREADS": "4,2"}, clear=True):
+            self.assertEqual(num_threads_from_env(), 4)
+        env = {"OMP_NUM_THREADS": "4", "VDB_TO_NUMPY_NUM_THREADS": "2"}
+        with mock.patch.dict(os.environ, env, clear=True):
+            self.assertEqual(num_threads_from_env(), 2)
+        with mock.patch.dict(os.environ, {}, clear=True):
+            self.assertIsNone(num_threads_from_env())
+
+    def test_same_results(self):
+        grid = vdb.createLevelSetSphere(radius=1.0, voxelSize=0.05)
+        coords, leaf_nodes = LeafNodeGrid(grid).numpy()
+        with thread_limit(1):
+            single_coords, single_leaf_nodes = LeafNodeGrid(grid).numpy()
+        np.testing.assert_array_equal(single_coords, coords)
+        np.testing.assert_array_equal(single_leaf_nodes, leaf_nodes)
+
+
+if __name__ == "__main__":
+    unittest.main()